@@ -1,4 +1,5 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Response
+from app.services.service_manager import service_manager
 
 router = APIRouter()
 
@@ -6,3 +7,14 @@ router = APIRouter()
 def health_check():
     """Simple health check endpoint for uptime monitoring."""
     return {"status": "ok"}
+
+@router.get("/ready")
+def readiness_check(response: Response):
+    """
+    Readiness probe: 200 once the RAG service has warmed up, 503 before that.
+    Reports per-dependency status and initialization time.
+    """
+    status = service_manager.readiness()
+    if not status["ready"]:
+        response.status_code = 503
+    return status
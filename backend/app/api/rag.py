@@ -1,54 +1,197 @@
+import json
 import os
-from fastapi import APIRouter, Form, UploadFile, File
-from app.services.semantic import SemanticSearchService
-from app.services.file_parser import FileParser
-from app.utils.chunking import chunk_text
+from itertools import islice
+from typing import List, Optional
+import aiofiles
+from fastapi import APIRouter, BackgroundTasks, Depends, Form, HTTPException, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from app.core.config import settings
+from app.core.metrics import PAYLOAD_BYTES
+from app.services.service_manager import ServiceUnavailable, service_manager
+from app.utils.filters import parse_filters
 
 router = APIRouter()
-rag_service = SemanticSearchService()
 
 UPLOAD_DIR = "uploaded_files"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+async def get_rag_service():
+    """
+    The shared SemanticSearchService, built on first use if the startup warm-up has not finished.
+    Responds 503 if it is still unavailable after SERVICE_READY_TIMEOUT_SECONDS.
+    """
+    try:
+        return await service_manager.get()
+    except ServiceUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+async def get_ingestion(rag_service=Depends(get_rag_service)):
+    """The background ingestion manager bound to the shared service."""
+    return service_manager.ingestion
+
+def _json_object(value: Optional[str], name: str) -> Optional[dict]:
+    """Decode an optional JSON-object form field; 400 if it is not one."""
+    if not value:
+        return None
+    try:
+        decoded = json.loads(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be a JSON object")
+    if not isinstance(decoded, dict):
+        raise HTTPException(status_code=400, detail=f"{name} must be a JSON object")
+    return decoded
+
+def get_filters(filters: Optional[str] = Form(None)) -> Optional[dict]:
+    """
+    Optional `filters` form field: JSON such as {"tenant": "acme", "page": {"gte": 2}}.
+    Validated up front so a bad filter is a 400, also for streamed answers.
+    """
+    decoded = _json_object(filters, "filters")
+    try:
+        parse_filters(decoded, settings.payload_index_fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return decoded
+
 @router.post("/index")
-def index_document(content: str = Form(...)):
+async def index_document(
+    content: str = Form(...),
+    document_id: Optional[str] = Form(None),
+    metadata: Optional[str] = Form(None),
+    rag_service=Depends(get_rag_service)
+):
     """
-    Receive raw text input, chunk it, embed with Gemini, and store in Qdrant.
+    Receive raw text input, chunk it, embed it, and store in Qdrant.
+    Re-submitting a document with the same document_id only re-embeds changed chunks.
+    `metadata` (JSON object) is stored with every chunk and can be filtered on at query time.
     """
-    result = rag_service.index_text(content)
+    result = await rag_service.aindex_text(
+        content, metadata=_json_object(metadata, "metadata"), document_id=document_id
+    )
     return {"status": "indexed", "detail": result}
 
 @router.post("/upload")
-def upload_document(file: UploadFile = File(...)):
+async def upload_document(
+    background_tasks: BackgroundTasks, file: UploadFile = File(...), ingestion=Depends(get_ingestion)
+):
     """
-    Accept a file upload (PDF or TXT), extract its content, and show chunk preview.
-    Does not store embeddings yet — only returns processed chunks.
+    Accept a file upload (PDF or TXT), stream it to disk and index it in the background.
+    Returns a job ID to poll at /rag/jobs/{job_id}, plus a preview of the first chunks.
     """
-    file_path = os.path.join(UPLOAD_DIR, file.filename)
-    with open(file_path, "wb") as f:
-        f.write(file.file.read())
-
-    # Detect type
-    if file.filename.lower().endswith(".pdf"):
-        text = FileParser.parse_pdf(file_path)
-    elif file.filename.lower().endswith(".txt"):
-        text = FileParser.parse_txt(file_path)
-    else:
+    filename = os.path.basename(file.filename or "")
+    if not filename.lower().endswith((".pdf", ".txt")):
         return {"error": "Unsupported file format. Please upload .pdf or .txt"}
 
-    chunks = chunk_text(text)
+    job = ingestion.create_job(filename, "")
+    job.file_path = os.path.join(UPLOAD_DIR, f"{job.id}_{filename}")
+
+    # Stream to disk in bounded chunks instead of reading the whole upload into memory
+    size = 0
+    async with aiofiles.open(job.file_path, "wb") as f:
+        while chunk := await file.read(settings.UPLOAD_CHUNK_BYTES):
+            await f.write(chunk)
+            size += len(chunk)
+    PAYLOAD_BYTES.labels("upload").observe(size)
+
+    sample_chunks = await run_in_threadpool(_preview_chunks, job.file_path)
+    background_tasks.add_task(ingestion.run, job)
     return {
-        "filename": file.filename,
-        "total_chunks": len(chunks),
-        "sample_chunks": chunks[:5],  # limit preview
+        "filename": filename,
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/rag/jobs/{job.id}",
+        "sample_chunks": sample_chunks,
     }
 
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str, ingestion=Depends(get_ingestion)):
+    """
+    Report ingestion progress and throughput for an uploaded document.
+    """
+    job = ingestion.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+def _preview_chunks(file_path: str, limit: int = 5):
+    """
+    Chunk only as much of the file as the preview needs.
+    Pages are read sequentially: the parallel reader would queue shards of a
+    large PDF on the process pool that the preview then abandons.
+    """
+    from app.services.file_parser import FileParser
+    from app.utils.chunking import iter_chunks
+
+    pages = (text for _, text in FileParser.iter_pages(file_path, workers=1))
+    return [chunk.text for chunk in islice(iter_chunks(pages), limit)]
+
 @router.post("/query")
-def rag_query(query: str = Form(...)):
+async def rag_query(
+    query: str = Form(...), filters: Optional[dict] = Depends(get_filters), rag_service=Depends(get_rag_service)
+):
     """
     Perform full RAG process:
-    - Retrieve similar content from Qdrant
+    - Retrieve similar content from Qdrant (restricted to chunks matching `filters`, if given)
     - Generate a final answer using Gemini generative model
     """
-    result = rag_service.generate_answer(query)
+    result = await rag_service.agenerate_answer(query, filters=filters)
     return result
+
+@router.post("/query/stream")
+async def rag_query_stream(
+    query: str = Form(...), filters: Optional[dict] = Depends(get_filters), rag_service=Depends(get_rag_service)
+):
+    """
+    Same as /query, streamed as server-sent events:
+    `context` (retrieved chunks), then `token` events as the answer is generated,
+    then `done` with timing metadata.
+    """
+    async def event_stream():
+        try:
+            async for event, data in rag_service.astream_answer(query, filters=filters):
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+class BatchSearchRequest(BaseModel):
+    queries: List[str]
+    top_k: int = 3
+    filters: Optional[dict] = None
+    generate: bool = False
+
+@router.post("/search/batch")
+async def rag_search_batch(request: BatchSearchRequest, rag_service=Depends(get_rag_service)):
+    """
+    Search many queries at once (JSON body): one embedding call and one batched
+    Qdrant query for the whole batch. Returns per-query results in request order;
+    with `generate`, each entry also carries a generated answer, at most
+    BATCH_ANSWER_CONCURRENCY being generated at a time.
+    """
+    if len(request.queries) > settings.BATCH_SEARCH_MAX_QUERIES:
+        raise HTTPException(
+            status_code=400, detail=f"At most {settings.BATCH_SEARCH_MAX_QUERIES} queries per batch"
+        )
+    if request.top_k < 1:
+        raise HTTPException(status_code=400, detail="top_k must be at least 1")
+    try:
+        results = await rag_service.asearch_many(
+            request.queries, top_k=request.top_k, filters=request.filters, generate=request.generate
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"count": len(results), "results": results}
+
+@router.get("/stats")
+def rag_stats(rag_service=Depends(get_rag_service)):
+    """
+    Report internal cache and batching counters for capacity planning.
+    """
+    return rag_service.stats()
@@ -0,0 +1,486 @@
+"""
+Bulk ingestion from the command line, without the API server in the path.
+
+Reads a directory tree of .pdf/.txt files, or a JSONL file with one document
+per line ({"id": ..., "text": ...} or {"id": ..., "path": ...}, plus optional
+"source" and "metadata"), and runs
+
+    parse + chunk (process pool) -> embed (concurrent batches) -> upsert (large batches)
+
+Each completed document is appended to a checkpoint file and skipped when the
+same command is run again, so an interrupted backfill resumes where it stopped.
+Chunk IDs are deterministic, so a document that was cut off half-way is
+re-indexed without duplicates.
+
+Usage (from backend/):
+    python -m app.cli.ingest ./corpus
+    python -m app.cli.ingest docs.jsonl --workers 8 --embed-concurrency 8 --upsert-batch-size 1024
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.document_registry import make_chunk_id, make_document_id
+
+SUPPORTED_EXTENSIONS = (".pdf", ".txt")
+
+# Marks the end of a stage's output
+_DONE = object()
+
+
+class Source(NamedTuple):
+    document_id: str  # also the checkpoint key
+    name: str         # stored as the "source" payload field
+    path: Optional[str] = None
+    text: Optional[str] = None
+    metadata: Optional[Dict[str, Any]] = None
+
+
+def iter_sources(target: str) -> Iterator[Source]:
+    """
+    Documents under a directory (recursively, in a stable order) or listed in a JSONL file.
+    """
+    if os.path.isdir(target):
+        for root, dirs, files in os.walk(target):
+            dirs.sort()
+            for filename in sorted(files):
+                if filename.lower().endswith(SUPPORTED_EXTENSIONS):
+                    path = os.path.join(root, filename)
+                    name = os.path.relpath(path, target)
+                    yield Source(f"file:{name}", name, path=path)
+        return
+
+    with open(target, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            text, path = record.get("text"), record.get("path")
+            if text is None and path is None:
+                raise ValueError(f"{target}:{line_number}: each record needs 'text' or 'path'")
+            document_id = record.get("id") or record.get("document_id")
+            if not document_id:
+                document_id = f"file:{path}" if path is not None else make_document_id(text)
+            name = record.get("source") or path or str(document_id)
+            yield Source(str(document_id), name, path=path, text=text, metadata=record.get("metadata"))
+
+
+def count_sources(target: str) -> int:
+    """Number of documents iter_sources will yield, without parsing JSONL records."""
+    if os.path.isdir(target):
+        return sum(
+            1 for _, _, files in os.walk(target) for name in files if name.lower().endswith(SUPPORTED_EXTENSIONS)
+        )
+    with open(target, "r", encoding="utf-8") as f:
+        return sum(1 for line in f if line.strip())
+
+
+class Checkpoint:
+    """
+    Append-only JSONL log of completed document IDs.
+    A line cut short by a crash is ignored, so that document is simply redone.
+    """
+
+    def __init__(self, path: Optional[str], restart: bool = False):
+        self.path = path
+        self.done: Set[str] = set()
+        self._file = None
+        if not path:
+            return
+        if restart and os.path.exists(path):
+            os.remove(path)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        self.done.add(json.loads(line)["id"])
+                    except (ValueError, KeyError):
+                        continue
+        self._file = open(path, "a", encoding="utf-8")
+
+    def __contains__(self, document_id: str) -> bool:
+        return document_id in self.done
+
+    def mark(self, documents: List[Tuple[str, int]]):
+        """Record (document_id, chunk count) pairs as completed."""
+        for document_id, chunks in documents:
+            self.done.add(document_id)
+            if self._file is not None:
+                self._file.write(json.dumps({"id": document_id, "chunks": chunks}) + "\n")
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+def _init_worker():
+    # Documents are already parsed in parallel; don't nest a PDF process pool inside each worker
+    settings.PDF_PARSE_WORKERS = 1
+
+
+def parse_source(source: Source):
+    """
+    Extract and chunk one document in a worker process.
+    Returns (source, pages, [(chunk, page_number), ...]).
+    """
+    from app.services.file_parser import FileParser
+    from app.services.ingestion import iter_page_chunks
+
+    pages = [(None, source.text)] if source.text is not None else FileParser.iter_pages(source.path)
+    page_count = 0
+
+    def counted():
+        nonlocal page_count
+        for page in pages:
+            page_count += 1
+            yield page
+
+    chunks = list(iter_page_chunks(counted()))
+    return source, page_count, chunks
+
+
+class _Document:
+    """A parsed document whose chunks are in flight through embed and upsert."""
+
+    __slots__ = ("document_id", "chunk_ids", "pending")
+
+    def __init__(self, document_id: str, chunk_ids: List[str]):
+        self.document_id = document_id
+        self.chunk_ids = chunk_ids
+        self.pending = len(chunk_ids)
+
+
+class BulkIngester:
+    """
+    Runs the bulk pipeline against a SemanticSearchService's embedding client,
+    vector store and document registry. Stages are connected by bounded queues
+    so memory stays flat for any corpus size.
+    """
+
+    def __init__(
+        self,
+        service: Any,
+        checkpoint: Checkpoint,
+        workers: int = 0,
+        embed_batch_size: int = 256,
+        embed_concurrency: int = 4,
+        upsert_batch_size: int = 1024,
+        progress_interval: float = 10.0,
+    ):
+        self.service = service
+        self.checkpoint = checkpoint
+        self.workers = workers or os.cpu_count() or 1
+        self.embed_batch_size = max(1, embed_batch_size)
+        self.embed_concurrency = max(1, embed_concurrency)
+        self.upsert_batch_size = max(1, upsert_batch_size)
+        self.progress_interval = progress_interval
+        self.stats = {
+            "documents_total": 0,
+            "documents_skipped": 0,
+            "documents_indexed": 0,
+            "documents_failed": 0,
+            "pages": 0,
+            "chunks": 0,
+            "chunks_embedded": 0,
+            "chunks_unchanged": 0,
+            "chunks_deleted": 0,
+        }
+        self.failures: List[Tuple[str, str]] = []
+        self._started = 0.0
+
+    async def run(self, sources: Iterator[Source], total: int) -> Dict[str, Any]:
+        """
+        Ingest every source not already in the checkpoint; returns a summary.
+        """
+        self.stats["documents_total"] = total
+        self._started = time.perf_counter()
+        parsed: asyncio.Queue = asyncio.Queue(maxsize=self.workers * 2)
+        batches: asyncio.Queue = asyncio.Queue(maxsize=self.embed_concurrency * 2)
+        embedded: asyncio.Queue = asyncio.Queue(maxsize=self.embed_concurrency * 2)
+
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker) as pool:
+            embedders = [asyncio.create_task(self._embed_stage(batches, embedded)) for _ in range(self.embed_concurrency)]
+            tasks = [
+                asyncio.create_task(self._parse_stage(pool, sources, parsed)),
+                asyncio.create_task(self._batch_stage(parsed, batches)),
+                *embedders,
+                asyncio.create_task(self._close_after(embedders, embedded)),
+                asyncio.create_task(self._upsert_stage(embedded)),
+            ]
+            reporter = asyncio.create_task(self._report_progress())
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+            finally:
+                reporter.cancel()
+                self._print_progress()
+        return self.summary()
+
+    async def _parse_stage(self, pool: ProcessPoolExecutor, sources: Iterator[Source], parsed: asyncio.Queue):
+        """
+        Parse documents in the process pool, keeping a bounded number in flight
+        and handing them on in completion order. A document that fails to parse
+        is reported and left out of the checkpoint so the next run retries it.
+        """
+        loop = asyncio.get_running_loop()
+        in_flight: Dict[asyncio.Future, Source] = {}
+
+        async def drain(return_when):
+            done, _ = await asyncio.wait(in_flight, return_when=return_when)
+            for future in done:
+                source = in_flight.pop(future)
+                try:
+                    _, pages, chunks = future.result()
+                except Exception as e:
+                    self._record_failure(source, e)
+                    continue
+                self.stats["pages"] += pages
+                await parsed.put((source, chunks))
+
+        for source in sources:
+            if source.document_id in self.checkpoint:
+                self.stats["documents_skipped"] += 1
+                continue
+            in_flight[loop.run_in_executor(pool, parse_source, source)] = source
+            if len(in_flight) >= self.workers * 2:
+                await drain(asyncio.FIRST_COMPLETED)
+        if in_flight:
+            await drain(asyncio.ALL_COMPLETED)
+        await parsed.put(_DONE)
+
+    async def _batch_stage(self, parsed: asyncio.Queue, batches: asyncio.Queue):
+        """
+        Turn parsed documents into payloads and pack chunks from consecutive
+        documents into embedding batches.
+        """
+        batch: List[Tuple[_Document, str, str, Dict[str, Any]]] = []
+        while (item := await parsed.get()) is not _DONE:
+            source, chunks = item
+            chunk_ids: List[str] = []
+            seen = set()
+            entries = []
+            for chunk, page_number in chunks:
+                point_id = make_chunk_id(source.document_id, chunk.text)
+                if point_id in seen:
+                    continue
+                seen.add(point_id)
+                chunk_ids.append(point_id)
+                entries.append((point_id, chunk.text, {
+                    **(source.metadata or {}),
+                    "content": chunk.text,
+                    "document_id": source.document_id,
+                    "source": source.name,
+                    "page": page_number,
+                    "start": chunk.start,
+                    "end": chunk.end,
+                }))
+            document = _Document(source.document_id, chunk_ids)
+            self.stats["chunks"] += len(chunk_ids)
+            if not chunk_ids:
+                await self._finish_documents([document])
+                continue
+            for point_id, text, payload in entries:
+                batch.append((document, point_id, text, payload))
+                if len(batch) >= self.embed_batch_size:
+                    await batches.put(batch)
+                    batch = []
+        if batch:
+            await batches.put(batch)
+        for _ in range(self.embed_concurrency):
+            await batches.put(_DONE)
+
+    async def _embed_stage(self, batches: asyncio.Queue, embedded: asyncio.Queue):
+        """
+        Embed one batch at a time; several of these run concurrently.
+        Chunks already stored under the same ID (e.g. from an interrupted run) are not re-embedded.
+        """
+        service = self.service
+        while (batch := await batches.get()) is not _DONE:
+            ids = [point_id for _, point_id, _, _ in batch]
+            existing = await service.vector_store.aexisting_ids(
+                service.collection_name, ids, service.embeddings.provider
+            )
+            new = [entry for entry in batch if entry[1] not in existing]
+            unchanged = [entry[0] for entry in batch if entry[1] in existing]
+            vectors, sparse_vectors = [], None
+            if new:
+                texts = [text for _, _, text, _ in new]
+                vectors = await service.aembed_chunks(texts, [payload for _, _, _, payload in new])
+                sparse_vectors = service.encode_sparse(texts)
+            await embedded.put((new, vectors, sparse_vectors, unchanged))
+
+    async def _close_after(self, embedders: List[asyncio.Task], embedded: asyncio.Queue):
+        await asyncio.gather(*embedders)
+        await embedded.put(_DONE)
+
+    async def _upsert_stage(self, embedded: asyncio.Queue):
+        """
+        Accumulate embedded chunks into large upserts; a document is finished
+        once all of its chunks are written.
+        """
+        # vectors holds one embedded matrix per batch, joined once per upsert
+        entries, vectors, sparse_vectors = [], [], []
+
+        async def flush():
+            service = self.service
+            await service.vector_store.aupsert_vectors(
+                service.collection_name,
+                np.concatenate(vectors),
+                [payload for _, _, _, payload in entries],
+                [point_id for _, point_id, _, _ in entries],
+                sparse_vectors=sparse_vectors or None,
+            )
+            service.add_sparse_stats(
+                [point_id for _, point_id, _, _ in entries], [text for _, _, text, _ in entries]
+            )
+            self.stats["chunks_embedded"] += len(entries)
+            finished = self._chunks_written(document for document, _, _, _ in entries)
+            entries.clear()
+            vectors.clear()
+            sparse_vectors.clear()
+            await self._finish_documents(finished)
+
+        while (item := await embedded.get()) is not _DONE:
+            new, new_vectors, new_sparse, unchanged = item
+            self.stats["chunks_unchanged"] += len(unchanged)
+            await self._finish_documents(self._chunks_written(unchanged))
+            entries.extend(new)
+            if new:
+                vectors.append(new_vectors)
+            sparse_vectors.extend(new_sparse or [])
+            if len(entries) >= self.upsert_batch_size:
+                await flush()
+        if entries:
+            await flush()
+
+    @staticmethod
+    def _chunks_written(documents: Iterable[_Document]) -> List[_Document]:
+        """Count stored chunks against their documents; return the documents now complete."""
+        finished = []
+        for document in documents:
+            document.pending -= 1
+            if document.pending == 0:
+                finished.append(document)
+        return finished
+
+    async def _finish_documents(self, documents: List[_Document]):
+        """
+        Drop chunks from previous versions of the documents, record their chunk
+        IDs in one registry transaction and checkpoint them.
+        """
+        if not documents:
+            return
+        service = self.service
+        stale: List[str] = []
+        for document in documents:
+            stale.extend(sorted(service.registry.get_chunk_ids(document.document_id) - set(document.chunk_ids)))
+        await service.vector_store.adelete_points(service.collection_name, stale)
+        service.remove_sparse_stats(stale)
+        service.registry.replace_many({document.document_id: document.chunk_ids for document in documents})
+        self.checkpoint.mark([(document.document_id, len(document.chunk_ids)) for document in documents])
+        self.stats["chunks_deleted"] += len(stale)
+        self.stats["documents_indexed"] += len(documents)
+
+    def _record_failure(self, source: Source, error: Exception):
+        self.stats["documents_failed"] += 1
+        self.failures.append((source.document_id, f"{type(error).__name__}: {error}"))
+        print(f"⚠️  Skipping {source.name}: {type(error).__name__}: {error}")
+
+    async def _report_progress(self):
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            self._print_progress()
+
+    def _print_progress(self):
+        stats = self.stats
+        elapsed = max(time.perf_counter() - self._started, 1e-9)
+        done = stats["documents_indexed"] + stats["documents_failed"]
+        remaining = stats["documents_total"] - stats["documents_skipped"] - done
+        docs_per_second = done / elapsed
+        eta = _format_duration(remaining / docs_per_second) if docs_per_second > 0 else "?"
+        finished = done + stats["documents_skipped"]
+        percent = 100.0 * finished / stats["documents_total"] if stats["documents_total"] else 100.0
+        print(
+            f"[ingest] {finished:,}/{stats['documents_total']:,} docs ({percent:.1f}%) | "
+            f"{stats['chunks_embedded'] + stats['chunks_unchanged']:,} chunks | "
+            f"{docs_per_second:,.1f} docs/s, {stats['chunks_embedded'] / elapsed:,.1f} chunks/s | "
+            f"elapsed {_format_duration(elapsed)}, ETA {eta}",
+            flush=True,
+        )
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self._started
+        return {
+            **self.stats,
+            "elapsed_seconds": round(elapsed, 3),
+            "documents_per_second": round(self.stats["documents_indexed"] / elapsed, 2) if elapsed else 0.0,
+            "chunks_per_second": round(self.stats["chunks_embedded"] / elapsed, 2) if elapsed else 0.0,
+            "failures": [{"document_id": d, "error": e} for d, e in self.failures[:100]],
+        }
+
+
+def _format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}h{minutes:02d}m{seconds:02d}s" if hours else f"{minutes}m{seconds:02d}s"
+
+
+async def _ingest(args) -> Dict[str, Any]:
+    from app.services.service_manager import service_manager
+
+    service = service_manager.ensure_ready()
+    checkpoint = Checkpoint(args.checkpoint, restart=args.restart)
+    ingester = BulkIngester(
+        service,
+        checkpoint,
+        workers=args.workers,
+        embed_batch_size=args.embed_batch_size,
+        embed_concurrency=args.embed_concurrency,
+        upsert_batch_size=args.upsert_batch_size,
+        progress_interval=args.progress_interval,
+    )
+    try:
+        return await ingester.run(iter_sources(args.target), count_sources(args.target))
+    finally:
+        checkpoint.close()
+        await service.aclose()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("target", help="Directory of .pdf/.txt files, or a JSONL file of documents")
+    parser.add_argument("--checkpoint", default="ingest_checkpoint.jsonl", help="Completed-document log used to resume")
+    parser.add_argument("--restart", action="store_true", help="Ignore and overwrite an existing checkpoint")
+    parser.add_argument("--workers", type=int, default=0, help="Parser processes (0 = CPU count)")
+    parser.add_argument("--embed-batch-size", type=int, default=256, help="Chunks per embedding call")
+    parser.add_argument("--embed-concurrency", type=int, default=4, help="Embedding calls in flight")
+    parser.add_argument("--upsert-batch-size", type=int, default=1024, help="Points per vector store upsert")
+    parser.add_argument("--progress-interval", type=float, default=10.0, help="Seconds between progress lines")
+    args = parser.parse_args(argv)
+
+    try:
+        summary = asyncio.run(_ingest(args))
+    except KeyboardInterrupt:
+        print(f"⚠️  Interrupted; completed documents are recorded in {args.checkpoint}, re-run to resume")
+        return 130
+    print(json.dumps(summary, indent=2))
+    return 1 if summary["documents_failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
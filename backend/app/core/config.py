@@ -3,8 +3,21 @@ Centralized application configuration.
 """
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from pydantic import Field
-from typing import List, Optional
+from pydantic import Field, field_validator
+from typing import Dict, List, Optional
+
+# Index types accepted in PAYLOAD_INDEX_FIELDS (mapped to Qdrant schemas by the vector store)
+PAYLOAD_INDEX_TYPES = ("keyword", "tenant", "integer", "float", "bool")
+
+
+def parse_payload_index_fields(value: str) -> Dict[str, str]:
+    """Parse "field:type,..." into {field: index type}; the type defaults to keyword."""
+    fields = {}
+    for entry in value.split(","):
+        if entry.strip():
+            name, _, kind = entry.partition(":")
+            fields[name.strip()] = (kind.strip() or "keyword").lower()
+    return fields
 
 
 class Settings(BaseSettings):
@@ -21,7 +34,7 @@ class Settings(BaseSettings):
     # === Embedding Provider Configuration ===
     EMBEDDING_PROVIDER: str = Field(
         "jina",
-        description="Embedding provider: 'jina', 'cohere', 'voyage', or 'huggingface'"
+        description="Embedding provider: 'jina', 'cohere', 'voyage', 'huggingface', or 'local'"
     )
     
     # === Jina AI (Recommended for free tier) ===
@@ -30,6 +43,9 @@ class Settings(BaseSettings):
         "jina-embeddings-v3",
         description="Jina embedding model (jina-embeddings-v3 or jina-embeddings-v2-base-en)"
     )
+    JINA_API_URL: str = Field(
+        "https://api.jina.ai/v1/embeddings", description="Jina embeddings endpoint (override for proxies or stubs)"
+    )
     
     # === HuggingFace (Legacy - not recommended for free tier) ===
     HF_API_KEY: Optional[str] = Field(None, description="HuggingFace API key")
@@ -44,13 +60,178 @@ class Settings(BaseSettings):
     # === Voyage AI (Alternative) ===
     VOYAGE_API_KEY: Optional[str] = Field(None, description="Voyage AI API key")
 
+    # === Local ONNX Embeddings (EMBEDDING_PROVIDER=local) ===
+    LOCAL_EMBEDDING_MODEL_PATH: Optional[str] = Field(
+        None, description="Directory with model.onnx, tokenizer.json and config.json"
+    )
+    LOCAL_EMBEDDING_MAX_LENGTH: int = Field(512, description="Max tokens per text; longer texts are truncated")
+    LOCAL_EMBEDDING_BATCH_SIZE: int = Field(32, description="Texts per padded inference batch")
+    LOCAL_EMBEDDING_WORKERS: int = Field(0, description="Inference threads running batches in parallel (0 = CPU count)")
+    LOCAL_EMBEDDING_POOLING: str = Field("mean", description="Token pooling: 'mean' or 'cls'")
+    LOCAL_EMBEDDING_QUERY_PREFIX: str = Field("", description="Prepended to queries (e.g. 'query: ' for E5 models)")
+    LOCAL_EMBEDDING_DOCUMENT_PREFIX: str = Field("", description="Prepended to documents (e.g. 'passage: ')")
+
+    # === Embedding Output ===
+    EMBEDDING_DIMENSIONS: Optional[int] = Field(
+        None,
+        description="Reduced vector size (Matryoshka truncation); jina-embeddings-v3 truncates "
+                    "server-side, other providers are truncated and re-normalized client-side. "
+                    "Changing it needs a new collection"
+    )
+
+    # === Embedding Batching ===
+    EMBEDDING_BATCH_SIZE: Optional[int] = Field(
+        None,
+        description="Max texts per provider request (defaults to a provider-specific limit)"
+    )
+    EMBEDDING_BATCH_MAX_CHARS: int = Field(
+        60000, description="Max total characters per provider request"
+    )
+    EMBEDDING_MAX_CONCURRENCY: int = Field(
+        4, description="Max provider requests in flight for one embed_texts call"
+    )
+
+    # === Embedding Rate Limiting / Failover ===
+    EMBEDDING_RATE_LIMIT_RPM: Optional[float] = Field(
+        None, description="Provider request quota per minute (None = unlimited)"
+    )
+    EMBEDDING_RATE_LIMIT_TPM: Optional[float] = Field(
+        None, description="Provider token quota per minute, estimated at ~4 characters per token (None = unlimited)"
+    )
+    EMBEDDING_ADAPTIVE_MAX_CONCURRENCY: int = Field(
+        16, description="Ceiling on provider requests in flight across all callers; backs off on 429/5xx"
+    )
+    EMBEDDING_MAX_RETRIES: int = Field(5, description="Retries for throttled, 5xx or network-failed requests")
+    EMBEDDING_RETRY_BASE_DELAY: float = Field(0.5, description="Base of the jittered exponential retry delay (s)")
+    EMBEDDING_RETRY_MAX_DELAY: float = Field(30.0, description="Cap on a single retry delay, incl. Retry-After (s)")
+    EMBEDDING_FALLBACK_PROVIDER: Optional[str] = Field(
+        None, description="Secondary provider used once the primary exhausts its retries; must produce compatible vectors"
+    )
+    EMBEDDING_FAILOVER_COOLDOWN_SECONDS: float = Field(
+        60.0, description="After a failover, send requests to the fallback for this long before retrying the primary"
+    )
+
+    # === Query Micro-batching ===
+    QUERY_BATCH_WINDOW_MS: float = Field(
+        5.0, description="Wait this long to coalesce concurrent query embeddings (0 disables)"
+    )
+    QUERY_BATCH_MAX_SIZE: int = Field(32, description="Flush a query batch early once it has this many texts")
+
+    # === Embedding Cache ===
+    EMBEDDING_CACHE_ENABLED: bool = Field(True, description="Cache embeddings by content hash")
+    EMBEDDING_CACHE_SIZE: int = Field(10000, description="Max vectors kept in the in-memory LRU tier")
+    EMBEDDING_CACHE_PATH: Optional[str] = Field(
+        None,
+        description="Optional SQLite file for a persistent cache tier (e.g. embedding_cache.db)"
+    )
+
+    # === Semantic Answer Cache ===
+    ANSWER_CACHE_ENABLED: bool = Field(True, description="Serve near-duplicate questions from cache")
+    ANSWER_CACHE_THRESHOLD: float = Field(
+        0.95, description="Min cosine similarity between queries to reuse an answer"
+    )
+    ANSWER_CACHE_SIZE: int = Field(1000, description="Max cached answers")
+    ANSWER_CACHE_TTL_SECONDS: float = Field(3600, description="Cached answer lifetime (0 = no expiry)")
+
     # === Chunking ===
     CHUNK_SIZE: int = 1000
     CHUNK_OVERLAP: int = 100
+    CHUNK_TOKENIZER_PATH: Optional[str] = Field(
+        None, description="tokenizer.json to measure CHUNK_SIZE/CHUNK_OVERLAP in tokens instead of characters"
+    )
+
+    # === PDF Parsing ===
+    PDF_PARSE_WORKERS: int = Field(0, description="Processes for parallel PDF extraction (0 = CPU count)")
+    PDF_PARALLEL_MIN_PAGES: int = Field(16, description="PDFs with fewer pages are extracted serially")
+    PDF_PAGES_PER_SHARD: int = Field(8, description="Pages extracted per worker task")
+
+    # === Document Registry ===
+    DOCUMENT_REGISTRY_PATH: str = Field(
+        "document_registry.db", description="SQLite file mapping documents to their chunk IDs"
+    )
+
+    # === Upload Ingestion ===
+    UPLOAD_CHUNK_BYTES: int = Field(1024 * 1024, description="Bytes read per step when streaming uploads to disk")
+    INGEST_QUEUE_SIZE: int = Field(4, description="Max items buffered between ingestion pipeline stages")
+    INGEST_EMBED_BATCH_SIZE: int = Field(64, description="Chunks embedded per batch during ingestion")
+
+    # === Vector Store Backend ===
+    VECTOR_STORE_BACKEND: str = Field("qdrant", description="Vector store backend: 'qdrant' or 'local'")
+    LOCAL_VECTOR_STORE_PATH: str = Field(
+        "vector_store", description="Directory for the in-process memory-mapped vector store"
+    )
 
     # === Qdrant Vector DB ===
     QDRANT_URL: str = Field("http://localhost:6333", description="Qdrant endpoint URL")
     QDRANT_API_KEY: Optional[str] = Field(None, description="Optional Qdrant API key")
+    QDRANT_PREFER_GRPC: bool = Field(
+        False, description="Talk to Qdrant over gRPC (vectors travel as packed float32 instead of JSON)"
+    )
+    QDRANT_GRPC_PORT: int = Field(6334, description="Qdrant gRPC port, used when QDRANT_PREFER_GRPC is set")
+    QDRANT_HNSW_M: int = Field(16, description="HNSW graph degree used when creating the collection")
+    QDRANT_HNSW_EF_CONSTRUCT: int = Field(100, description="HNSW build-time candidate list size")
+    QDRANT_SEARCH_EF: Optional[int] = Field(None, description="HNSW search-time ef (None = server default)")
+    QDRANT_QUANTIZATION: str = Field("none", description="Vector quantization: 'none', 'scalar' or 'binary'")
+    QDRANT_QUANTIZATION_RESCORE: bool = Field(True, description="Rescore quantized candidates with original vectors")
+    QDRANT_QUANTIZATION_OVERSAMPLING: float = Field(2.0, description="Candidate oversampling for rescoring")
+    QDRANT_ON_DISK: bool = Field(False, description="Store original vectors on disk (memmap) instead of RAM")
+
+    # === Metadata Filtering ===
+    PAYLOAD_INDEX_FIELDS: str = Field(
+        "document_id:keyword,source:keyword,page:integer",
+        description="Comma-separated field:type payload indexes created at collection bootstrap "
+                    "(keyword, tenant, integer, float, bool); only these fields can be filtered on"
+    )
+
+    # === Hybrid Retrieval (dense + BM25 sparse, fused with RRF) ===
+    HYBRID_SEARCH_ENABLED: bool = Field(
+        False, description="Store BM25 sparse vectors and fuse them with dense results (needs a new collection)"
+    )
+    HYBRID_PREFETCH_LIMIT: int = Field(20, description="Candidates fetched from each retriever before fusion")
+    SPARSE_STATS_PATH: str = Field("sparse_stats.db", description="SQLite file holding BM25 term statistics")
+    BM25_K1: float = Field(1.2, description="BM25 term-frequency saturation")
+    BM25_B: float = Field(0.75, description="BM25 length normalization")
+
+    # === Post-retrieval (MMR / Reranking) ===
+    RETRIEVAL_OVERSAMPLE: int = Field(
+        4, description="Fetch top_k x this many candidates for MMR/reranking (1 disables the stage)"
+    )
+    MMR_LAMBDA: float = Field(0.7, description="MMR trade-off: 1.0 = pure relevance, lower = more diversity")
+    RERANKER: Optional[str] = Field(
+        None, description="Optional 'package.module:function' scoring (query, passages) -> scores"
+    )
+
+    # === Answer Context ===
+    CONTEXT_MAX_TOKENS: int = Field(
+        4000, description="Token budget for retrieved context in the prompt (0 = no limit)"
+    )
+
+    # === Batch Search ===
+    BATCH_SEARCH_MAX_QUERIES: int = Field(
+        256, description="Most queries accepted by one /rag/search/batch request"
+    )
+    BATCH_ANSWER_CONCURRENCY: int = Field(
+        4, description="Answers generated concurrently for one batch search request"
+    )
+
+    # === Startup / Readiness ===
+    SERVICE_READY_TIMEOUT_SECONDS: float = Field(
+        30.0, description="How long a request waits for the RAG service to finish warming up before a 503"
+    )
+    SERVICE_WARMUP_RETRY_MAX_SECONDS: float = Field(
+        30.0, description="Max backoff between warm-up attempts while a dependency is unavailable"
+    )
+
+    # === Query Log / Cache Warm-up ===
+    QUERY_LOG_ENABLED: bool = Field(True, description="Count normalized queries for the startup warm-up")
+    QUERY_LOG_PATH: str = Field("query_log.db", description="SQLite file holding query frequency counts")
+    QUERY_LOG_MAX_ENTRIES: int = Field(10000, description="Distinct queries kept in the log (least frequent dropped)")
+    WARMUP_QUERIES: int = Field(
+        50, description="Most frequent logged queries pre-embedded and pre-searched before readiness (0 = off)"
+    )
+    WARMUP_TIMEOUT_SECONDS: float = Field(
+        60.0, description="Give up on the cache warm-up (and report ready) after this long"
+    )
 
     # === CORS / Frontend ===
     CORS_ORIGINS: str = "http://localhost:5173,https://your-vercel-app.vercel.app"
@@ -76,20 +257,58 @@ class Settings(BaseSettings):
         """Split CORS_ORIGINS env into list automatically."""
         return [origin.strip() for origin in self.CORS_ORIGINS.split(",") if origin.strip()]
     
+    @field_validator("PAYLOAD_INDEX_FIELDS")
+    @classmethod
+    def _check_payload_index_types(cls, value: str) -> str:
+        """Reject unknown index types at startup rather than on every collection bootstrap."""
+        for field, kind in parse_payload_index_fields(value).items():
+            if kind not in PAYLOAD_INDEX_TYPES:
+                raise ValueError(
+                    f"Unsupported payload index type '{kind}' for '{field}'. "
+                    f"Supported: {', '.join(PAYLOAD_INDEX_TYPES)}"
+                )
+        return value
+
+    @property
+    def payload_index_fields(self) -> Dict[str, str]:
+        """Parse PAYLOAD_INDEX_FIELDS into {field: index type}."""
+        return parse_payload_index_fields(self.PAYLOAD_INDEX_FIELDS)
+
     @property
     def embedding_dimension(self) -> int:
         """Return embedding dimension based on provider and model."""
-        if self.EMBEDDING_PROVIDER == "jina":
+        return self.dimension_for(self.EMBEDDING_PROVIDER)
+
+    def dimension_for(self, provider: str) -> int:
+        """Embedding dimension of the given provider, after EMBEDDING_DIMENSIONS truncation."""
+        native = self.native_dimension_for(provider)
+        if self.EMBEDDING_DIMENSIONS is None:
+            return native
+        if not 0 < self.EMBEDDING_DIMENSIONS <= native:
+            raise ValueError(
+                f"EMBEDDING_DIMENSIONS must be between 1 and {native} for the '{provider}' provider"
+            )
+        return self.EMBEDDING_DIMENSIONS
+
+    def native_dimension_for(self, provider: str) -> int:
+        """Full embedding dimension of the given provider with the configured models."""
+        provider = provider.lower()
+        if provider == "jina":
             if "v3" in self.JINA_MODEL_NAME:
                 return 1024  # jina-embeddings-v3
             else:
                 return 768   # jina-embeddings-v2
-        elif self.EMBEDDING_PROVIDER == "cohere":
+        elif provider == "cohere":
             return 1024
-        elif self.EMBEDDING_PROVIDER == "voyage":
+        elif provider == "voyage":
             return 1024
-        elif self.EMBEDDING_PROVIDER == "huggingface":
+        elif provider == "huggingface":
             return 384  # Default for sentence-transformers
+        elif provider == "local":
+            from app.services.onnx_embedder import read_model_dimension
+            if not self.LOCAL_EMBEDDING_MODEL_PATH:
+                raise ValueError("LOCAL_EMBEDDING_MODEL_PATH is required when using the local provider")
+            return read_model_dimension(self.LOCAL_EMBEDDING_MODEL_PATH)
         else:
             return 768  # Safe default
 
@@ -0,0 +1,204 @@
+"""
+Lightweight in-process metrics: per-stage latency, batch and payload size histograms.
+
+Rendered in Prometheus text format at /metrics. Each request also collects its
+own stage durations for the Server-Timing response header. Recording a sample
+is a bisect plus a few integer updates under a lock, cheap enough to leave on.
+"""
+
+import asyncio
+import functools
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096)
+BYTE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+# Stage durations (seconds) accumulated for the current HTTP request
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1):
+        with self._lock:
+            self.value += amount
+
+
+class _Metric(ABC):
+    """A metric family with one label; children are created once per label value."""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, label: str):
+        self.name = name
+        self.documentation = documentation
+        self.label = label
+        self._children: Dict[str, object] = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def labels(self, value: str):
+        child = self._children.get(value)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(value, self._new_child())
+        return child
+
+    @abstractmethod
+    def _new_child(self):
+        """Create the child that records samples for one label value."""
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, label: str, buckets: Sequence[float]):
+        super().__init__(name, documentation, label)
+        self.buckets = tuple(buckets)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        for value, child in sorted(self._children.items()):
+            with child._lock:
+                counts, total, count = list(child.counts), child.sum, child.count
+            cumulative = 0
+            for bound, bucket_count in zip(list(self.buckets) + ["+Inf"], counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{self.label}="{value}",le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{self.label}="{value}"}} {total}')
+            lines.append(f'{self.name}_count{{{self.label}="{value}"}} {count}')
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        for value, child in sorted(self._children.items()):
+            lines.append(f'{self.name}{{{self.label}="{value}"}} {child.value}')
+        return lines
+
+
+REGISTRY: List[_Metric] = []
+
+STAGE_SECONDS = Histogram(
+    "rag_stage_duration_seconds", "Time spent in each pipeline stage.", "stage", LATENCY_BUCKETS
+)
+HTTP_SECONDS = Histogram(
+    "rag_http_request_duration_seconds", "HTTP request duration by route.", "route", LATENCY_BUCKETS
+)
+BATCH_SIZE = Histogram("rag_batch_size", "Items per batch sent to a backend.", "kind", SIZE_BUCKETS)
+PAYLOAD_BYTES = Histogram("rag_payload_bytes", "Size of payloads handled per operation.", "kind", BYTE_BUCKETS)
+ERRORS = Counter("rag_errors_total", "Errors raised per pipeline stage.", "stage")
+
+
+def record_stage(stage: str, started: float, per_request: bool = True) -> float:
+    """
+    Observe the time since `started` (a time.perf_counter() value) for a stage
+    and, unless per_request is False, add it to the current request's
+    Server-Timing. Returns the seconds elapsed.
+    """
+    elapsed = time.perf_counter() - started
+    STAGE_SECONDS.labels(stage).observe(elapsed)
+    if per_request:
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + elapsed
+    return elapsed
+
+
+def record_error(stage: str):
+    ERRORS.labels(stage).inc()
+
+
+def timed(stage: str, per_request: bool = True) -> Callable:
+    """
+    Decorator recording a function's duration under `stage` and counting its errors.
+    Works for both sync and async functions.
+    """
+    def decorator(fn: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                except Exception:
+                    record_error(stage)
+                    raise
+                finally:
+                    record_stage(stage, started, per_request)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                record_error(stage)
+                raise
+            finally:
+                record_stage(stage, started, per_request)
+        return wrapper
+    return decorator
+
+
+def begin_request() -> Dict[str, float]:
+    """Start collecting stage timings for the current request context."""
+    timings: Dict[str, float] = {}
+    _request_timings.set(timings)
+    return timings
+
+
+def server_timing_header(timings: Dict[str, float], total: float) -> str:
+    entries = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items()]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+def render_metrics() -> str:
+    """All registered metrics in Prometheus text exposition format."""
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
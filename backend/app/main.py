@@ -1,14 +1,26 @@
-from fastapi import FastAPI
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.core.logger import setup_logger
-from app.api import health, rag
+from app.core.metrics import HTTP_SECONDS, begin_request, record_error, server_timing_header
+from app.api import health, metrics, rag
+from app.services.service_manager import service_manager
 
 # Initialize logger before app creation
 setup_logger()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build clients in the background so /health answers while Qdrant/Gemini are still connecting
+    service_manager.start()
+    yield
+    # Close pooled HTTP/Qdrant connections on shutdown
+    await service_manager.aclose()
+
 # Create FastAPI instance
-app = FastAPI(title="RAG API", version="0.1.0")
+app = FastAPI(title="RAG API", version="0.1.0", lifespan=lifespan)
 
 # Allow frontend connection (Vercel or localhost)
 app.add_middleware(
@@ -19,9 +31,38 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def server_timing(request: Request, call_next):
+    """
+    Record request latency per route and report the stages that ran
+    (embedding, search, generation, ...) in a Server-Timing header.
+    """
+    started = time.perf_counter()
+    timings = begin_request()
+    try:
+        response = await call_next(request)
+    except Exception:
+        record_error("http")
+        raise
+    elapsed = time.perf_counter() - started
+    HTTP_SECONDS.labels(_route_label(request)).observe(elapsed)
+    response.headers["Server-Timing"] = server_timing_header(timings, elapsed)
+    return response
+
+def _route_label(request: Request) -> str:
+    """Path template such as /rag/jobs/{job_id}, keeping metric label cardinality bounded."""
+    route = request.scope.get("route")
+    if route is None:
+        return "unmatched"
+    # FastAPI versions that include routers lazily keep the unprefixed route in
+    # scope["route"] and record the full template alongside it
+    effective = request.scope.get("fastapi", {}).get("effective_route_context")
+    return getattr(effective, "path", None) or route.path
+
 # Register routers
 app.include_router(health.router, prefix="/health", tags=["health"])
 app.include_router(rag.router, prefix="/rag", tags=["rag"])
+app.include_router(metrics.router, tags=["metrics"])
 
 # Root endpoint (optional)
 @app.get("/")
@@ -0,0 +1,140 @@
+"""
+Semantic answer cache.
+Reuses generated answers for near-duplicate questions, matched by query embedding.
+"""
+
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+class CachedAnswer:
+    """
+    A generated answer together with the retrieval state it was produced from.
+    """
+    def __init__(self, vector: np.ndarray, context_ids: List[str], result: Dict[str, Any], version: int):
+        self.vector = vector
+        self.context_ids = context_ids
+        self.result = result
+        self.version = version
+        self.created_at = time.monotonic()
+
+
+class SemanticAnswerCache:
+    """
+    Stores answers keyed by normalized query vectors.
+
+    A lookup returns the most similar cached query above `threshold` (cosine).
+    The collection `version` is bumped whenever documents are indexed; an entry
+    from an older version is only reusable if retrieval still returns the same
+    context chunk IDs, which the caller checks with `is_fresh`.
+    """
+
+    def __init__(self, threshold: float = 0.95, max_entries: int = 1000, ttl_seconds: float = 3600):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.version = 0
+
+        self._entries: "OrderedDict[int, CachedAnswer]" = OrderedDict()
+        self._ids = itertools.count()
+        self._matrix: Optional[np.ndarray] = None
+        self._matrix_keys: List[int] = []
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(self, query_vector) -> Optional[CachedAnswer]:
+        """
+        Return the closest cached answer within the similarity threshold, if any.
+        """
+        vector = self._normalize(query_vector)
+        with self._lock:
+            self._expire()
+            if not self._entries:
+                return None
+
+            if self._matrix is None:
+                self._matrix_keys = list(self._entries.keys())
+                self._matrix = np.stack([self._entries[k].vector for k in self._matrix_keys])
+
+            scores = self._matrix @ vector
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                return None
+
+            key = self._matrix_keys[best]
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def is_fresh(self, entry: CachedAnswer, context_ids: Optional[List[str]] = None) -> bool:
+        """
+        An entry is usable if the collection is unchanged since it was stored,
+        or if the current retrieval returned exactly the same chunks.
+        """
+        if entry.version == self.version:
+            return True
+        if context_ids is not None and context_ids == entry.context_ids:
+            entry.version = self.version
+            return True
+        return False
+
+    def store(self, query_vector, context_ids: List[str], result: Dict[str, Any]):
+        """
+        Remember a generated answer for the given query vector.
+        """
+        entry = CachedAnswer(self._normalize(query_vector), list(context_ids), result, self.version)
+        with self._lock:
+            self._entries[next(self._ids)] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._matrix = None
+
+    def invalidate(self):
+        """
+        Mark the collection as changed; older entries now need a context match.
+        """
+        self.version += 1
+
+    def record(self, hit: bool):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def _expire(self):
+        if not self.ttl_seconds:
+            return
+        cutoff = time.monotonic() - self.ttl_seconds
+        expired = [k for k, e in self._entries.items() if e.created_at < cutoff]
+        for key in expired:
+            del self._entries[key]
+            self.evictions += 1
+        if expired:
+            self._matrix = None
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm else array
@@ -0,0 +1,74 @@
+"""
+Document registry for incremental re-indexing.
+Remembers which chunk point IDs belong to which document.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import uuid
+from typing import Dict, Iterable, Set
+
+# Namespace for deterministic chunk point IDs
+CHUNK_ID_NAMESPACE = uuid.UUID("6f1c3b52-7a0e-4f8e-9b7d-2c1f0a4e5d93")
+
+
+def make_document_id(text: str) -> str:
+    """
+    Derive a stable document ID from its content, used when the caller gives none.
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+
+def make_chunk_id(document_id: str, content: str) -> str:
+    """
+    Derive a deterministic point ID from (document ID, chunk content hash),
+    so re-indexing unchanged chunks overwrites instead of duplicating them.
+    """
+    content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    return str(uuid.uuid5(CHUNK_ID_NAMESPACE, f"{document_id}:{content_hash}"))
+
+
+class DocumentRegistry:
+    """
+    SQLite-backed mapping of document ID -> chunk point IDs.
+    """
+
+    def __init__(self, db_path: str = "document_registry.db"):
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "document_id TEXT NOT NULL, chunk_id TEXT NOT NULL, "
+            "PRIMARY KEY (document_id, chunk_id))"
+        )
+        self._db.commit()
+
+    def get_chunk_ids(self, document_id: str) -> Set[str]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT chunk_id FROM chunks WHERE document_id = ?", (document_id,)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def replace(self, document_id: str, chunk_ids: Iterable[str]):
+        """
+        Record the full, current set of chunk IDs for a document.
+        """
+        self.replace_many({document_id: chunk_ids})
+
+    def replace_many(self, documents: Dict[str, Iterable[str]]):
+        """
+        Like replace, for several documents in a single transaction.
+        """
+        with self._lock:
+            for document_id, chunk_ids in documents.items():
+                self._db.execute("DELETE FROM chunks WHERE document_id = ?", (document_id,))
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO chunks (document_id, chunk_id) VALUES (?, ?)",
+                    [(document_id, chunk_id) for chunk_id in chunk_ids],
+                )
+            self._db.commit()
+
+    def close(self):
+        self._db.close()
@@ -1,21 +1,59 @@
 """
 Unified embedding service supporting multiple providers.
-Supports: Jina AI, Cohere, Voyage AI, and HuggingFace
+Supports: Jina AI, Cohere, Voyage AI, HuggingFace, and local ONNX models
+
+Vectors are returned as float32 NumPy arrays, one row per text.
 """
 
+import asyncio
+import base64
+import time
+import httpx
+import numpy as np
 import requests
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
 from app.core.config import settings
+from app.core.metrics import BATCH_SIZE, PAYLOAD_BYTES, record_error, timed
+from app.services.embedding_cache import EmbeddingCache
+from app.services.rate_limit import ProviderError, ProviderLimiter, estimate_tokens, parse_retry_after
+from app.utils.batching import make_batches
+
+# Default max texts per request for each provider's embedding API
+PROVIDER_BATCH_SIZES = {
+    "jina": 128,
+    "cohere": 96,
+    "voyage": 128,
+    "huggingface": 1,
+    "local": 1024,  # the ONNX embedder re-batches by token length internally
+}
 
 
 class EmbeddingService:
     """
     Unified embedding service that supports multiple providers.
     Provider is selected via EMBEDDING_PROVIDER in config.
+
+    Remote calls go through a ProviderLimiter (quotas, adaptive concurrency,
+    retries). If EMBEDDING_FALLBACK_PROVIDER is set, batches the primary
+    cannot serve after its retries are sent to the fallback instead; rejected
+    requests (4xx other than 408/425/429) are raised, not failed over.
+
+    With EMBEDDING_DIMENSIONS set, vectors are reduced to that many leading
+    components (server-side where the provider supports it).
+
+    Vectors served by the fallback are never cached: the two models do not
+    share a vector space, so they must not be reused once the primary is back.
+    The *_with_providers variants report which provider embedded each text.
     """
 
-    def __init__(self):
-        self.provider = settings.EMBEDDING_PROVIDER.lower()
+    def __init__(self, provider: Optional[str] = None, primary: bool = True):
+        """
+        provider defaults to EMBEDDING_PROVIDER. Only the primary service owns
+        the cache and the fallback; a fallback instance has neither.
+        """
+        self.provider = (provider or settings.EMBEDDING_PROVIDER).lower()
+        self.dimension = settings.dimension_for(self.provider)
         
         # Initialize provider-specific client
         if self.provider == "jina":
@@ -26,12 +64,67 @@ class EmbeddingService:
             self._init_voyage()
         elif self.provider == "huggingface":
             self._init_huggingface()
+        elif self.provider == "local":
+            self._init_local()
         else:
             raise ValueError(
                 f"Unsupported embedding provider: {self.provider}. "
-                f"Supported: 'jina', 'cohere', 'voyage', 'huggingface'"
+                f"Supported: 'jina', 'cohere', 'voyage', 'huggingface', 'local'"
             )
 
+        self.batch_size = settings.EMBEDDING_BATCH_SIZE or PROVIDER_BATCH_SIZES[self.provider]
+        # The character cap bounds HTTP payloads; local inference needs no such limit
+        self.batch_max_chars = (
+            settings.EMBEDDING_BATCH_MAX_CHARS if self.provider != "local" else float("inf")
+        )
+        # Reduced vectors must not be served from cache entries of full-size ones
+        self.cache_model = self.model if settings.EMBEDDING_DIMENSIONS is None else f"{self.model}:{self.dimension}"
+        self.max_concurrency = max(1, settings.EMBEDDING_MAX_CONCURRENCY)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency,
+            thread_name_prefix="embed"
+        )
+
+        # Quotas, adaptive concurrency and retries for remote providers
+        self.limiter = None
+        if self.provider != "local":
+            self.limiter = ProviderLimiter(
+                self.provider,
+                requests_per_minute=settings.EMBEDDING_RATE_LIMIT_RPM if primary else None,
+                tokens_per_minute=settings.EMBEDDING_RATE_LIMIT_TPM if primary else None,
+                max_concurrency=settings.EMBEDDING_ADAPTIVE_MAX_CONCURRENCY,
+                max_retries=settings.EMBEDDING_MAX_RETRIES,
+                retry_base_delay=settings.EMBEDDING_RETRY_BASE_DELAY,
+                retry_max_delay=settings.EMBEDDING_RETRY_MAX_DELAY
+            )
+
+        self.cache = None
+        if primary and settings.EMBEDDING_CACHE_ENABLED:
+            self.cache = EmbeddingCache(
+                max_entries=settings.EMBEDDING_CACHE_SIZE,
+                db_path=settings.EMBEDDING_CACHE_PATH
+            )
+
+        self.fallback: Optional["EmbeddingService"] = None
+        self.failovers = 0
+        self._failover_until = 0.0
+        if primary and settings.EMBEDDING_FALLBACK_PROVIDER:
+            self.fallback = self._init_fallback(settings.EMBEDDING_FALLBACK_PROVIDER)
+
+    def _init_fallback(self, provider: str) -> "EmbeddingService":
+        """Initialize the failover provider; its vectors must share the primary's dimension."""
+        if provider.lower() == self.provider:
+            raise ValueError("EMBEDDING_FALLBACK_PROVIDER must differ from EMBEDDING_PROVIDER")
+        primary_dim, fallback_dim = settings.dimension_for(self.provider), settings.dimension_for(provider)
+        if primary_dim != fallback_dim:
+            raise ValueError(
+                f"Fallback provider '{provider}' produces {fallback_dim}D vectors "
+                f"but '{self.provider}' produces {primary_dim}D"
+            )
+        fallback = EmbeddingService(provider=provider, primary=False)
+        print(f"✅ Embedding failover configured: {self.provider} -> {fallback.provider}")
+        return fallback
+
     def _init_jina(self):
         """Initialize Jina AI embeddings."""
         if not settings.JINA_API_KEY:
@@ -39,7 +132,16 @@ class EmbeddingService:
         
         self.api_key = settings.JINA_API_KEY
         self.model = settings.JINA_MODEL_NAME
-        self.api_url = "https://api.jina.ai/v1/embeddings"
+        self.api_url = settings.JINA_API_URL
+        self.headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}"
+        }
+        # Pooled keep-alive connections; the async client is created lazily
+        # inside the running event loop
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self._async_http: httpx.AsyncClient | None = None
         
         print(f"✅ Jina AI Embeddings initialized with model: {self.model}")
 
@@ -85,90 +187,362 @@ class EmbeddingService:
         except ImportError:
             raise ImportError("Please install huggingface-hub: pip install huggingface-hub")
 
-    def embed_text(self, text: str) -> List[float]:
+    def _init_local(self):
+        """Initialize local ONNX embeddings (no network calls)."""
+        if not settings.LOCAL_EMBEDDING_MODEL_PATH:
+            raise ValueError("LOCAL_EMBEDDING_MODEL_PATH is required when using the local provider")
+
+        from app.services.onnx_embedder import OnnxEmbedder
+        self.embedder = OnnxEmbedder(
+            settings.LOCAL_EMBEDDING_MODEL_PATH,
+            max_length=settings.LOCAL_EMBEDDING_MAX_LENGTH,
+            batch_size=settings.LOCAL_EMBEDDING_BATCH_SIZE,
+            workers=settings.LOCAL_EMBEDDING_WORKERS,
+            pooling=settings.LOCAL_EMBEDDING_POOLING
+        )
+        self.model = settings.LOCAL_EMBEDDING_MODEL_PATH
+        print(f"✅ Local ONNX Embeddings initialized from {self.model} ({self.embedder.dimension}D)")
+
+    def embed_text(self, text: str, input_type: str = "search_document") -> np.ndarray:
         """
         Generate embedding for a single text.
         
         Args:
             text: Input text to embed
+            input_type: "search_document" for indexed content, "search_query" for queries
             
         Returns:
-            List of floats representing the embedding vector
+            float32 array of shape (dimension,)
         """
-        if self.provider == "jina":
-            return self._embed_jina([text])[0]
-        elif self.provider == "cohere":
-            return self._embed_cohere([text])[0]
-        elif self.provider == "voyage":
-            return self._embed_voyage([text])[0]
-        elif self.provider == "huggingface":
-            return self._embed_huggingface_single(text)
+        return self.embed_texts([text], input_type=input_type)[0]
 
-    def embed_texts(self, texts: List[str]) -> List[List[float]]:
+    def embed_texts(self, texts: List[str], input_type: str = "search_document") -> np.ndarray:
         """
         Generate embeddings for multiple texts (batch processing).
+
+        Cached vectors are reused; only cache misses are sent to the provider
+        and the results are stitched back in input order.
         
         Args:
             texts: List of input texts to embed
+            input_type: "search_document" for indexed content, "search_query" for queries
             
         Returns:
-            List of embedding vectors
+            float32 array of shape (len(texts), dimension)
+        """
+        return self.embed_texts_with_providers(texts, input_type)[0]
+
+    def embed_texts_with_providers(
+        self, texts: List[str], input_type: str = "search_document"
+    ) -> Tuple[np.ndarray, List[str]]:
+        """
+        Like embed_texts, also returning the provider that embedded each text
+        (the fallback's name for texts embedded during a failover).
         """
+        if not texts:
+            return np.empty((0, self.dimension), dtype=np.float32), []
+        if self.cache is None:
+            return self._embed_uncached(texts, input_type)
+
+        keys, found, pending = self._cache_lookup(texts, input_type)
+        served: Dict[str, str] = {}
+        if pending:
+            vectors, providers = self._embed_uncached(list(pending.values()), input_type)
+            served = self._cache_store(pending, vectors, providers, found)
+        return self._from_cache(keys, found, served)
+
+    async def aembed_text(self, text: str, input_type: str = "search_document") -> np.ndarray:
+        """
+        Async variant of embed_text.
+        """
+        return (await self.aembed_texts([text], input_type=input_type))[0]
+
+    async def aembed_texts(self, texts: List[str], input_type: str = "search_document") -> np.ndarray:
+        """
+        Async variant of embed_texts. Batches are dispatched concurrently on the
+        event loop, bounded by EMBEDDING_MAX_CONCURRENCY.
+        """
+        return (await self.aembed_texts_with_providers(texts, input_type))[0]
+
+    async def aembed_texts_with_providers(
+        self, texts: List[str], input_type: str = "search_document"
+    ) -> Tuple[np.ndarray, List[str]]:
+        """
+        Async variant of embed_texts_with_providers.
+        """
+        if not texts:
+            return np.empty((0, self.dimension), dtype=np.float32), []
+        if self.cache is None:
+            return await self._aembed_uncached(texts, input_type)
+
+        keys, found, pending = self._cache_lookup(texts, input_type)
+        served: Dict[str, str] = {}
+        if pending:
+            vectors, providers = await self._aembed_uncached(list(pending.values()), input_type)
+            served = self._cache_store(pending, vectors, providers, found)
+        return self._from_cache(keys, found, served)
+
+    async def aclose(self):
+        """
+        Release pooled HTTP connections.
+        """
+        if self.provider == "local":
+            self.embedder.close()
+        elif self.provider == "jina":
+            self.session.close()
+            if self._async_http is not None:
+                await self._async_http.aclose()
+                self._async_http = None
+        if self.fallback is not None:
+            await self.fallback.aclose()
+
+    def cache_stats(self) -> Dict[str, int]:
+        """
+        Return embedding cache counters (empty if caching is disabled).
+        """
+        return self.cache.stats() if self.cache is not None else {}
+
+    def limiter_stats(self) -> Dict[str, Any]:
+        """
+        Return rate limiter counters per provider, plus failovers if a fallback is configured.
+        """
+        stats: Dict[str, Any] = {}
+        if self.limiter is not None:
+            stats[self.provider] = self.limiter.stats()
+        if self.fallback is not None:
+            stats.update(self.fallback.limiter_stats())
+            stats["failovers"] = self.failovers
+        return stats
+
+    def _cache_lookup(
+        self, texts: List[str], input_type: str
+    ) -> Tuple[List[str], Dict[str, np.ndarray], Dict[str, str]]:
+        """
+        Resolve texts against the cache.
+        Returns (keys in input order, cached vectors by key, distinct missing texts by key).
+        """
+        keys = [EmbeddingCache.make_key(self.provider, self.cache_model, input_type, t) for t in texts]
+        found = self.cache.get_many(keys)
+
+        # Embed each distinct missing text once, even if it repeats in the input
+        pending: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in pending:
+                pending[key] = text
+        return keys, found, pending
+
+    def _cache_store(
+        self, pending: Dict[str, str], vectors: np.ndarray, providers: List[str], found: Dict[str, np.ndarray]
+    ) -> Dict[str, str]:
+        """
+        Save freshly embedded vectors and merge them into the lookup result.
+        Only the primary's vectors are cached. Returns the provider of each
+        fresh vector that came from the fallback, by key.
+        """
+        # Copies, so cached rows do not keep whole batch matrices alive
+        fresh = {key: vector.copy() for key, vector in zip(pending.keys(), vectors)}
+        served = {key: provider for key, provider in zip(pending.keys(), providers) if provider != self.provider}
+        self.cache.put_many({key: vector for key, vector in fresh.items() if key not in served})
+        found.update(fresh)
+        return served
+
+    def _from_cache(
+        self, keys: List[str], found: Dict[str, np.ndarray], served: Dict[str, str]
+    ) -> Tuple[np.ndarray, List[str]]:
+        vectors = np.array([found[key] for key in keys], dtype=np.float32)
+        return vectors, [served.get(key, self.provider) for key in keys]
+
+    def _embed_uncached(self, texts: List[str], input_type: str) -> Tuple[np.ndarray, List[str]]:
+        """
+        Split texts into provider-sized batches, embed them concurrently
+        and reassemble the vectors (and serving providers) in input order.
+        """
+        batches = make_batches(texts, self.batch_size, self.batch_max_chars)
+        if len(batches) == 1:
+            return _gather_batches(batches, [self._embed_batch(texts, input_type)])
+
+        futures = [
+            self._executor.submit(self._embed_batch, texts[start:end], input_type)
+            for start, end in batches
+        ]
+        return _gather_batches(batches, [future.result() for future in futures])
+
+    async def _aembed_uncached(self, texts: List[str], input_type: str) -> Tuple[np.ndarray, List[str]]:
+        """
+        Async variant of _embed_uncached using a semaphore instead of a thread pool.
+        """
+        batches = make_batches(texts, self.batch_size, self.batch_max_chars)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(start: int, end: int) -> Tuple[np.ndarray, str]:
+            async with semaphore:
+                return await self._aembed_batch(texts[start:end], input_type)
+
+        return _gather_batches(batches, await asyncio.gather(*(run(start, end) for start, end in batches)))
+
+    def _embed_batch(self, texts: List[str], input_type: str) -> Tuple[np.ndarray, str]:
+        """
+        Embed one provider-sized batch under the rate limiter, retrying
+        transient failures and failing over to the fallback provider if set
+        once the retries run out.
+        Returns the vectors and the provider that served them.
+        """
+        if self._failed_over():
+            return self.fallback._embed_batch(texts, input_type)
+        try:
+            if self.limiter is None:
+                return self._send(texts, input_type), self.provider
+            return self.limiter.call(lambda: self._send(texts, input_type), estimate_tokens(texts)), self.provider
+        except ProviderError as e:
+            # A rejected request (400, 401, ...) would fail on any provider
+            if self.fallback is None or not e.retryable:
+                raise
+            self._fail_over(e)
+            return self.fallback._embed_batch(texts, input_type)
+
+    async def _aembed_batch(self, texts: List[str], input_type: str) -> Tuple[np.ndarray, str]:
+        """
+        Async variant of _embed_batch.
+        """
+        if self._failed_over():
+            return await self.fallback._aembed_batch(texts, input_type)
+        try:
+            if self.limiter is None:
+                return await self._asend(texts, input_type), self.provider
+            vectors = await self.limiter.acall(lambda: self._asend(texts, input_type), estimate_tokens(texts))
+            return vectors, self.provider
+        except ProviderError as e:
+            # A rejected request (400, 401, ...) would fail on any provider
+            if self.fallback is None or not e.retryable:
+                raise
+            self._fail_over(e)
+            return await self.fallback._aembed_batch(texts, input_type)
+
+    def _failed_over(self) -> bool:
+        return self.fallback is not None and time.monotonic() < self._failover_until
+
+    def _fail_over(self, error: ProviderError):
+        """Route batches to the fallback for EMBEDDING_FAILOVER_COOLDOWN_SECONDS."""
+        self.failovers += 1
+        self._failover_until = time.monotonic() + settings.EMBEDDING_FAILOVER_COOLDOWN_SECONDS
+        record_error("embed_failover")
+        print(f"⚠️  {self.provider} embeddings failed ({error}); failing over to {self.fallback.provider}")
+
+    async def _asend(self, texts: List[str], input_type: str) -> np.ndarray:
+        """
+        Send texts to the provider without blocking the event loop.
+        Jina uses a native async HTTP client; SDK-based providers run in a worker thread.
+        """
+        if self.provider == "jina":
+            return self._to_matrix(await self._aembed_jina(texts))
+        return await asyncio.to_thread(self._send, texts, input_type)
+
+    @timed("embed_request", per_request=False)
+    def _send(self, texts: List[str], input_type: str) -> np.ndarray:
+        """Send texts to the configured provider in a single call."""
+        self._observe_batch(texts)
         if self.provider == "jina":
-            return self._embed_jina(texts)
+            vectors = self._embed_jina(texts)
         elif self.provider == "cohere":
-            return self._embed_cohere(texts)
+            vectors = self._embed_cohere(texts, input_type)
         elif self.provider == "voyage":
-            return self._embed_voyage(texts)
+            vectors = self._embed_voyage(texts)
         elif self.provider == "huggingface":
-            return [self._embed_huggingface_single(text) for text in texts]
+            vectors = [self._embed_huggingface_single(text) for text in texts]
+        elif self.provider == "local":
+            vectors = self._embed_local(texts, input_type)
+        return self._to_matrix(vectors)
 
-    def _embed_jina(self, texts: List[str]) -> List[List[float]]:
-        """Embed texts using Jina AI API."""
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_key}"
-        }
-        
+    def _to_matrix(self, vectors) -> np.ndarray:
+        """
+        Provider output as a float32 (n, dimension) matrix, truncated to
+        EMBEDDING_DIMENSIONS if the provider returned full-size vectors.
+        """
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if matrix.shape[1] <= self.dimension:
+            return matrix
+        # Matryoshka truncation: keep the leading components and re-normalize
+        matrix = matrix[:, :self.dimension]
+        return matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+    @staticmethod
+    def _observe_batch(texts: List[str]):
+        BATCH_SIZE.labels("embed_request").observe(len(texts))
+        PAYLOAD_BYTES.labels("embed_request").observe(sum(map(len, texts)))
+
+    def _jina_payload(self, texts: List[str]) -> dict:
+        # base64 float32 is ~4x smaller than JSON numbers and decodes without float parsing
         payload = {
             "model": self.model,
             "input": texts,
-            "encoding_type": "float"
+            "embedding_type": "base64"
         }
-        
+        if settings.EMBEDDING_DIMENSIONS is not None and "v3" in self.model:
+            payload["dimensions"] = self.dimension
+        return payload
+
+    @staticmethod
+    def _jina_error(status_code: int, text: str, retry_after: Optional[str] = None) -> ProviderError:
+        """Translate a Jina HTTP error status into a readable exception."""
+        if status_code == 401:
+            message = "Authentication error with Jina AI. Please verify your JINA_API_KEY is correct."
+        elif status_code == 429:
+            message = "Rate limit exceeded for Jina AI."
+        else:
+            message = f"Jina AI API error ({status_code}): {text}"
+        return ProviderError(message, status_code=status_code, retry_after=parse_retry_after(retry_after))
+
+    def _embed_jina(self, texts: List[str]) -> np.ndarray:
+        """Embed texts using Jina AI API."""
         try:
-            response = requests.post(self.api_url, json=payload, headers=headers, timeout=30)
+            response = self.session.post(self.api_url, json=self._jina_payload(texts), timeout=30)
             response.raise_for_status()
-            
-            result = response.json()
-            embeddings = [item["embedding"] for item in result["data"]]
-            return embeddings
+            return _decode_embeddings(response.json()["data"])
             
         except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 401:
-                raise RuntimeError(
-                    "Authentication error with Jina AI. Please verify your JINA_API_KEY is correct."
-                )
-            elif e.response.status_code == 429:
-                raise RuntimeError(
-                    "Rate limit exceeded for Jina AI. Please wait before making more requests."
-                )
-            else:
-                raise RuntimeError(f"Jina AI API error: {e.response.text}")
+            raise self._jina_error(e.response.status_code, e.response.text, e.response.headers.get("Retry-After"))
         except requests.exceptions.RequestException as e:
-            raise RuntimeError(f"Network error calling Jina AI: {str(e)}")
+            raise ProviderError(f"Network error calling Jina AI: {str(e)}")
+
+    @timed("embed_request", per_request=False)
+    async def _aembed_jina(self, texts: List[str]) -> np.ndarray:
+        """Embed texts using Jina AI API over a pooled async HTTP client."""
+        self._observe_batch(texts)
+        if self._async_http is None:
+            self._async_http = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=30,
+                limits=httpx.Limits(max_keepalive_connections=self.max_concurrency * 2)
+            )
+        try:
+            response = await self._async_http.post(self.api_url, json=self._jina_payload(texts))
+            response.raise_for_status()
+            return _decode_embeddings(response.json()["data"])
+
+        except httpx.HTTPStatusError as e:
+            raise self._jina_error(e.response.status_code, e.response.text, e.response.headers.get("Retry-After"))
+        except httpx.HTTPError as e:
+            raise ProviderError(f"Network error calling Jina AI: {str(e)}")
 
-    def _embed_cohere(self, texts: List[str]) -> List[List[float]]:
+    def _embed_local(self, texts: List[str], input_type: str) -> np.ndarray:
+        """Embed texts on the CPU with the local ONNX model."""
+        prefix = (
+            settings.LOCAL_EMBEDDING_QUERY_PREFIX if input_type == "search_query"
+            else settings.LOCAL_EMBEDDING_DOCUMENT_PREFIX
+        )
+        return self.embedder.embed([prefix + text for text in texts])
+
+    def _embed_cohere(self, texts: List[str], input_type: str = "search_document") -> List[List[float]]:
         """Embed texts using Cohere API."""
         try:
             response = self.client.embed(
                 texts=texts,
                 model=self.model,
-                input_type="search_document"
+                input_type=input_type
             )
             return response.embeddings
         except Exception as e:
-            raise RuntimeError(f"Cohere API error: {str(e)}")
+            raise _sdk_error("Cohere", e)
 
     def _embed_voyage(self, texts: List[str]) -> List[List[float]]:
         """Embed texts using Voyage AI API."""
@@ -179,35 +553,76 @@ class EmbeddingService:
             )
             return response.embeddings
         except Exception as e:
-            raise RuntimeError(f"Voyage AI API error: {str(e)}")
+            raise _sdk_error("Voyage AI", e)
 
-    def _embed_huggingface_single(self, text: str) -> List[float]:
+    def _embed_huggingface_single(self, text: str) -> np.ndarray:
         """Embed single text using HuggingFace Inference API."""
         try:
-            import numpy as np
             response = self.client.feature_extraction(text)
-            
-            if isinstance(response, np.ndarray):
-                return response.flatten().tolist()
-            elif isinstance(response, list):
-                return [float(x) for x in response]
-            else:
-                return list(response)
+            return np.asarray(response, dtype=np.float32).ravel()
                 
         except Exception as e:
-            error_msg = str(e)
-            if "404" in error_msg or "Not Found" in error_msg:
-                raise RuntimeError(
+            # A ProviderError keeps the status, so throttling is retried and outages fail over
+            error = _sdk_error("HuggingFace", e)
+            if error.status_code == 404 or "Not Found" in str(e):
+                raise ProviderError(
                     f"Model {self.model} not available via HuggingFace Inference API. "
                     f"Consider switching to Jina AI for better reliability. "
-                    f"Set EMBEDDING_PROVIDER=jina in your .env file."
-                )
-            elif "401" in error_msg:
-                raise RuntimeError(
-                    "Authentication error with HuggingFace API. Please verify your HF_API_KEY."
-                )
-            else:
-                raise RuntimeError(f"HuggingFace API error: {error_msg}")
+                    f"Set EMBEDDING_PROVIDER=jina in your .env file.",
+                    status_code=404
+                ) from e
+            if error.status_code == 401:
+                raise ProviderError(
+                    "Authentication error with HuggingFace API. Please verify your HF_API_KEY.", status_code=401
+                ) from e
+            raise error from e
+
+
+def _decode_embeddings(data: List[Dict[str, Any]]) -> np.ndarray:
+    """
+    Decode the "data" items of an embeddings response into a float32 matrix.
+    base64 items are little-endian float32; they are concatenated once and
+    viewed as a matrix without per-element parsing. Plain float lists (from
+    servers that ignore embedding_type) are converted as they are.
+    """
+    embeddings = [item["embedding"] for item in sorted(data, key=lambda item: item.get("index", 0))]
+    if embeddings and isinstance(embeddings[0], str):
+        raw = bytearray().join(base64.b64decode(embedding) for embedding in embeddings)
+        return np.frombuffer(raw, dtype="<f4").reshape(len(embeddings), -1)
+    return np.asarray(embeddings, dtype=np.float32)
+
+
+def _concat(parts: List[Any]) -> np.ndarray:
+    """Stack per-batch results into one float32 matrix."""
+    if len(parts) == 1:
+        return np.asarray(parts[0], dtype=np.float32)
+    return np.concatenate([np.asarray(part, dtype=np.float32) for part in parts])
+
+
+def _gather_batches(batches: List[Tuple[int, int]], results: List[Tuple[np.ndarray, str]]) -> Tuple[np.ndarray, List[str]]:
+    """Stack per-batch (vectors, provider) results into one matrix and a provider per row."""
+    providers = [provider for (start, end), (_, provider) in zip(batches, results) for _ in range(end - start)]
+    return _concat([vectors for vectors, _ in results]), providers
+
+
+def _sdk_error(provider_name: str, error: Exception) -> ProviderError:
+    """
+    Wrap an SDK exception, keeping its HTTP status and Retry-After so the
+    limiter can tell throttling from a bad request. HTTP-client errors
+    (e.g. huggingface_hub's) carry these on their response instead.
+    """
+    response = getattr(error, "response", None)
+    status = (
+        getattr(error, "status_code", None) or getattr(error, "http_status", None)
+        or getattr(response, "status_code", None)
+    )
+    headers = getattr(error, "headers", None) or getattr(response, "headers", None)
+    retry_after = headers.get("retry-after") if hasattr(headers, "get") else None
+    return ProviderError(
+        f"{provider_name} API error: {error}",
+        status_code=status if isinstance(status, int) else None,
+        retry_after=parse_retry_after(retry_after),
+    )
 
 
 EmbeddingService = EmbeddingService
\ No newline at end of file
@@ -1,4 +1,62 @@
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Optional, Tuple
 from PyPDF2 import PdfReader
+from app.core.config import settings
+from app.core.metrics import PAYLOAD_BYTES, record_error, record_stage
+
+# Plain-text files are streamed in blocks of roughly this many characters
+TXT_BLOCK_SIZE = 64 * 1024
+
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+_pdf_pool_workers = 0
+_pdf_pool_lock = threading.Lock()
+
+
+def _get_pdf_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Lazily create the shared process pool used for PDF extraction; a request
+    for a different worker count replaces it. Workers are spawned rather than
+    forked, since the server process runs other threads.
+    """
+    global _pdf_pool, _pdf_pool_workers
+    with _pdf_pool_lock:
+        if _pdf_pool is not None and _pdf_pool_workers != workers:
+            # Shards already submitted to the old pool still complete
+            _pdf_pool.shutdown(wait=False)
+            _pdf_pool = None
+        if _pdf_pool is None:
+            _pdf_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pdf_pool_workers = workers
+        return _pdf_pool
+
+
+def shutdown_pdf_pool():
+    """Stop the PDF extraction workers, dropping shards that have not started."""
+    global _pdf_pool
+    with _pdf_pool_lock:
+        pool, _pdf_pool = _pdf_pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _extract_page_range(file_path: str, start: int, end: int) -> List[Tuple[int, str]]:
+    """
+    Extract pages [start, end) in a worker process.
+    Each worker opens its own PdfReader since readers cannot be shared across processes.
+    """
+    reader = PdfReader(file_path)
+    pages = []
+    for index in range(start, end):
+        text = reader.pages[index].extract_text()
+        if text:
+            pages.append((index + 1, text))
+    return pages
+
 
 class FileParser:
     """
@@ -10,12 +68,7 @@ class FileParser:
         """
         Read a PDF file and extract all text.
         """
-        reader = PdfReader(file_path)
-        text = []
-        for page in reader.pages:
-            if page.extract_text():
-                text.append(page.extract_text())
-        return "\n".join(text)
+        return "\n".join(text for _, text in FileParser.iter_pdf_pages(file_path))
 
     @staticmethod
     def parse_txt(file_path: str) -> str:
@@ -24,3 +77,87 @@ class FileParser:
         """
         with open(file_path, "r", encoding="utf-8") as f:
             return f.read()
+
+    @staticmethod
+    def iter_pages(file_path: str, workers: Optional[int] = None) -> Iterator[Tuple[Optional[int], str]]:
+        """
+        Yield (page_number, text) pairs without loading the whole document.
+        PDF pages are numbered from 1; plain-text blocks have no page number.
+        `workers` is passed to iter_pdf_pages (1 reads the PDF sequentially).
+        Time spent producing each page is recorded as the "parse_page" stage.
+        """
+        if file_path.lower().endswith(".pdf"):
+            pages = FileParser.iter_pdf_pages(file_path, workers)
+        elif file_path.lower().endswith(".txt"):
+            pages = ((None, block) for block in FileParser.iter_txt_blocks(file_path))
+        else:
+            raise ValueError(f"Unsupported file format: {file_path}")
+
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    page = next(pages)
+                except StopIteration:
+                    return
+                except Exception:
+                    record_error("parse_page")
+                    raise
+                record_stage("parse_page", started)
+                PAYLOAD_BYTES.labels("parsed_page").observe(len(page[1]))
+                yield page
+        finally:
+            pages.close()
+
+    @staticmethod
+    def iter_pdf_pages(file_path: str, workers: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+        """
+        Yield (page_number, text) for each PDF page that has text, in page order.
+
+        Large files are split into page ranges extracted in parallel by a process
+        pool; small files (under PDF_PARALLEL_MIN_PAGES) are extracted serially.
+        """
+        workers = workers or settings.PDF_PARSE_WORKERS or os.cpu_count() or 1
+        reader = PdfReader(file_path)
+        total = len(reader.pages)
+
+        if workers <= 1 or total < settings.PDF_PARALLEL_MIN_PAGES:
+            for number, page in enumerate(reader.pages, start=1):
+                text = page.extract_text()
+                if text:
+                    yield number, text
+            return
+
+        pool = _get_pdf_pool(workers)
+        shard = max(1, settings.PDF_PAGES_PER_SHARD)
+        ranges = deque((start, min(start + shard, total)) for start in range(0, total, shard))
+
+        # Keep a bounded number of shards in flight so memory stays flat
+        in_flight = deque()
+        while ranges or in_flight:
+            while ranges and len(in_flight) < workers * 2:
+                start, end = ranges.popleft()
+                in_flight.append(pool.submit(_extract_page_range, file_path, start, end))
+            yield from in_flight.popleft().result()
+
+    @staticmethod
+    def iter_txt_blocks(file_path: str, block_size: int = TXT_BLOCK_SIZE) -> Iterator[str]:
+        """
+        Yield a text file in blocks, breaking on line boundaries where possible.
+        """
+        with open(file_path, "r", encoding="utf-8") as f:
+            carry = ""
+            while True:
+                data = f.read(block_size)
+                if not data:
+                    break
+                data = carry + data
+                cut = data.rfind("\n")
+                if cut == -1:
+                    carry = ""
+                    yield data
+                else:
+                    carry = data[cut + 1:]
+                    yield data[:cut + 1]
+            if carry:
+                yield carry
@@ -0,0 +1,266 @@
+"""
+Background ingestion of uploaded files.
+Runs parse/chunk -> embed -> upsert as a pipeline with bounded queues between
+stages, so memory stays flat regardless of document size.
+"""
+
+import asyncio
+import threading
+import time
+import uuid
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services.document_registry import make_chunk_id
+from app.services.file_parser import FileParser
+from app.utils.chunking import Chunk, iter_chunks
+
+# Marks the end of a stage's output
+_DONE = object()
+
+# Inserted between PDF pages so chunks spanning pages break between them
+PAGE_BREAK = "\n\n"
+
+
+def iter_page_chunks(pages: Iterable[Tuple[Optional[int], str]]) -> Iterator[Tuple[Chunk, Optional[int]]]:
+    """
+    Stream (page_number, text) pairs through the chunker, tagging each chunk
+    with the page it starts on. Chunk offsets count a PAGE_BREAK between
+    consecutive numbered pages; unnumbered pieces (plain-text blocks) are
+    joined as they are, so offsets match the source file.
+    """
+    page_starts: List[int] = []
+    page_numbers: List[Optional[int]] = []
+
+    def texts():
+        offset = 0
+        for page_number, text in pages:
+            if page_number is not None and page_numbers and page_numbers[-1] is not None:
+                yield PAGE_BREAK
+                offset += len(PAGE_BREAK)
+            page_starts.append(offset)
+            page_numbers.append(page_number)
+            offset += len(text)
+            yield text
+
+    for chunk in iter_chunks(texts()):
+        yield chunk, page_numbers[bisect_right(page_starts, chunk.start) - 1]
+
+
+class IngestionJob:
+    """
+    Progress record for one uploaded document.
+    """
+    def __init__(self, filename: str, file_path: str):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.file_path = file_path
+        self.status = "queued"
+        self.error: Optional[str] = None
+        self.document_id = f"upload:{filename}"
+        self.pages_processed = 0
+        self.chunks_processed = 0
+        self.chunks_indexed = 0
+        self.chunks_unchanged = 0
+        self.chunks_deleted = 0
+        self.chunk_ids: List[str] = []
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        elapsed = None
+        if self.started_at is not None:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+        return {
+            "job_id": self.id,
+            "filename": self.filename,
+            "document_id": self.document_id,
+            "status": self.status,
+            "error": self.error,
+            "pages_processed": self.pages_processed,
+            "chunks_processed": self.chunks_processed,
+            "chunks_indexed": self.chunks_indexed,
+            "chunks_unchanged": self.chunks_unchanged,
+            "chunks_deleted": self.chunks_deleted,
+            "elapsed_seconds": round(elapsed, 3) if elapsed is not None else None,
+            "pages_per_second": round(self.pages_processed / elapsed, 2) if elapsed else 0.0,
+            "chunks_per_second": round(self.chunks_indexed / elapsed, 2) if elapsed else 0.0,
+        }
+
+
+class IngestionManager:
+    """
+    Tracks ingestion jobs and runs the parse/embed/upsert pipeline for each.
+    """
+
+    def __init__(self, service: Any, queue_size: int = 4, embed_batch_size: int = 64, max_jobs: int = 1000):
+        self.service = service
+        self.queue_size = queue_size
+        self.embed_batch_size = embed_batch_size
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+
+    def create_job(self, filename: str, file_path: str) -> IngestionJob:
+        job = IngestionJob(filename, file_path)
+        self._jobs[job.id] = job
+        # Keep only the most recent jobs
+        while len(self._jobs) > self.max_jobs:
+            self._jobs.popitem(last=False)
+        return job
+
+    def get_job(self, job_id: str) -> Optional[IngestionJob]:
+        return self._jobs.get(job_id)
+
+    async def run(self, job: IngestionJob):
+        """
+        Execute the pipeline for a job, recording progress and failures on it.
+        """
+        job.status = "running"
+        job.started_at = time.time()
+
+        chunks: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        batches: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        tasks = [
+            asyncio.create_task(self._parse_stage(job, chunks, stop)),
+            asyncio.create_task(self._embed_stage(job, chunks, batches)),
+            asyncio.create_task(self._upsert_stage(job, batches)),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+            job.status = "completed"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            for task in tasks:
+                task.cancel()
+            # Unblock the parser thread if it is waiting on a full queue
+            stop.set()
+            while not chunks.empty():
+                chunks.get_nowait()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            job.finished_at = time.time()
+
+    async def _parse_stage(self, job: IngestionJob, chunks: asyncio.Queue, stop: threading.Event):
+        """
+        Extract pages and stream them through the chunker in a worker thread.
+        Chunks are handed over in embed-sized groups tagged with the page they
+        start on; the bounded queue applies backpressure to the parser when
+        embedding falls behind.
+        """
+        loop = asyncio.get_running_loop()
+
+        def pages():
+            for page in FileParser.iter_pages(job.file_path):
+                if stop.is_set():
+                    return
+                job.pages_processed += 1
+                yield page
+
+        def hand_over(group) -> bool:
+            # After a failure nothing consumes the queue; the one put in flight
+            # is released by the drain in run(), and no further put is made
+            if stop.is_set():
+                return False
+            asyncio.run_coroutine_threadsafe(chunks.put(group), loop).result()
+            return not stop.is_set()
+
+        def produce():
+            group = []
+            for item in iter_page_chunks(pages()):
+                group.append(item)
+                if len(group) >= self.embed_batch_size:
+                    if not hand_over(group):
+                        return
+                    group = []
+            if group:
+                hand_over(group)
+
+        await asyncio.to_thread(produce)
+        await chunks.put(_DONE)
+
+    async def _embed_stage(self, job: IngestionJob, chunks: asyncio.Queue, batches: asyncio.Queue):
+        """
+        Embed chunks in fixed-size batches.
+        Chunks already stored under the same deterministic ID are not re-embedded.
+        """
+        texts: List[str] = []
+        payloads: List[Dict[str, Any]] = []
+        ids: List[str] = []
+        seen = set()
+
+        async def flush():
+            existing = await self.service.vector_store.aexisting_ids(
+                self.service.collection_name, ids, self.service.embeddings.provider
+            )
+            new = [i for i, point_id in enumerate(ids) if point_id not in existing]
+            job.chunks_unchanged += len(ids) - len(new)
+            if new:
+                new_texts = [texts[i] for i in new]
+                new_payloads = [payloads[i] for i in new]
+                vectors = await self.service.aembed_chunks(new_texts, new_payloads)
+                sparse_vectors = self.service.encode_sparse(new_texts)
+                await batches.put((vectors, new_payloads, [ids[i] for i in new], sparse_vectors))
+            texts.clear()
+            payloads.clear()
+            ids.clear()
+
+        while (group := await chunks.get()) is not _DONE:
+            for chunk, page_number in group:
+                job.chunks_processed += 1
+                point_id = make_chunk_id(job.document_id, chunk.text)
+                if point_id in seen:
+                    continue
+                seen.add(point_id)
+                job.chunk_ids.append(point_id)
+                texts.append(chunk.text)
+                ids.append(point_id)
+                payloads.append({
+                    "content": chunk.text,
+                    "document_id": job.document_id,
+                    "source": job.filename,
+                    "page": page_number,
+                    "start": chunk.start,
+                    "end": chunk.end,
+                })
+            if len(texts) >= self.embed_batch_size:
+                await flush()
+        if texts:
+            await flush()
+        await batches.put(_DONE)
+
+    async def _upsert_stage(self, job: IngestionJob, batches: asyncio.Queue):
+        """
+        Write embedded batches, then drop chunks from a previous upload of the
+        same file that no longer appear in it.
+        """
+        collection_name = self.service.collection_name
+        while (item := await batches.get()) is not _DONE:
+            vectors, payloads, ids, sparse_vectors = item
+            await self.service.vector_store.aupsert_vectors(
+                collection_name, vectors, payloads, ids, sparse_vectors=sparse_vectors
+            )
+            self.service.add_sparse_stats(ids, [payload["content"] for payload in payloads])
+            job.chunks_indexed += len(payloads)
+
+        registry = self.service.registry
+        stale = sorted(registry.get_chunk_ids(job.document_id) - set(job.chunk_ids))
+        await self.service.vector_store.adelete_points(collection_name, stale)
+        self.service.remove_sparse_stats(stale)
+        registry.replace(job.document_id, job.chunk_ids)
+        job.chunks_deleted = len(stale)
+
+        if job.chunks_indexed or stale:
+            self.service.invalidate_answer_cache()
+
+
+def create_ingestion_manager(service: Any) -> IngestionManager:
+    return IngestionManager(
+        service,
+        queue_size=settings.INGEST_QUEUE_SIZE,
+        embed_batch_size=settings.INGEST_EMBED_BATCH_SIZE,
+    )
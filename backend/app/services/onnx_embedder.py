@@ -0,0 +1,128 @@
+"""
+Local CPU sentence embeddings with ONNX Runtime.
+
+Expects a model directory exported for feature extraction (e.g. with Optimum):
+- model.onnx (or onnx/model.onnx)
+- tokenizer.json
+- config.json (hidden_size gives the embedding dimension)
+"""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import numpy as np
+
+
+def read_model_dimension(model_path: str) -> int:
+    """
+    Embedding dimension declared in the model's config.json.
+    """
+    with open(os.path.join(model_path, "config.json")) as f:
+        config = json.load(f)
+    for key in ("hidden_size", "dim", "d_model"):
+        if key in config:
+            return int(config[key])
+    raise ValueError(f"Cannot determine embedding dimension from {model_path}/config.json")
+
+
+class OnnxEmbedder:
+    """
+    Tokenizes texts and runs the ONNX model in padded batches on a thread pool.
+
+    Texts are sorted by token length before batching so each batch is padded
+    only to its own longest text. ONNX Runtime releases the GIL during
+    inference, so batches run in parallel across worker threads.
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        max_length: int = 512,
+        batch_size: int = 32,
+        workers: int = 0,
+        pooling: str = "mean",
+    ):
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError:
+            raise ImportError("Please install onnxruntime and tokenizers: pip install onnxruntime tokenizers")
+
+        if pooling not in ("mean", "cls"):
+            raise ValueError(f"Unsupported pooling: {pooling}. Supported: 'mean', 'cls'")
+
+        self.model_path = model_path
+        self.batch_size = max(1, batch_size)
+        self.pooling = pooling
+        self.dimension = read_model_dimension(model_path)
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_path, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.no_padding()
+
+        self.workers = workers or os.cpu_count() or 1
+        options = ort.SessionOptions()
+        # Split the cores between concurrent batches instead of oversubscribing them
+        options.intra_op_num_threads = max(1, (os.cpu_count() or 1) // self.workers)
+        self.session = ort.InferenceSession(
+            self._find_model_file(model_path), sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {i.name for i in self.session.get_inputs()}
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="onnx-embed")
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts into an (n, dimension) float32 array of L2-normalized vectors, in input order.
+        """
+        output = np.empty((len(texts), self.dimension), dtype=np.float32)
+        if not texts:
+            return output
+
+        encodings = self.tokenizer.encode_batch(texts)
+        order = sorted(range(len(texts)), key=lambda i: len(encodings[i].ids))
+        batches = [order[i:i + self.batch_size] for i in range(0, len(order), self.batch_size)]
+
+        def run(batch: List[int]):
+            output[batch] = self._infer([encodings[i] for i in batch])
+
+        for future in [self._executor.submit(run, batch) for batch in batches]:
+            future.result()
+        return output
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+    def _infer(self, encodings) -> np.ndarray:
+        width = max(len(e.ids) for e in encodings)
+        input_ids = np.zeros((len(encodings), width), dtype=np.int64)
+        attention_mask = np.zeros((len(encodings), width), dtype=np.int64)
+        for row, encoding in enumerate(encodings):
+            input_ids[row, :len(encoding.ids)] = encoding.ids
+            attention_mask[row, :len(encoding.ids)] = 1
+
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+        hidden = self.session.run(None, {k: v for k, v in feeds.items() if k in self._input_names})[0]
+
+        if hidden.ndim == 2:
+            pooled = hidden  # model already outputs sentence embeddings
+        elif self.pooling == "cls":
+            pooled = hidden[:, 0]
+        else:
+            mask = attention_mask[:, :, None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (pooled / norms).astype(np.float32)
+
+    @staticmethod
+    def _find_model_file(model_path: str) -> str:
+        for candidate in ("model.onnx", os.path.join("onnx", "model.onnx")):
+            path = os.path.join(model_path, candidate)
+            if os.path.exists(path):
+                return path
+        raise FileNotFoundError(f"No model.onnx found in {model_path}")
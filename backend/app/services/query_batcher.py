@@ -0,0 +1,131 @@
+"""
+Dynamic micro-batching for query embeddings.
+Coalesces concurrent single-text requests into one provider call.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Dict, List, Set, Tuple
+
+from app.core.metrics import BATCH_SIZE
+
+# Upper bounds of the batch-size histogram buckets
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class EmbeddingBatcher:
+    """
+    Collects texts that arrive within a short window (or until the batch is full)
+    and embeds them with a single `aembed_texts` call, then resolves each waiter
+    with its own vector.
+    """
+
+    def __init__(
+        self,
+        embeddings: Any,
+        window_ms: float = 5.0,
+        max_batch_size: int = 32,
+        input_type: str = "search_query",
+    ):
+        self.embeddings = embeddings
+        self.window = window_ms / 1000
+        self.max_batch_size = max(1, max_batch_size)
+        self.input_type = input_type
+
+        self._pending: List[Tuple[str, asyncio.Future, float]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        # The event loop only keeps weak references to tasks
+        self._dispatches: Set[asyncio.Task] = set()
+
+        self.batches = 0
+        self.requests = 0
+        self._histogram = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+        self._delays_ms: deque = deque(maxlen=2048)
+        self._max_delay_ms = 0.0
+
+    async def embed(self, text: str) -> List[float]:
+        """
+        Queue a text for the next batch and wait for its embedding.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future, time.perf_counter()))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return batch-size histogram and queueing-delay percentiles.
+        """
+        delays = sorted(self._delays_ms)
+
+        def percentile(p: float) -> float:
+            if not delays:
+                return 0.0
+            return round(delays[min(len(delays) - 1, int(p * len(delays)))], 3)
+
+        labels = [str(b) for b in BATCH_SIZE_BUCKETS] + ["+Inf"]
+        return {
+            "window_ms": self.window * 1000,
+            "max_batch_size": self.max_batch_size,
+            "batches": self.batches,
+            "requests": self.requests,
+            "avg_batch_size": round(self.requests / self.batches, 2) if self.batches else 0.0,
+            "batch_size_histogram": dict(zip(labels, self._histogram)),
+            "queue_delay_ms": {
+                "p50": percentile(0.50),
+                "p95": percentile(0.95),
+                "p99": percentile(0.99),
+                "max": round(self._max_delay_ms, 3),
+            },
+        }
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, []
+        self._record(batch)
+        BATCH_SIZE.labels("query_batch").observe(len(batch))
+        task = asyncio.get_running_loop().create_task(self._dispatch(batch))
+        self._dispatches.add(task)
+        task.add_done_callback(self._dispatches.discard)
+
+    async def _dispatch(self, batch: List[Tuple[str, asyncio.Future, float]]):
+        try:
+            vectors = await self.embeddings.aembed_texts(
+                [text for text, _, _ in batch], input_type=self.input_type
+            )
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future, _), vector in zip(batch, vectors):
+            if not future.done():
+                future.set_result(vector)
+
+    def _record(self, batch: List[Tuple[str, asyncio.Future, float]]):
+        now = time.perf_counter()
+        size = len(batch)
+        self.batches += 1
+        self.requests += size
+
+        bucket = next((i for i, bound in enumerate(BATCH_SIZE_BUCKETS) if size <= bound), len(BATCH_SIZE_BUCKETS))
+        self._histogram[bucket] += 1
+
+        for _, _, enqueued_at in batch:
+            delay_ms = (now - enqueued_at) * 1000
+            self._delays_ms.append(delay_ms)
+            if delay_ms > self._max_delay_ms:
+                self._max_delay_ms = delay_ms
@@ -0,0 +1,104 @@
+"""
+Frequency log of search queries, used to warm caches on startup.
+One row per normalized query with its hit count, so the file stays small.
+"""
+
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Tuple
+
+# Buffered queries are written to SQLite once this many have been recorded
+FLUSH_EVERY = 50
+
+
+def normalize_query(text: str) -> str:
+    """Case- and whitespace-insensitive key, ignoring trailing punctuation."""
+    return " ".join(text.lower().split()).rstrip("?!. ")
+
+
+class QueryLog:
+    """
+    SQLite-backed query -> count table, keeping the max_entries most frequent queries.
+    Each entry also keeps the query as it was last typed, which is what gets warmed.
+    After close(), queries are no longer recorded and top() returns nothing.
+    """
+
+    def __init__(self, db_path: str = "query_log.db", max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Tuple[str, int, float]] = {}
+        self._buffered = 0
+        self._closed_entries = None
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS queries ("
+            "query TEXT PRIMARY KEY, text TEXT NOT NULL, "
+            "count INTEGER NOT NULL, last_seen REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def record(self, text: str):
+        key = normalize_query(text)
+        if not key:
+            return
+        with self._lock:
+            if self._closed_entries is not None:
+                return
+            _, count, _ = self._pending.get(key, (None, 0, 0.0))
+            self._pending[key] = (text.strip(), count + 1, time.time())
+            self._buffered += 1
+            if self._buffered >= FLUSH_EVERY:
+                self._flush()
+
+    def top(self, limit: int) -> List[str]:
+        """The `limit` most frequent queries, most frequent first."""
+        with self._lock:
+            if self._closed_entries is not None:
+                return []
+            self._flush()
+            rows = self._db.execute(
+                "SELECT text FROM queries ORDER BY count DESC, last_seen DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            if self._closed_entries is not None:
+                return {"entries": self._closed_entries, "pending": 0}
+            return {"entries": self._count(), "pending": self._buffered}
+
+    def flush(self):
+        with self._lock:
+            if self._closed_entries is None:
+                self._flush()
+
+    def close(self):
+        with self._lock:
+            if self._closed_entries is not None:
+                return
+            self._flush()
+            self._closed_entries = self._count()
+            self._db.close()
+
+    def _count(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM queries").fetchone()[0]
+
+    def _flush(self):
+        if not self._pending:
+            return
+        self._db.executemany(
+            "INSERT INTO queries (query, text, count, last_seen) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(query) DO UPDATE SET text = excluded.text, "
+            "count = count + excluded.count, last_seen = excluded.last_seen",
+            [(key, text, count, seen) for key, (text, count, seen) in self._pending.items()],
+        )
+        # Drop the least frequent queries once the log outgrows its cap
+        self._db.execute(
+            "DELETE FROM queries WHERE query NOT IN "
+            "(SELECT query FROM queries ORDER BY count DESC, last_seen DESC LIMIT ?)",
+            (self.max_entries,),
+        )
+        self._db.commit()
+        self._pending.clear()
+        self._buffered = 0
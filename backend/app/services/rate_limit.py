@@ -0,0 +1,270 @@
+"""
+Client-side flow control for external providers.
+
+- TokenBucket: request-per-minute and token-per-minute quotas.
+- AdaptiveConcurrency: AIMD limit on requests in flight; halves on throttling
+  (429/5xx) and grows by about one slot per round of successful requests.
+- ProviderLimiter: combines both with jittered retries that honour Retry-After.
+
+Throttled requests slow every caller down instead of failing, so bulk
+ingestion settles just under the provider's quota without error storms.
+Everything here works from worker threads and from the event loop.
+"""
+
+import asyncio
+import math
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+# HTTP statuses worth retrying; 429 and every 5xx also mean "slow down"
+RETRYABLE_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+THROTTLE_STATUSES = {429}
+
+# Rough token estimate for quota accounting (English text averages ~4 characters per token)
+CHARS_PER_TOKEN = 4
+
+
+class ProviderError(RuntimeError):
+    """
+    A failed provider call. status_code is None for network errors;
+    retry_after is the server's Retry-After hint in seconds, if any.
+    """
+
+    def __init__(self, message: str, status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        return self.status_code is None or self.status_code in RETRYABLE_STATUSES
+
+    @property
+    def throttled(self) -> bool:
+        if self.status_code is None:
+            return False
+        return self.status_code in THROTTLE_STATUSES or self.status_code >= 500
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def estimate_tokens(texts) -> int:
+    return max(1, math.ceil(sum(map(len, texts)) / CHARS_PER_TOKEN))
+
+
+class TokenBucket:
+    """
+    Refills at `rate` units per second up to `capacity`.
+
+    reserve() takes the units immediately, going into debt if needed, and
+    returns how long the caller must wait; later callers queue behind that debt.
+    A request larger than the capacity starts once the bucket is full and is
+    charged in full, so the debt it leaves holds back the callers after it.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = max(1.0, capacity if capacity is not None else rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float = 1.0) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Wait until the request fits, or until the bucket is full if it never can
+            wait = max(0.0, min(amount, self.capacity) - self._tokens) / self.rate
+            self._tokens -= amount
+            return wait
+
+
+class AdaptiveConcurrency:
+    """
+    Additive-increase / multiplicative-decrease limit on concurrent requests.
+
+    acquire() returns the current epoch, to be passed back to release(). The
+    epoch advances on every decrease, so requests that were already in flight
+    when the limit was cut cannot cut it again: one overload, one decrease.
+    """
+
+    def __init__(self, maximum: int, minimum: int = 1, initial: Optional[int] = None, decrease_factor: float = 0.5):
+        self.maximum = max(1, maximum)
+        self.minimum = max(1, min(minimum, self.maximum))
+        self.limit = float(initial if initial is not None else self.maximum)
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+        self.epoch = 0
+        self._cond = threading.Condition()
+        self._async_waiters: deque = deque()
+
+    def _try_acquire(self) -> bool:
+        if self.in_flight < int(self.limit):
+            self.in_flight += 1
+            return True
+        return False
+
+    def acquire(self) -> int:
+        with self._cond:
+            while not self._try_acquire():
+                self._cond.wait()
+            return self.epoch
+
+    async def aacquire(self) -> int:
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if self._try_acquire():
+                    return self.epoch
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            await waiter
+
+    def release(self, epoch: int, outcome: str = "success"):
+        """
+        Free a slot and adapt the limit: outcome is "success", "throttled" or
+        "error" (which leaves the limit unchanged).
+        """
+        with self._cond:
+            # Only a limit that is actually in use (at least half the slots busy)
+            # is grown; growing it while slots sit idle would overshoot the next burst
+            in_use = self.in_flight * 2 >= self.limit
+            self.in_flight -= 1
+            if outcome == "success" and in_use:
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            elif outcome == "throttled" and epoch == self.epoch:
+                self.limit = max(self.minimum, self.limit * self.decrease_factor)
+                self.epoch += 1
+            # Waiters re-check the limit, so waking all of them is always safe
+            self._cond.notify_all()
+            while self._async_waiters:
+                loop, waiter = self._async_waiters.popleft()
+                loop.call_soon_threadsafe(_wake, waiter)
+
+
+def _wake(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class ProviderLimiter:
+    """
+    Flow control for one provider: quotas, adaptive concurrency and retries.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_concurrency: int = 16,
+        max_retries: int = 5,
+        retry_base_delay: float = 0.5,
+        retry_max_delay: float = 30.0,
+    ):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute / 60.0) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute / 60.0) if tokens_per_minute else None
+        self.concurrency = AdaptiveConcurrency(max_concurrency)
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self._paused_until = 0.0
+        self.counters = {"requests": 0, "retries": 0, "throttled": 0, "failed": 0}
+
+    def call(self, fn: Callable[[], T], tokens: int = 1) -> T:
+        """Run a blocking provider call under the limiter, retrying transient failures."""
+        attempt = 0
+        while True:
+            time.sleep(self._quota_delay(tokens))
+            epoch = self.concurrency.acquire()
+            try:
+                result = fn()
+            except ProviderError as e:
+                delay = self._on_error(e, epoch, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                self.concurrency.release(epoch, "error")
+                raise
+            self.concurrency.release(epoch, "success")
+            return result
+
+    async def acall(self, fn: Callable[[], Awaitable[T]], tokens: int = 1) -> T:
+        """Async variant of call."""
+        attempt = 0
+        while True:
+            await asyncio.sleep(self._quota_delay(tokens))
+            epoch = await self.concurrency.aacquire()
+            try:
+                result = await fn()
+            except ProviderError as e:
+                delay = self._on_error(e, epoch, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                self.concurrency.release(epoch, "error")
+                raise
+            self.concurrency.release(epoch, "success")
+            return result
+
+    def _quota_delay(self, tokens: int) -> float:
+        self.counters["requests"] += 1
+        delay = max(0.0, self._paused_until - time.monotonic())
+        if self.requests is not None:
+            delay = max(delay, self.requests.reserve(1))
+        if self.tokens is not None:
+            delay = max(delay, self.tokens.reserve(tokens))
+        return delay
+
+    def _on_error(self, error: ProviderError, epoch: int, attempt: int) -> Optional[float]:
+        """
+        Release the slot for a failed call; return the delay before retrying, or None to give up.
+        """
+        self.concurrency.release(epoch, "throttled" if error.throttled else "error")
+        if error.throttled:
+            self.counters["throttled"] += 1
+        if not error.retryable or attempt >= self.max_retries:
+            self.counters["failed"] += 1
+            return None
+
+        self.counters["retries"] += 1
+        if error.retry_after is not None:
+            # The server said when to come back: hold every caller until then
+            delay = min(error.retry_after, self.retry_max_delay)
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            return delay + random.uniform(0, self.retry_base_delay)
+        # Full jitter keeps concurrent retries from arriving in lockstep
+        return random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counters,
+            "concurrency_limit": round(self.concurrency.limit, 2),
+            "in_flight": self.concurrency.in_flight,
+        }
@@ -0,0 +1,24 @@
+"""
+Pluggable reranker hook for the post-retrieval stage.
+"""
+
+import importlib
+from typing import Callable, List
+
+# (query, passages) -> one relevance score per passage, higher is better
+Reranker = Callable[[str, List[str]], List[float]]
+
+
+def load_reranker(path: str) -> Reranker:
+    """
+    Import a reranker from a "package.module:function" path, e.g. a wrapper
+    around a local cross-encoder. Raises ValueError for malformed paths.
+    """
+    module_name, _, attr = path.partition(":")
+    if not module_name or not attr:
+        raise ValueError(f"RERANKER must look like 'package.module:function', got '{path}'")
+    reranker = getattr(importlib.import_module(module_name), attr)
+    if not callable(reranker):
+        raise ValueError(f"RERANKER '{path}' is not callable")
+    print(f"✅ Reranker loaded from {path}")
+    return reranker
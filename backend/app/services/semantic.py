@@ -1,76 +1,739 @@
-import google.generativeai as genai
-from app.utils.chunking import chunk_text
+import asyncio
+import time
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from app.utils.chunking import iter_chunks
+from app.utils.context import ContextSpan, build_context, format_context
+from app.utils.filters import FieldFilter, parse_filters
+from app.utils.mmr import mmr_select
+from app.services.answer_cache import SemanticAnswerCache
+from app.services.document_registry import DocumentRegistry, make_chunk_id, make_document_id
 from app.services.embeddings import EmbeddingService
-from app.services.vectorstore_qdrant import QdrantClientWrapper
+from app.services.query_batcher import EmbeddingBatcher
+from app.services.query_log import QueryLog
+from app.services.reranker import load_reranker
+from app.services.sparse import BM25Encoder
+from app.services.vectorstore_base import create_vector_store
 from app.core.config import settings
+from app.core.metrics import record_error, record_stage, timed
 
 
 class SemanticSearchService:
     """
     End-to-end RAG (Retrieval-Augmented Generation) pipeline:
     1. Chunk & embed documents using configured embedding provider
-    2. Store embeddings to Qdrant
+    2. Store embeddings in the vector store (Qdrant or local)
     3. Retrieve relevant context
     4. Generate final answer with Gemini LLM
     """
 
-    def __init__(self):
+    def __init__(self, startup: Optional[Dict[str, Dict[str, Any]]] = None):
         self.collection_name = "documents"
+        # Per-dependency readiness and init time (ms), reported by /health/ready
+        self.startup = startup if startup is not None else {}
         
         # Initialize embedding service (automatically detects provider from config)
-        self.embeddings = EmbeddingService()
+        with self._startup_step("embeddings"):
+            self.embeddings = EmbeddingService()
+
+        # Coalesce concurrent query embeddings on the async path
+        self.query_batcher = None
+        if settings.QUERY_BATCH_WINDOW_MS > 0:
+            self.query_batcher = EmbeddingBatcher(
+                self.embeddings,
+                window_ms=settings.QUERY_BATCH_WINDOW_MS,
+                max_batch_size=settings.QUERY_BATCH_MAX_SIZE
+            )
         
-        # Initialize Qdrant with dynamic vector size based on embedding provider
-        vector_size = settings.embedding_dimension
-        self.qdrant = QdrantClientWrapper(
-            collection_name=self.collection_name, 
-            vector_size=vector_size
-        )
+        # Initialize the vector store (Qdrant or local) with dynamic vector size based on embedding provider
+        with self._startup_step("vector_store"):
+            vector_size = settings.embedding_dimension
+            self.vector_store = create_vector_store(
+                collection_name=self.collection_name,
+                vector_size=vector_size,
+                hybrid=settings.HYBRID_SEARCH_ENABLED
+            )
+
+        # Lexical BM25 vectors for hybrid dense + sparse retrieval
+        self.sparse_encoder = None
+        if settings.HYBRID_SEARCH_ENABLED:
+            with self._startup_step("sparse_encoder"):
+                self.sparse_encoder = BM25Encoder(
+                    settings.SPARSE_STATS_PATH, k1=settings.BM25_K1, b=settings.BM25_B
+                )
         
-        # Initialize Gemini LLM
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        self.llm = genai.GenerativeModel("gemini-1.0-pro")
+        # Track which chunks belong to which document for incremental re-indexing
+        with self._startup_step("registry"):
+            self.registry = DocumentRegistry(settings.DOCUMENT_REGISTRY_PATH)
+
+        # Reuse answers for near-duplicate questions
+        self.answer_cache = None
+        if settings.ANSWER_CACHE_ENABLED:
+            self.answer_cache = SemanticAnswerCache(
+                threshold=settings.ANSWER_CACHE_THRESHOLD,
+                max_entries=settings.ANSWER_CACHE_SIZE,
+                ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS
+            )
+
+        # Query frequencies for warming caches on the next startup
+        self.query_log = None
+        if settings.QUERY_LOG_ENABLED:
+            with self._startup_step("query_log"):
+                self.query_log = QueryLog(settings.QUERY_LOG_PATH, max_entries=settings.QUERY_LOG_MAX_ENTRIES)
+
+        # Optional reranker applied to oversampled candidates before MMR
+        self.reranker = None
+        if settings.RERANKER:
+            with self._startup_step("reranker"):
+                self.reranker = load_reranker(settings.RERANKER)
+
+        # Initialize Gemini LLM (the SDK is slow to import, so it is loaded here rather than at module import)
+        with self._startup_step("llm"):
+            import google.generativeai as genai
+            genai.configure(api_key=settings.GEMINI_API_KEY)
+            self.llm = genai.GenerativeModel("gemini-1.0-pro")
         
         print(f"✅ SemanticSearchService initialized with {settings.EMBEDDING_PROVIDER} embeddings ({vector_size}D)")
 
-    def index_text(self, text: str, metadata: dict | None = None):
+    @contextmanager
+    def _startup_step(self, name: str):
+        """Time one dependency's initialization and record whether it succeeded."""
+        started = time.perf_counter()
+        self.startup[name] = {"ready": False}
+        try:
+            yield
+        except Exception as e:
+            self.startup[name] = {
+                "ready": False,
+                "ms": round((time.perf_counter() - started) * 1000, 1),
+                "error": f"{type(e).__name__}: {e}",
+            }
+            raise
+        self.startup[name] = {"ready": True, "ms": round((time.perf_counter() - started) * 1000, 1)}
+
+    @timed("index")
+    def index_text(self, text: str, metadata: dict | None = None, document_id: str | None = None):
         """
-        Chunk a large document, embed each chunk, and store in Qdrant.
+        Chunk a document, embed new or changed chunks, and store them in the vector store.
+
+        Point IDs are derived from (document_id, chunk content), so re-indexing a
+        document only embeds chunks that are not stored yet and deletes chunks
+        that no longer appear in it. Without a document_id, one is derived from
+        the text itself.
         """
-        chunks = chunk_text(text)
-        vectors = self.embeddings.embed_texts(chunks)
-        payloads = [{"content": c, **(metadata or {})} for c in chunks]
-        self.qdrant.upsert_vectors(self.collection_name, vectors, payloads)
-        return {"chunks_indexed": len(chunks)}
+        document_id, chunks, ids, payloads = self._prepare_chunks(text, metadata, document_id)
 
-    def search(self, query: str, top_k: int = 3):
+        existing = self.vector_store.existing_ids(self.collection_name, ids, self.embeddings.provider)
+        new = [i for i, point_id in enumerate(ids) if point_id not in existing]
+        if new:
+            new_chunks = [chunks[i] for i in new]
+            new_payloads = [payloads[i] for i in new]
+            vectors = self.embed_chunks(new_chunks, new_payloads)
+            self.vector_store.upsert_vectors(
+                self.collection_name, vectors, new_payloads, [ids[i] for i in new],
+                sparse_vectors=self.encode_sparse(new_chunks)
+            )
+            self.add_sparse_stats([ids[i] for i in new], new_chunks)
+
+        stale = sorted(self.registry.get_chunk_ids(document_id) - set(ids))
+        self.vector_store.delete_points(self.collection_name, stale)
+        self.remove_sparse_stats(stale)
+        self.registry.replace(document_id, ids)
+
+        if new or stale:
+            self.invalidate_answer_cache()
+        return self._index_summary(document_id, len(new), len(ids) - len(new), len(stale))
+
+    @timed("index")
+    async def aindex_text(self, text: str, metadata: dict | None = None, document_id: str | None = None):
         """
-        Retrieve the most relevant chunks from Qdrant using semantic similarity.
+        Async variant of index_text. Chunking runs in a worker thread.
         """
-        query_vector = self.embeddings.embed_text(query)
-        results = self.qdrant.search_vectors(self.collection_name, query_vector, top_k=top_k)
+        document_id, chunks, ids, payloads = await asyncio.to_thread(
+            self._prepare_chunks, text, metadata, document_id
+        )
 
+        existing = await self.vector_store.aexisting_ids(self.collection_name, ids, self.embeddings.provider)
+        new = [i for i, point_id in enumerate(ids) if point_id not in existing]
+        if new:
+            new_chunks = [chunks[i] for i in new]
+            new_payloads = [payloads[i] for i in new]
+            vectors = await self.aembed_chunks(new_chunks, new_payloads)
+            await self.vector_store.aupsert_vectors(
+                self.collection_name, vectors, new_payloads, [ids[i] for i in new],
+                sparse_vectors=self.encode_sparse(new_chunks)
+            )
+            self.add_sparse_stats([ids[i] for i in new], new_chunks)
+
+        stale = sorted(self.registry.get_chunk_ids(document_id) - set(ids))
+        await self.vector_store.adelete_points(self.collection_name, stale)
+        self.remove_sparse_stats(stale)
+        self.registry.replace(document_id, ids)
+
+        if new or stale:
+            self.invalidate_answer_cache()
+        return self._index_summary(document_id, len(new), len(ids) - len(new), len(stale))
+
+    def search(self, query: str, top_k: int = 3, filters: Optional[Dict[str, Any]] = None):
+        """
+        Retrieve the most relevant chunks from the vector store using semantic similarity.
+        filters restricts the search to chunks whose payload matches, e.g.
+        {"tenant": "acme", "source": ["a.pdf", "b.pdf"], "page": {"gte": 2}}
+        (fields must be listed in PAYLOAD_INDEX_FIELDS; raises ValueError otherwise).
+        """
+        conditions = parse_filters(filters, settings.payload_index_fields)
+        self._log_query(query)
+        query_vector = self.embeddings.embed_text(query, input_type="search_query")
+        return self._retrieve(query, query_vector, top_k, conditions=conditions)
+
+    async def asearch(self, query: str, top_k: int = 3, filters: Optional[Dict[str, Any]] = None):
+        """
+        Async variant of search.
+        """
+        conditions = parse_filters(filters, settings.payload_index_fields)
+        self._log_query(query)
+        query_vector = await self._aembed_query(query)
+        return await self._aretrieve(query, query_vector, top_k, conditions=conditions)
+
+    def search_many(
+        self, queries: List[str], top_k: int = 3, filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Batch variant of search: all queries are embedded with one embed_texts
+        call and searched in one vector store round trip (Qdrant's batch query API).
+        Returns [{"query": ..., "results": [...]}] in the order of queries.
+        Batch queries are not recorded in the query log, which only counts
+        interactive traffic for the startup warm-up.
+        """
+        conditions = parse_filters(filters, settings.payload_index_fields)
+        if not queries:
+            return []
+        query_vectors = self.embeddings.embed_texts(queries, input_type="search_query")
+        fetch_k = self._fetch_k(top_k)
+        batches = self.vector_store.search_batch(
+            self.collection_name, query_vectors, top_k=fetch_k, with_vectors=fetch_k > top_k,
+            filters=conditions, sparse_vectors=self._sparse_queries(queries)
+        )
         return [
-            {"score": r.score, "content": r.payload.get("content", "")}
-            for r in results
+            {"query": query, "results": self._rerank(query, query_vector, results, top_k)}
+            for query, query_vector, results in zip(queries, query_vectors, batches)
         ]
 
-    def generate_answer(self, query: str, top_k: int = 3):
+    async def asearch_many(
+        self,
+        queries: List[str],
+        top_k: int = 3,
+        filters: Optional[Dict[str, Any]] = None,
+        generate: bool = False,
+        concurrency: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Async variant of search_many. With generate=True every entry also carries
+        the fields of an agenerate_answer response, generated concurrently with at
+        most `concurrency` (default BATCH_ANSWER_CONCURRENCY) Gemini calls in flight.
+        A failed generation sets "error" on its entry instead of failing the batch.
+        """
+        conditions = parse_filters(filters, settings.payload_index_fields)
+        if not queries:
+            return []
+        query_vectors = await self.embeddings.aembed_texts(queries, input_type="search_query")
+        fetch_k = self._fetch_k(top_k)
+        batches = await self.vector_store.asearch_batch(
+            self.collection_name, query_vectors, top_k=fetch_k, with_vectors=fetch_k > top_k,
+            filters=conditions, sparse_vectors=self._sparse_queries(queries)
+        )
+        # Rerank every query at once so cross-encoder calls overlap in worker threads
+        reranked = await asyncio.gather(*(
+            self._arerank(query, query_vector, results, top_k)
+            for query, query_vector, results in zip(queries, query_vectors, batches)
+        ))
+        entries = [{"query": query, "results": results} for query, results in zip(queries, reranked)]
+        if not generate:
+            return entries
+
+        semaphore = asyncio.Semaphore(max(1, concurrency or settings.BATCH_ANSWER_CONCURRENCY))
+
+        async def answer(entry: Dict[str, Any], query_vector) -> dict:
+            async with semaphore:
+                return await self._aanswer(
+                    entry["query"], query_vector, entry["results"],
+                    self._lookup_answer(query_vector, conditions), {}, conditions
+                )
+
+        answers = await asyncio.gather(
+            *(answer(entry, query_vector) for entry, query_vector in zip(entries, query_vectors)),
+            return_exceptions=True,
+        )
+        for entry, result in zip(entries, answers):
+            if isinstance(result, Exception):
+                entry["error"] = str(result)
+            else:
+                entry.update(result)
+        return entries
+
+    def generate_answer(self, query: str, top_k: int = 3, filters: Optional[Dict[str, Any]] = None):
         """
         Combine retrieval and generation:
         1. Retrieve top-k similar chunks
         2. Compose a prompt with context
         3. Ask Gemini to generate a context-aware answer
+
+        Retrieved chunks are stitched into contiguous spans and packed into
+        CONTEXT_MAX_TOKENS; the spans used are returned under "context_spans".
+        Near-duplicate questions are served from the answer cache
+        (flagged with "cached": True) without calling Gemini; filtered
+        questions (see search) bypass the cache.
+        Per-stage latencies (ms) are returned under "timings".
+        """
+        started = time.perf_counter()
+        timings: Dict[str, float] = {}
+        conditions = parse_filters(filters, settings.payload_index_fields)
+        self._log_query(query)
+        query_vector = self.embeddings.embed_text(query, input_type="search_query")
+        timings["embed_ms"] = _stage_ms("embed_ms", started)
+        entry = self._lookup_answer(query_vector, conditions)
+        if entry is not None and self.answer_cache.is_fresh(entry):
+            return self._cache_hit(query, entry, timings)
+
+        retrieved_docs = self._retrieve(query, query_vector, top_k, timings, conditions)
+        if not retrieved_docs:
+            return {"answer": "No relevant information found."}
+        if entry is not None and self.answer_cache.is_fresh(entry, self._context_ids(retrieved_docs)):
+            return self._cache_hit(query, entry, timings)
+
+        spans = self._build_context(retrieved_docs)
+        stage_start = time.perf_counter()
+        response = self._generate(self._build_prompt(query, spans))
+        timings["generate_ms"] = _stage_ms("generate_ms", stage_start)
+        result = self._format_answer(query, response.text, retrieved_docs, spans)
+        self._store_answer(query_vector, retrieved_docs, result, conditions)
+        return {**result, "timings": timings}
+
+    async def agenerate_answer(self, query: str, top_k: int = 3, filters: Optional[Dict[str, Any]] = None):
+        """
+        Async variant of generate_answer; the Gemini call does not block the event loop.
+        """
+        started = time.perf_counter()
+        timings: Dict[str, float] = {}
+        conditions = parse_filters(filters, settings.payload_index_fields)
+        self._log_query(query)
+        query_vector = await self._aembed_query(query)
+        timings["embed_ms"] = _stage_ms("embed_ms", started)
+        entry = self._lookup_answer(query_vector, conditions)
+        if entry is not None and self.answer_cache.is_fresh(entry):
+            return self._cache_hit(query, entry, timings)
+
+        retrieved_docs = await self._aretrieve(query, query_vector, top_k, timings, conditions)
+        return await self._aanswer(query, query_vector, retrieved_docs, entry, timings, conditions)
+
+    async def astream_answer(
+        self, query: str, top_k: int = 3, filters: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Stream the RAG answer as (event, data) pairs:
+        - "context": context spans sent to Gemini, emitted as soon as search returns
+        - "token": incremental answer text as Gemini produces it
+        - "done": final event with cache flag and per-stage timings (ms)
+        """
+        started = time.perf_counter()
+        timings: Dict[str, float] = {}
+
+        def mark(stage: str, since: float) -> float:
+            timings[stage] = _stage_ms(stage, since)
+            return time.perf_counter()
+
+        conditions = parse_filters(filters, settings.payload_index_fields)
+        self._log_query(query)
+        query_vector = await self._aembed_query(query)
+        stage_start = mark("embed_ms", started)
+
+        entry = self._lookup_answer(query_vector, conditions)
+        if entry is not None and self.answer_cache.is_fresh(entry):
+            result = self._cache_hit(query, entry)
+            yield "context", {
+                "context_used": result.get("context_used", []), "context_spans": result.get("context_spans", [])
+            }
+            yield "token", {"text": result["answer"]}
+            mark("total_ms", started)
+            yield "done", {"cached": True, "timings": timings}
+            return
+
+        retrieved_docs = await self._aretrieve(query, query_vector, top_k, timings, conditions)
+        stage_start = time.perf_counter()
+        spans = self._build_context(retrieved_docs)
+        yield "context", {"context_used": [span.text for span in spans], "context_spans": _describe(spans)}
+
+        if not retrieved_docs:
+            yield "token", {"text": "No relevant information found."}
+            mark("total_ms", started)
+            yield "done", {"cached": False, "timings": timings}
+            return
+
+        if entry is not None and self.answer_cache.is_fresh(entry, self._context_ids(retrieved_docs)):
+            result = self._cache_hit(query, entry)
+            yield "token", {"text": result["answer"]}
+            mark("total_ms", started)
+            yield "done", {"cached": True, "timings": timings}
+            return
+
+        parts = []
+        response = await self._agenerate(self._build_prompt(query, spans), stream=True)
+        async for chunk in response:
+            if not chunk.text:
+                continue
+            if not parts:
+                mark("first_token_ms", stage_start)
+            parts.append(chunk.text)
+            yield "token", {"text": chunk.text}
+        mark("generate_ms", stage_start)
+
+        self._store_answer(
+            query_vector, retrieved_docs, self._format_answer(query, "".join(parts), retrieved_docs, spans), conditions
+        )
+        mark("total_ms", started)
+        yield "done", {"cached": False, "timings": timings}
+
+    def stats(self):
+        """
+        Report cache and batching counters for tuning.
+        """
+        return {
+            "embedding_cache": self.embeddings.cache_stats(),
+            "embedding_limiter": self.embeddings.limiter_stats(),
+            "query_batcher": self.query_batcher.stats() if self.query_batcher else {},
+            "answer_cache": self.answer_cache.stats() if self.answer_cache else {},
+            "query_log": self.query_log.stats() if self.query_log else {},
+        }
+
+    async def awarm_up(self, limit: int) -> Dict[str, Any]:
+        """
+        Warm the request path before traffic arrives: pre-embed the `limit` most
+        frequent logged queries (filling the embedding cache), pre-run their
+        searches, and open pooled connections to the embedding provider, the
+        vector store and Gemini on the serving event loop.
+        Returns the duration, the number of queries warmed and per-dependency status.
+        """
+        started = time.perf_counter()
+        queries = self.query_log.top(limit) if self.query_log is not None and limit > 0 else []
+        # With an empty log a probe query still opens every connection
+        texts = queries or [WARMUP_PROBE]
+        dependencies: Dict[str, str] = {}
+
+        query_vectors = None
+        try:
+            query_vectors = await self.embeddings.aembed_texts(texts, input_type="search_query")
+            dependencies["embeddings"] = "ok"
+        except Exception as e:
+            dependencies["embeddings"] = f"{type(e).__name__}: {e}"
+
+        if query_vectors is not None:
+            fetch_k = self._fetch_k(3)
+            try:
+                await self.vector_store.asearch_batch(
+                    self.collection_name, query_vectors, top_k=fetch_k,
+                    with_vectors=fetch_k > 3, sparse_vectors=self._sparse_queries(texts)
+                )
+                dependencies["vector_store"] = "ok"
+            except Exception as e:
+                dependencies["vector_store"] = f"{type(e).__name__}: {e}"
+
+        try:
+            # Token counting is free and goes through the same client as generation
+            await self.llm.count_tokens_async(WARMUP_PROBE)
+            dependencies["llm"] = "ok"
+        except Exception as e:
+            dependencies["llm"] = f"{type(e).__name__}: {e}"
+
+        return {
+            "entries_warmed": len(queries) if dependencies.get("vector_store") == "ok" else 0,
+            "duration_ms": round(record_stage("warmup", started, per_request=False) * 1000, 1),
+            "dependencies": dependencies,
+        }
+
+    def embed_chunks(self, texts: List[str], payloads: List[dict]):
+        """
+        Embed chunks for indexing and tag each payload with the provider that
+        embedded it, so chunks embedded during a failover are re-embedded by
+        the primary the next time their document is indexed.
+        """
+        vectors, providers = self.embeddings.embed_texts_with_providers(texts)
+        for payload, provider in zip(payloads, providers):
+            payload["embedding_provider"] = provider
+        return vectors
+
+    async def aembed_chunks(self, texts: List[str], payloads: List[dict]):
+        """
+        Async variant of embed_chunks.
+        """
+        vectors, providers = await self.embeddings.aembed_texts_with_providers(texts)
+        for payload, provider in zip(payloads, providers):
+            payload["embedding_provider"] = provider
+        return vectors
+
+    def encode_sparse(self, texts: List[str]):
+        """
+        BM25 vectors for newly indexed chunks, or None when hybrid search is off.
+        """
+        if self.sparse_encoder is None:
+            return None
+        return self.sparse_encoder.encode_documents(texts)
+
+    def add_sparse_stats(self, chunk_ids: List[str], texts: List[str]):
+        """
+        Count chunks in the BM25 statistics once they are stored, so failed writes are never counted.
+        """
+        if self.sparse_encoder is not None:
+            self.sparse_encoder.add_documents(chunk_ids, texts)
+
+    def remove_sparse_stats(self, chunk_ids: List[str]):
         """
-        retrieved_docs = self.search(query, top_k)
+        Subtract deleted chunks from the BM25 statistics.
+        """
+        if self.sparse_encoder is not None:
+            self.sparse_encoder.remove_documents(chunk_ids)
+
+    def invalidate_answer_cache(self):
+        """
+        Signal that the collection changed so cached answers are re-validated.
+        """
+        if self.answer_cache is not None:
+            self.answer_cache.invalidate()
+
+    async def aclose(self):
+        """
+        Release pooled connections held by the embedding and vector store clients.
+        """
+        await self.embeddings.aclose()
+        await self.vector_store.aclose()
+        if self.query_log is not None:
+            self.query_log.close()
+
+    @staticmethod
+    def _prepare_chunks(
+        text: str, metadata: dict | None, document_id: str | None
+    ) -> Tuple[str, List[str], List[str], List[dict]]:
+        """
+        Chunk text and assign deterministic point IDs. Repeated chunks collapse into one point.
+        Payloads record each chunk's (start, end) character span in the document.
+        """
+        document_id = document_id or make_document_id(text)
+        chunks, ids, payloads = [], [], []
+        seen = set()
+        for chunk in iter_chunks([text]):
+            point_id = make_chunk_id(document_id, chunk.text)
+            if point_id in seen:
+                continue
+            seen.add(point_id)
+            chunks.append(chunk.text)
+            ids.append(point_id)
+            payloads.append({
+                "content": chunk.text,
+                "document_id": document_id,
+                "start": chunk.start,
+                "end": chunk.end,
+                **(metadata or {})
+            })
+        return document_id, chunks, ids, payloads
+
+    @staticmethod
+    def _index_summary(document_id: str, indexed: int, unchanged: int, deleted: int) -> dict:
+        return {
+            "document_id": document_id,
+            "chunks_indexed": indexed,
+            "chunks_unchanged": unchanged,
+            "chunks_deleted": deleted,
+        }
+
+    def _retrieve(
+        self,
+        query: str,
+        query_vector,
+        top_k: int,
+        timings: Optional[Dict[str, float]] = None,
+        conditions: Optional[List[FieldFilter]] = None,
+    ) -> list:
+        timings = {} if timings is None else timings
+        fetch_k = self._fetch_k(top_k)
+        stage_start = time.perf_counter()
+        results = self.vector_store.search_vectors(
+            self.collection_name, query_vector, top_k=fetch_k,
+            sparse_vector=self._sparse_query(query), with_vectors=fetch_k > top_k, filters=conditions
+        )
+        timings["search_ms"] = _stage_ms("search_ms", stage_start)
+        return self._rerank(query, query_vector, results, top_k, timings)
+
+    async def _aretrieve(
+        self,
+        query: str,
+        query_vector,
+        top_k: int,
+        timings: Optional[Dict[str, float]] = None,
+        conditions: Optional[List[FieldFilter]] = None,
+    ) -> list:
+        timings = {} if timings is None else timings
+        fetch_k = self._fetch_k(top_k)
+        stage_start = time.perf_counter()
+        results = await self.vector_store.asearch_vectors(
+            self.collection_name, query_vector, top_k=fetch_k,
+            sparse_vector=self._sparse_query(query), with_vectors=fetch_k > top_k, filters=conditions
+        )
+        timings["search_ms"] = _stage_ms("search_ms", stage_start)
+        return await self._arerank(query, query_vector, results, top_k, timings)
+
+    def _rerank(
+        self, query: str, query_vector, results: list, top_k: int, timings: Optional[Dict[str, float]] = None
+    ) -> list:
+        """Cut oversampled search results down to top_k (reranker, then MMR) and format them."""
+        if len(results) > top_k:
+            stage_start = time.perf_counter()
+            scores = self.reranker(query, self._passages(results)) if self.reranker else None
+            results = self._select(query_vector, results, top_k, scores)
+            if timings is not None:
+                timings["rerank_ms"] = _stage_ms("rerank_ms", stage_start)
+        return self._format_results(results)
+
+    async def _arerank(
+        self, query: str, query_vector, results: list, top_k: int, timings: Optional[Dict[str, float]] = None
+    ) -> list:
+        """Async variant of _rerank; the cross-encoder runs in a worker thread."""
+        if len(results) > top_k:
+            stage_start = time.perf_counter()
+            scores = None
+            if self.reranker:
+                scores = await asyncio.to_thread(self.reranker, query, self._passages(results))
+            results = self._select(query_vector, results, top_k, scores)
+            if timings is not None:
+                timings["rerank_ms"] = _stage_ms("rerank_ms", stage_start)
+        return self._format_results(results)
+
+    async def _aanswer(
+        self,
+        query: str,
+        query_vector,
+        retrieved_docs: list,
+        entry,
+        timings: Dict[str, float],
+        conditions: Optional[List[FieldFilter]] = None,
+    ) -> dict:
+        """Answer from retrieved chunks: a still-valid cached answer, else a Gemini generation."""
         if not retrieved_docs:
             return {"answer": "No relevant information found."}
+        if entry is not None and self.answer_cache.is_fresh(entry, self._context_ids(retrieved_docs)):
+            return self._cache_hit(query, entry, timings)
+
+        spans = self._build_context(retrieved_docs)
+        stage_start = time.perf_counter()
+        response = await self._agenerate(self._build_prompt(query, spans))
+        timings["generate_ms"] = _stage_ms("generate_ms", stage_start)
+        result = self._format_answer(query, response.text, retrieved_docs, spans)
+        self._store_answer(query_vector, retrieved_docs, result, conditions)
+        return {**result, "timings": timings}
+
+    @staticmethod
+    def _fetch_k(top_k: int) -> int:
+        return top_k * max(settings.RETRIEVAL_OVERSAMPLE, 1)
+
+    @staticmethod
+    def _passages(results) -> List[str]:
+        return [r.payload.get("content", "") for r in results]
+
+    def _select(self, query_vector, results: list, top_k: int, scores: Optional[List[float]] = None) -> list:
+        """
+        Reduce oversampled candidates to top_k with MMR, so near-duplicate
+        neighbouring chunks do not crowd out other relevant context.
+        Relevance is the reranker score, else the fused score in hybrid mode,
+        else cosine similarity to the query.
+        """
+        if scores is None and self.sparse_encoder is not None:
+            scores = [r.score for r in results]
+        order = mmr_select(
+            query_vector, [r.vector for r in results], top_k,
+            lambda_mult=settings.MMR_LAMBDA, relevance=scores
+        )
+        return [results[i] for i in order]
+
+    def _generate(self, prompt: str):
+        try:
+            return self.llm.generate_content(prompt)
+        except Exception:
+            record_error("generate")
+            raise
+
+    async def _agenerate(self, prompt: str, stream: bool = False):
+        try:
+            return await self.llm.generate_content_async(prompt, stream=stream)
+        except Exception:
+            record_error("generate")
+            raise
+
+    def _sparse_query(self, query: str):
+        if self.sparse_encoder is None:
+            return None
+        return self.sparse_encoder.encode_query(query)
+
+    def _log_query(self, query: str):
+        if self.query_log is not None:
+            self.query_log.record(query)
+
+    def _sparse_queries(self, queries: List[str]):
+        if self.sparse_encoder is None:
+            return None
+        return [self.sparse_encoder.encode_query(query) for query in queries]
+
+    async def _aembed_query(self, query: str):
+        if self.query_batcher is not None:
+            return await self.query_batcher.embed(query)
+        return await self.embeddings.aembed_text(query, input_type="search_query")
 
-        # Combine top-k chunks into one context string
-        context = "\n\n".join([doc["content"] for doc in retrieved_docs])
+    def _lookup_answer(self, query_vector, conditions: Optional[List[FieldFilter]] = None):
+        # Cached answers are keyed by query alone, so filtered questions cannot reuse them
+        if self.answer_cache is None or conditions:
+            return None
+        return self.answer_cache.lookup(query_vector)
+
+    def _cache_hit(self, query: str, entry, timings: Optional[Dict[str, float]] = None) -> dict:
+        self.answer_cache.record(hit=True)
+        return {**entry.result, "query": query, "cached": True, "timings": timings or {}}
+
+    def _store_answer(
+        self, query_vector, retrieved_docs: list, result: dict, conditions: Optional[List[FieldFilter]] = None
+    ):
+        if self.answer_cache is None or conditions:
+            return
+        self.answer_cache.record(hit=False)
+        self.answer_cache.store(query_vector, self._context_ids(retrieved_docs), result)
+
+    @staticmethod
+    def _context_ids(retrieved_docs: list) -> list:
+        return [doc["id"] for doc in retrieved_docs]
+
+    @staticmethod
+    def _format_results(results):
+        return [
+            {
+                "id": str(r.id),
+                "score": r.score,
+                "content": r.payload.get("content", ""),
+                "source": r.payload.get("source"),
+                "page": r.payload.get("page"),
+                "document_id": r.payload.get("document_id"),
+                "start": r.payload.get("start"),
+                "end": r.payload.get("end"),
+            }
+            for r in results
+        ]
+
+    @staticmethod
+    def _build_context(retrieved_docs: list) -> List[ContextSpan]:
+        return build_context(retrieved_docs, settings.CONTEXT_MAX_TOKENS)
+
+    @staticmethod
+    def _build_prompt(query: str, spans: List[ContextSpan]) -> str:
+        # Merged, budgeted spans of the retrieved chunks
+        context = format_context(spans)
 
         # Build a clear, concise system prompt
-        prompt = f"""
+        return f"""
         You are a helpful assistant. 
         Use the following context to answer the user's question accurately and clearly.
 
@@ -80,9 +743,53 @@ class SemanticSearchService:
         Question: {query}
         """
 
-        response = self.llm.generate_content(prompt)
+    @staticmethod
+    def _format_answer(query: str, answer: str, retrieved_docs: list, spans: List[ContextSpan]) -> dict:
+        used_ids = {chunk_id for span in spans for chunk_id in span.chunk_ids}
         return {
             "query": query,
-            "answer": response.text.strip(),
-            "context_used": [doc["content"] for doc in retrieved_docs],
-        }
\ No newline at end of file
+            "answer": answer.strip(),
+            "context_used": [span.text for span in spans],
+            "context_spans": _describe(spans),
+            "citations": [
+                {"source": doc["source"], "page": doc["page"]}
+                for doc in retrieved_docs
+                if doc["id"] in used_ids and (doc.get("source") or doc.get("page"))
+            ],
+            "cached": False,
+        }
+
+
+# Query embedded and searched at warm-up when the query log is empty
+WARMUP_PROBE = "warm-up"
+
+# Metric stage recorded for each entry of the per-answer timings
+_TIMING_STAGES = {
+    "embed_ms": "embed_query",
+    "search_ms": "search",
+    "rerank_ms": "rerank",
+    "first_token_ms": "first_token",
+    "generate_ms": "generate",
+}
+
+
+def _describe(spans: List[ContextSpan]) -> List[Dict[str, Any]]:
+    """Which parts of which documents went into the prompt."""
+    return [
+        {
+            "document_id": span.document_id,
+            "start": span.start,
+            "end": span.end,
+            "chunk_ids": span.chunk_ids,
+            "tokens": span.tokens,
+            "truncated": span.truncated,
+        }
+        for span in spans
+    ]
+
+
+def _stage_ms(key: str, since: float) -> float:
+    """Duration since `since` in ms, also recorded in the stage metrics when `key` maps to a stage."""
+    stage = _TIMING_STAGES.get(key)
+    seconds = record_stage(stage, since) if stage else time.perf_counter() - since
+    return round(seconds * 1000, 2)
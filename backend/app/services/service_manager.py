@@ -0,0 +1,183 @@
+"""
+Lazy construction and background warm-up of the RAG service.
+
+Importing the API modules only imports this file; the embedding client,
+vector store and Gemini SDK are loaded when the service is first built.
+The FastAPI lifespan starts that build in a worker thread, so /health answers
+immediately, and a failing dependency (e.g. Qdrant unreachable) is retried
+with backoff instead of crashing the process. Once built, the most frequent
+logged queries are pre-embedded and pre-searched and pooled connections are
+opened before /health/ready passes. /health/ready reports progress.
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+
+
+class ServiceUnavailable(RuntimeError):
+    """Raised when the RAG service is not ready in time to handle a request."""
+
+
+class ServiceManager:
+    """
+    Owns the process-wide SemanticSearchService and its ingestion manager.
+
+    States: idle (not started), warming, failed (retrying), warming_caches, ready.
+    """
+
+    def __init__(self, retry_initial_seconds: float = 1.0, retry_max_seconds: float = 30.0):
+        self.retry_initial_seconds = retry_initial_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.service = None
+        self.ingestion = None
+        self.state = "idle"
+        self.error: Optional[str] = None
+        self.attempts = 0
+        self.warmup_ms: Optional[float] = None
+        self.cache_warmup: Optional[Dict[str, Any]] = None
+        self.dependencies: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._cache_task: Optional[asyncio.Task] = None
+        self._caches_pending = False
+
+    @property
+    def ready(self) -> bool:
+        return self.service is not None and self.state == "ready"
+
+    def ensure_ready(self):
+        """
+        Build the service in the calling thread if it does not exist yet and return it.
+        Used by the background warm-up and by scripts that need the service synchronously.
+        """
+        with self._lock:
+            if self.service is None:
+                self._build()
+        return self.service
+
+    def _build(self):
+        self.attempts += 1
+        self.state = "warming"
+        self.dependencies = {}
+        started = time.perf_counter()
+        try:
+            from app.services.ingestion import create_ingestion_manager
+            from app.services.semantic import SemanticSearchService
+
+            service = SemanticSearchService(startup=self.dependencies)
+            self.ingestion = create_ingestion_manager(service)
+        except Exception as e:
+            self.state = "failed"
+            self.error = f"{type(e).__name__}: {e}"
+            raise
+        self.warmup_ms = round((time.perf_counter() - started) * 1000, 1)
+        self.service = service
+        self.state = "warming_caches" if self._caches_pending else "ready"
+        self.error = None
+        print(f"✅ RAG service ready in {self.warmup_ms:.0f} ms (attempt {self.attempts})")
+
+    def start(self):
+        """
+        Begin warming up on the running event loop (no-op if ready or already warming).
+        """
+        if self.service is not None:
+            return
+        loop = asyncio.get_running_loop()
+        # A task left over from another event loop (e.g. a previous test client) cannot be awaited here
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._task = loop.create_task(self._warm_up())
+
+    async def _warm_up(self):
+        self._caches_pending = True
+        delay = self.retry_initial_seconds
+        while self.service is None:
+            try:
+                await asyncio.to_thread(self.ensure_ready)
+            except Exception:
+                print(f"⚠️  RAG service warm-up failed (attempt {self.attempts}): {self.error}; retrying in {delay:.0f}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.retry_max_seconds)
+        # Requests can use the service from here on; only the readiness probe waits for the caches
+        self._cache_task = asyncio.get_running_loop().create_task(self._warm_caches())
+
+    async def _warm_caches(self):
+        """
+        Run the service's cache and connection warm-up (top WARMUP_QUERIES logged
+        queries), then report ready; a failed or slow warm-up is reported, not fatal.
+        """
+        try:
+            self.cache_warmup = await asyncio.wait_for(
+                self.service.awarm_up(settings.WARMUP_QUERIES), settings.WARMUP_TIMEOUT_SECONDS
+            )
+            print(
+                f"✅ Warmed {self.cache_warmup['entries_warmed']} frequent queries "
+                f"in {self.cache_warmup['duration_ms']:.0f} ms: {self.cache_warmup['dependencies']}"
+            )
+        except asyncio.TimeoutError:
+            self.cache_warmup = {"error": f"timed out after {settings.WARMUP_TIMEOUT_SECONDS:.0f}s"}
+            print(f"⚠️  Cache warm-up {self.cache_warmup['error']}")
+        except Exception as e:
+            self.cache_warmup = {"error": f"{type(e).__name__}: {e}"}
+            print(f"⚠️  Cache warm-up failed: {self.cache_warmup['error']}")
+        finally:
+            self._caches_pending = False
+            self.state = "ready"
+
+    async def get(self, timeout: Optional[float] = None):
+        """
+        Return the service, starting the warm-up if needed and waiting up to
+        `timeout` seconds (default SERVICE_READY_TIMEOUT_SECONDS) for it.
+        """
+        if self.service is not None:
+            return self.service
+        self.start()
+        if timeout is None:
+            timeout = settings.SERVICE_READY_TIMEOUT_SECONDS
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), timeout)
+        except asyncio.TimeoutError:
+            detail = f"RAG service is {self.state}"
+            raise ServiceUnavailable(f"{detail}: {self.error}" if self.error else detail)
+        return self.service
+
+    def readiness(self) -> Dict[str, Any]:
+        """
+        Overall readiness plus per-dependency status and init time, for /health/ready.
+        """
+        return {
+            "ready": self.ready,
+            "state": self.state,
+            "attempts": self.attempts,
+            "warmup_ms": self.warmup_ms,
+            "cache_warmup": self.cache_warmup,
+            "error": self.error,
+            "dependencies": dict(self.dependencies),
+        }
+
+    async def aclose(self):
+        """
+        Stop a pending warm-up, release the service's pooled connections and
+        stop the PDF extraction workers.
+        The closed service is dropped, so a later get() or ensure_ready() builds a new one.
+        """
+        for task in (self._task, self._cache_task):
+            if task is not None and not task.done():
+                task.cancel()
+        with self._lock:
+            service, self.service, self.ingestion = self.service, None, None
+            self.state = "idle"
+            self._caches_pending = False
+        if service is not None:
+            await service.aclose()
+        # Only a process that parsed a PDF has loaded the parser (and its pool)
+        file_parser = sys.modules.get("app.services.file_parser")
+        if file_parser is not None:
+            await asyncio.to_thread(file_parser.shutdown_pdf_pool)
+
+
+service_manager = ServiceManager(retry_max_seconds=settings.SERVICE_WARMUP_RETRY_MAX_SECONDS)
@@ -0,0 +1,163 @@
+"""
+BM25-style sparse lexical vectors for hybrid retrieval.
+Term statistics (document frequency, average length) are maintained locally.
+"""
+
+import json
+import math
+import re
+import sqlite3
+import threading
+import zlib
+from collections import Counter
+from typing import Dict, List, Tuple
+
+# Keeps identifiers such as "ERR-404", "v1.2.3" or "user_id" as single tokens
+TOKEN_PATTERN = re.compile(r"\w+(?:[-_.]\w+)*")
+
+SparseVector = Tuple[List[int], List[float]]
+
+# Bound variables per statement (SQLite's default limit on older builds is 999)
+SQLITE_MAX_PARAMS = 500
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def term_id(token: str) -> int:
+    """Hash a token into a stable sparse index, so no shared vocabulary is needed."""
+    return zlib.crc32(token.encode("utf-8")) & 0x7FFFFFFF
+
+
+class BM25Encoder:
+    """
+    Encodes documents and queries as sparse vectors whose dot product is the BM25 score.
+
+    Documents carry the saturated, length-normalized term frequency; queries carry
+    the IDF of each term. IDF lives only on the query side, so documents never need
+    re-encoding as the corpus statistics drift.
+
+    Statistics change only through add_documents (after a chunk is stored) and
+    remove_documents (after it is deleted). The terms of each counted chunk are
+    kept so its deletion can be subtracted again.
+    """
+
+    def __init__(self, db_path: str = "sparse_stats.db", k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS terms (term_id INTEGER PRIMARY KEY, df INTEGER NOT NULL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value REAL NOT NULL)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS chunks (chunk_id TEXT PRIMARY KEY, terms TEXT NOT NULL, length INTEGER NOT NULL)"
+        )
+        self._db.commit()
+
+        self._df: Dict[int, int] = dict(self._db.execute("SELECT term_id, df FROM terms").fetchall())
+        meta = dict(self._db.execute("SELECT key, value FROM meta").fetchall())
+        self.doc_count = int(meta.get("doc_count", 0))
+        self.total_length = meta.get("total_length", 0.0)
+
+    @property
+    def avg_length(self) -> float:
+        return self.total_length / self.doc_count if self.doc_count else 1.0
+
+    def encode_documents(self, texts: List[str]) -> List[SparseVector]:
+        """
+        Encode documents about to be indexed. The corpus statistics are not
+        touched; call add_documents once the chunks are stored.
+        """
+        counts = [Counter(term_id(t) for t in tokenize(text)) for text in texts]
+        avg_length = self.avg_length
+
+        vectors = []
+        for terms in counts:
+            length = sum(terms.values())
+            norm = self.k1 * (1 - self.b + self.b * length / avg_length)
+            indices = list(terms.keys())
+            values = [tf * (self.k1 + 1) / (tf + norm) for tf in terms.values()]
+            vectors.append((indices, values))
+        return vectors
+
+    def add_documents(self, chunk_ids: List[str], texts: List[str]):
+        """
+        Count stored chunks in the corpus statistics. Chunks already counted
+        (e.g. re-embedded under the same ID) are not counted twice.
+        """
+        with self._lock:
+            known = self._known(chunk_ids)
+            changed: Dict[int, int] = {}
+            rows = []
+            for chunk_id, text in zip(chunk_ids, texts):
+                if chunk_id in known:
+                    continue
+                known.add(chunk_id)
+                terms = Counter(term_id(t) for t in tokenize(text))
+                length = sum(terms.values())
+                for tid in terms:
+                    changed[tid] = self._df.get(tid, 0) + 1
+                    self._df[tid] = changed[tid]
+                self.doc_count += 1
+                self.total_length += length
+                rows.append((chunk_id, json.dumps(list(terms)), length))
+            if rows:
+                self._db.executemany("INSERT INTO chunks (chunk_id, terms, length) VALUES (?, ?, ?)", rows)
+                self._persist(changed)
+
+    def remove_documents(self, chunk_ids: List[str]):
+        """
+        Subtract deleted chunks from the corpus statistics. Chunks that were
+        never counted (or were counted before their terms were recorded) are ignored.
+        """
+        if not chunk_ids:
+            return
+        with self._lock:
+            rows = self._chunk_rows(chunk_ids)
+            if not rows:
+                return
+            changed: Dict[int, int] = {}
+            for _, terms, length in rows:
+                for tid in json.loads(terms):
+                    changed[tid] = max(0, self._df.get(tid, 0) - 1)
+                    self._df[tid] = changed[tid]
+                self.doc_count = max(0, self.doc_count - 1)
+                self.total_length = max(0.0, self.total_length - length)
+            self._db.executemany("DELETE FROM chunks WHERE chunk_id = ?", [(row[0],) for row in rows])
+            self._persist(changed)
+
+    def encode_query(self, text: str) -> SparseVector:
+        """
+        Encode a query as IDF weights of its distinct terms.
+        """
+        indices, values = [], []
+        for tid in {term_id(t) for t in tokenize(text)}:
+            df = self._df.get(tid, 0)
+            idf = math.log(1 + (self.doc_count - df + 0.5) / (df + 0.5))
+            indices.append(tid)
+            values.append(idf)
+        return indices, values
+
+    def _known(self, chunk_ids: List[str]) -> set:
+        return {row[0] for row in self._chunk_rows(chunk_ids)}
+
+    def _chunk_rows(self, chunk_ids: List[str]) -> List[tuple]:
+        """(chunk_id, terms, length) of the given chunks that have been counted."""
+        rows = []
+        for start in range(0, len(chunk_ids), SQLITE_MAX_PARAMS):
+            part = list(chunk_ids[start:start + SQLITE_MAX_PARAMS])
+            rows.extend(self._db.execute(
+                f"SELECT chunk_id, terms, length FROM chunks WHERE chunk_id IN ({','.join('?' * len(part))})", part
+            ).fetchall())
+        return rows
+
+    def _persist(self, changed: Dict[int, int]):
+        self._db.executemany(
+            "INSERT OR REPLACE INTO terms (term_id, df) VALUES (?, ?)", list(changed.items())
+        )
+        self._db.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            [("doc_count", self.doc_count), ("total_length", self.total_length)],
+        )
+        self._db.commit()
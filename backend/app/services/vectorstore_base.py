@@ -0,0 +1,167 @@
+"""
+Vector store interface shared by the Qdrant and in-process backends.
+"""
+
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from app.core.config import settings
+from app.utils.filters import FieldFilter
+
+# (indices, values) pair for a sparse vector
+SparseInput = Tuple[List[int], List[float]]
+
+# Dense vectors: a float32 (n, dim) NumPy matrix as produced by EmbeddingService, or nested float lists
+DenseVectors = Sequence[Sequence[float]]
+
+
+class SearchHit:
+    """
+    A single search result; mirrors the fields of Qdrant's ScoredPoint that callers use.
+    """
+    def __init__(self, id: str, score: float, payload: Dict[str, Any], vector: Any = None):
+        self.id = id
+        self.score = score
+        self.payload = payload
+        self.vector = vector
+
+
+class VectorStore(ABC):
+    """
+    Storage backend for chunk vectors and their payloads.
+
+    Backends implement the sync methods; the async variants default to running
+    them in a worker thread and may be overridden with native async clients.
+    """
+
+    collection_name: str
+    vector_size: int
+
+    @abstractmethod
+    def upsert_vectors(
+        self,
+        collection_name: str,
+        vectors: DenseVectors,
+        payloads: List[Dict[str, Any]],
+        ids: Optional[List[str]] = None,
+        sparse_vectors: Optional[List[SparseInput]] = None,
+    ):
+        """Insert or replace points."""
+
+    @abstractmethod
+    def search_vectors(
+        self,
+        collection_name: str,
+        query_vector: Sequence[float],
+        top_k: int = 5,
+        sparse_vector: Optional[SparseInput] = None,
+        with_vectors: bool = False,
+        filters: Optional[List[FieldFilter]] = None,
+    ) -> List[Any]:
+        """
+        Return the top-k hits (objects with id, score, payload, and the dense vector if requested).
+        With filters, only points whose payload matches every condition are considered.
+        """
+
+    def search_batch(
+        self,
+        collection_name: str,
+        query_vectors: DenseVectors,
+        top_k: int = 5,
+        with_vectors: bool = False,
+        filters: Optional[List[FieldFilter]] = None,
+        sparse_vectors: Optional[List[Optional[SparseInput]]] = None,
+    ) -> List[List[Any]]:
+        """
+        Search several query vectors (with their sparse vectors in hybrid mode)
+        and return the hits of each; backends override this with a batched call.
+        """
+        sparse_vectors = sparse_vectors or [None] * len(query_vectors)
+        return [
+            self.search_vectors(collection_name, vector, top_k, sparse, with_vectors, filters)
+            for vector, sparse in zip(query_vectors, sparse_vectors)
+        ]
+
+    @abstractmethod
+    def existing_ids(
+        self, collection_name: str, ids: List[str], embedding_provider: Optional[str] = None
+    ) -> Set[str]:
+        """
+        Return the subset of `ids` already stored. With embedding_provider,
+        points whose "embedding_provider" payload names another provider
+        (embedded during a failover) are left out, so they get re-embedded.
+        """
+
+    @abstractmethod
+    def delete_points(self, collection_name: str, ids: List[str]):
+        """Delete points by ID."""
+
+    async def aupsert_vectors(
+        self,
+        collection_name: str,
+        vectors: DenseVectors,
+        payloads: List[Dict[str, Any]],
+        ids: Optional[List[str]] = None,
+        sparse_vectors: Optional[List[SparseInput]] = None,
+    ):
+        await asyncio.to_thread(self.upsert_vectors, collection_name, vectors, payloads, ids, sparse_vectors)
+
+    async def asearch_vectors(
+        self,
+        collection_name: str,
+        query_vector: Sequence[float],
+        top_k: int = 5,
+        sparse_vector: Optional[SparseInput] = None,
+        with_vectors: bool = False,
+        filters: Optional[List[FieldFilter]] = None,
+    ) -> List[Any]:
+        return await asyncio.to_thread(
+            self.search_vectors, collection_name, query_vector, top_k, sparse_vector, with_vectors, filters
+        )
+
+    async def asearch_batch(
+        self,
+        collection_name: str,
+        query_vectors: DenseVectors,
+        top_k: int = 5,
+        with_vectors: bool = False,
+        filters: Optional[List[FieldFilter]] = None,
+        sparse_vectors: Optional[List[Optional[SparseInput]]] = None,
+    ) -> List[List[Any]]:
+        return await asyncio.to_thread(
+            self.search_batch, collection_name, query_vectors, top_k, with_vectors, filters, sparse_vectors
+        )
+
+    async def aexisting_ids(
+        self, collection_name: str, ids: List[str], embedding_provider: Optional[str] = None
+    ) -> Set[str]:
+        return await asyncio.to_thread(self.existing_ids, collection_name, ids, embedding_provider)
+
+    async def adelete_points(self, collection_name: str, ids: List[str]):
+        await asyncio.to_thread(self.delete_points, collection_name, ids)
+
+    async def aclose(self):
+        """Release any held connections or file handles."""
+
+
+def create_vector_store(collection_name: str, vector_size: int, hybrid: bool = False) -> VectorStore:
+    """
+    Build the backend selected by VECTOR_STORE_BACKEND.
+    Backends are imported lazily so the unused one's dependencies are never loaded.
+    """
+    backend = settings.VECTOR_STORE_BACKEND.lower()
+    if backend == "qdrant":
+        from app.services.vectorstore_qdrant import QdrantClientWrapper
+        return QdrantClientWrapper(collection_name=collection_name, vector_size=vector_size, hybrid=hybrid)
+    elif backend == "local":
+        from app.services.vectorstore_local import LocalVectorStore
+        if hybrid:
+            print("⚠️  Local vector store is dense-only; sparse vectors are ignored")
+        return LocalVectorStore(
+            collection_name=collection_name,
+            vector_size=vector_size,
+            path=settings.LOCAL_VECTOR_STORE_PATH,
+            filterable_fields=list(settings.payload_index_fields)
+        )
+    raise ValueError(f"Unsupported VECTOR_STORE_BACKEND: {backend}. Supported: 'qdrant', 'local'")
@@ -0,0 +1,385 @@
+"""
+In-process vector store backed by a memory-mapped float32 file.
+Brute-force cosine top-k with NumPy; no server or network hop required.
+"""
+
+import json
+import os
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from app.services.vectorstore_base import DenseVectors, SearchHit, SparseInput, VectorStore
+from app.utils.filters import FieldFilter
+
+# Rows scored per block, bounding temporary memory during batch search
+SEARCH_BLOCK_ROWS = 262144
+
+_RANGE_UFUNCS = {"gt": np.greater, "gte": np.greater_equal, "lt": np.less, "lte": np.less_equal}
+
+
+class _Column:
+    """
+    Append-only NumPy array grown by doubling. Readers slice view() without
+    the store lock: growth swaps in a new array and never changes the old one.
+    """
+
+    def __init__(self, dtype):
+        self._data = np.empty(16, dtype=dtype)
+        self._size = 0
+
+    def append(self, value):
+        if self._size == len(self._data):
+            grown = np.empty(len(self._data) * 2, dtype=self._data.dtype)
+            grown[:self._size] = self._data
+            self._data = grown
+        self._data[self._size] = value
+        self._size += 1
+
+    def view(self) -> np.ndarray:
+        data = self._data
+        return data[:min(self._size, len(data))]
+
+
+class _FieldIndex:
+    """
+    In-memory index of one filterable payload field with the semantics of
+    app.utils.filters.value_matches: rows per value for equality filters and
+    (row, number) columns for ranges. Every element of a list value is indexed,
+    so a row matches if any element does.
+    """
+
+    def __init__(self):
+        self._rows_by_value: Dict[Tuple[bool, Any], _Column] = {}
+        self._number_rows = _Column(np.int64)
+        self._numbers = _Column(np.float64)
+
+    def add(self, row: int, value: Any):
+        for item in _scalars(value):
+            key = _value_key(item)
+            rows = self._rows_by_value.get(key)
+            if rows is None:
+                rows = self._rows_by_value[key] = _Column(np.int64)
+            rows.append(row)
+            if not isinstance(item, (bool, str)):
+                # Rows first: a reader never sees a number without its row
+                self._number_rows.append(row)
+                self._numbers.append(item)
+
+    def mask(self, condition: FieldFilter, count: int) -> np.ndarray:
+        """Rows [0, count) matching the condition, built with vectorised comparisons."""
+        if condition.op == "range":
+            numbers = self._numbers.view()
+            rows = self._number_rows.view()[:len(numbers)]
+            keep = np.ones(len(numbers), dtype=bool)
+            for op, bound in condition.value.items():
+                keep &= _RANGE_UFUNCS[op](numbers, bound)
+            rows = rows[keep]
+        else:
+            options = condition.value if condition.op == "in" else [condition.value]
+            columns = [self._rows_by_value.get(_value_key(option)) for option in options]
+            rows = np.concatenate([np.empty(0, dtype=np.int64)] + [c.view() for c in columns if c is not None])
+        mask = np.zeros(count, dtype=bool)
+        mask[rows[rows < count]] = True
+        return mask
+
+
+def _scalars(value: Any) -> Iterator[Any]:
+    if isinstance(value, list):
+        for item in value:
+            yield from _scalars(item)
+    elif isinstance(value, (str, int, float, bool)):
+        yield value
+
+
+def _value_key(value: Any) -> Tuple[bool, Any]:
+    # Keep True from matching 1: booleans only equal booleans
+    return isinstance(value, bool), value
+
+
+class LocalVectorStore(VectorStore):
+    """
+    Append-only local vector store.
+
+    Files per collection (under `path`):
+    - <name>.f32: float32 matrix of L2-normalized vectors, grown by doubling
+    - <name>.jsonl: payload sidecar; one record per row plus delete tombstones
+    - <name>.meta.json: vector size, checked on open
+
+    Upserting an existing ID appends a new row and retires the old one, so
+    writes never rewrite earlier data. Payloads are read from the sidecar only
+    for the rows returned by a search; the values of `filterable_fields` are
+    indexed in memory so filtered searches can mask rows before scoring.
+    """
+
+    def __init__(
+        self,
+        collection_name: str,
+        vector_size: int,
+        path: str = "vector_store",
+        initial_capacity: int = 1024,
+        filterable_fields: Optional[List[str]] = None,
+    ):
+        self.collection_name = collection_name
+        self.vector_size = vector_size
+        self._fields: Dict[str, _FieldIndex] = {field: _FieldIndex() for field in filterable_fields or []}
+        os.makedirs(path, exist_ok=True)
+        base = os.path.join(path, collection_name)
+        self._vectors_path = base + ".f32"
+        self._payloads_path = base + ".jsonl"
+        self._lock = threading.Lock()
+
+        self._check_meta(base + ".meta.json")
+
+        self._ids: List[str] = []                   # row -> point ID
+        self._spans: List[Tuple[int, int]] = []     # row -> (offset, length) in the sidecar
+        self._rows: Dict[str, int] = {}             # point ID -> live row
+        self._load_sidecar()
+
+        if not os.path.exists(self._vectors_path):
+            with open(self._vectors_path, "wb") as f:
+                f.truncate(max(initial_capacity, 1) * self._row_bytes)
+        self._open_vectors()
+        self._ensure_capacity(len(self._ids))
+
+        self._alive = np.zeros(self._capacity, dtype=bool)
+        if self._rows:
+            self._alive[list(self._rows.values())] = True
+
+        self._writer = open(self._payloads_path, "ab")
+        self._reader_fd = os.open(self._payloads_path, os.O_RDONLY)
+
+        print(f"✅ Local vector store '{collection_name}' opened with {len(self._rows)} vectors ({vector_size}D)")
+
+    @property
+    def _row_bytes(self) -> int:
+        return self.vector_size * 4
+
+    def upsert_vectors(
+        self,
+        collection_name: str,
+        vectors: DenseVectors,
+        payloads: List[Dict[str, Any]],
+        ids: Optional[List[str]] = None,
+        sparse_vectors: Optional[List[SparseInput]] = None,
+    ):
+        """
+        Append vectors and payloads. Existing IDs are superseded by the new rows.
+        Sparse vectors are not supported by this backend and are ignored.
+        """
+        matrix = self._normalize(np.asarray(vectors, dtype=np.float32).reshape(-1, self.vector_size))
+        if not len(matrix):
+            return
+        ids = [str(i) for i in ids] if ids else [os.urandom(16).hex() for _ in range(len(matrix))]
+
+        with self._lock:
+            start = len(self._ids)
+            self._ensure_capacity(start + len(matrix))
+            self._vectors[start:start + len(matrix)] = matrix
+            self._vectors.flush()
+
+            offset = self._writer.tell()
+            lines = []
+            for point_id, payload in zip(ids, payloads):
+                line = json.dumps({"op": "put", "id": point_id, "payload": payload}).encode("utf-8") + b"\n"
+                self._spans.append((offset, len(line)))
+                offset += len(line)
+                lines.append(line)
+            self._writer.write(b"".join(lines))
+            self._writer.flush()
+
+            for field, index in self._fields.items():
+                for row, payload in enumerate(payloads, start=start):
+                    index.add(row, payload.get(field))
+            for row, point_id in enumerate(ids, start=start):
+                old = self._rows.get(point_id)
+                if old is not None:
+                    self._alive[old] = False
+                self._rows[point_id] = row
+                self._alive[row] = True
+                self._ids.append(point_id)
+
+    def search_vectors(
+        self,
+        collection_name: str,
+        query_vector: Sequence[float],
+        top_k: int = 5,
+        sparse_vector: Optional[SparseInput] = None,
+        with_vectors: bool = False,
+        filters: Optional[List[FieldFilter]] = None,
+    ) -> List[SearchHit]:
+        return self.search_batch(collection_name, [query_vector], top_k, with_vectors, filters)[0]
+
+    def search_batch(
+        self,
+        collection_name: str,
+        query_vectors: DenseVectors,
+        top_k: int = 5,
+        with_vectors: bool = False,
+        filters: Optional[List[FieldFilter]] = None,
+        sparse_vectors: Optional[List[Optional[SparseInput]]] = None,
+    ) -> List[List[SearchHit]]:
+        """
+        Score several queries at once with a single matrix product per block of rows.
+        Returned vectors (with_vectors=True) are the stored, L2-normalized rows.
+        Rows failing the filters are masked out before top-k selection.
+        Sparse vectors are not supported by this backend and are ignored.
+        """
+        queries = self._normalize(np.asarray(query_vectors, dtype=np.float32).reshape(-1, self.vector_size))
+        with self._lock:
+            count = len(self._ids)
+            vectors = self._vectors
+            alive = self._alive[:count].copy()
+        # The field indexes are append-only, so masks are built without blocking writers
+        for condition in filters or []:
+            alive &= self._filter_mask(condition, count)
+
+        k = min(top_k, int(alive.sum()))
+        if k <= 0:
+            return [[] for _ in range(len(queries))]
+
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        for start in range(0, count, SEARCH_BLOCK_ROWS):
+            end = min(start + SEARCH_BLOCK_ROWS, count)
+            scores = queries @ vectors[start:end].T
+            scores[:, ~alive[start:end]] = -np.inf
+            rows = self._top_k(scores, k)
+            best_rows = np.concatenate([best_rows, rows + start], axis=1)
+            best_scores = np.concatenate([best_scores, np.take_along_axis(scores, rows, axis=1)], axis=1)
+            if best_rows.shape[1] > k:
+                keep = self._top_k(best_scores, k)
+                best_rows = np.take_along_axis(best_rows, keep, axis=1)
+                best_scores = np.take_along_axis(best_scores, keep, axis=1)
+
+        order = np.argsort(-best_scores, axis=1)
+        results = []
+        for rows, scores in zip(np.take_along_axis(best_rows, order, axis=1), np.take_along_axis(best_scores, order, axis=1)):
+            results.append([
+                SearchHit(
+                    self._ids[row], float(score), self._read_payload(row),
+                    np.array(vectors[row]) if with_vectors else None
+                )
+                for row, score in zip(rows, scores) if score != -np.inf
+            ])
+        return results
+
+    def existing_ids(
+        self, collection_name: str, ids: List[str], embedding_provider: Optional[str] = None
+    ) -> Set[str]:
+        with self._lock:
+            rows = {str(i): self._rows[str(i)] for i in ids if str(i) in self._rows}
+        if not embedding_provider:
+            return set(rows)
+        # Points that predate the field count as the current provider's
+        return {
+            point_id for point_id, row in rows.items()
+            if self._read_payload(row).get("embedding_provider", embedding_provider) == embedding_provider
+        }
+
+    def delete_points(self, collection_name: str, ids: List[str]):
+        if not ids:
+            return
+        with self._lock:
+            lines = []
+            for point_id in map(str, ids):
+                row = self._rows.pop(point_id, None)
+                if row is not None:
+                    self._alive[row] = False
+                    lines.append(json.dumps({"op": "del", "id": point_id}).encode("utf-8") + b"\n")
+            self._writer.write(b"".join(lines))
+            self._writer.flush()
+
+    def count(self) -> int:
+        return len(self._rows)
+
+    async def aclose(self):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            self._vectors.flush()
+            self._writer.close()
+            os.close(self._reader_fd)
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+        """Column indices of the k highest scores in each row (unordered)."""
+        if scores.shape[1] <= k:
+            return np.tile(np.arange(scores.shape[1]), (scores.shape[0], 1))
+        return np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def _filter_mask(self, condition: FieldFilter, count: int) -> np.ndarray:
+        index = self._fields.get(condition.field)
+        if index is None:
+            raise ValueError(f"Cannot filter on '{condition.field}': not a filterable field of this store")
+        return index.mask(condition, count)
+
+    def _read_payload(self, row: int) -> Dict[str, Any]:
+        offset, length = self._spans[row]
+        return json.loads(os.pread(self._reader_fd, length, offset))["payload"]
+
+    def _check_meta(self, meta_path: str):
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                existing_size = json.load(f)["vector_size"]
+            if existing_size != self.vector_size:
+                raise ValueError(
+                    f"Local collection '{self.collection_name}' has {existing_size}D vectors but the "
+                    f"embedding provider produces {self.vector_size}D. Use a different collection or "
+                    f"delete it explicitly before switching models."
+                )
+        else:
+            with open(meta_path, "w") as f:
+                json.dump({"vector_size": self.vector_size}, f)
+
+    def _load_sidecar(self):
+        """Rebuild the row index by replaying the payload sidecar."""
+        if not os.path.exists(self._payloads_path):
+            return
+        offset = 0
+        with open(self._payloads_path, "rb") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break  # torn write from a crash; drop the tail below
+                if record["op"] == "put":
+                    row = len(self._ids)
+                    self._rows[record["id"]] = row
+                    self._ids.append(record["id"])
+                    self._spans.append((offset, len(line)))
+                    for field, index in self._fields.items():
+                        index.add(row, record["payload"].get(field))
+                else:
+                    self._rows.pop(record["id"], None)
+                offset += len(line)
+        if offset != os.path.getsize(self._payloads_path):
+            with open(self._payloads_path, "r+b") as f:
+                f.truncate(offset)
+
+    def _open_vectors(self):
+        self._capacity = os.path.getsize(self._vectors_path) // self._row_bytes
+        self._vectors = np.memmap(
+            self._vectors_path, dtype=np.float32, mode="r+", shape=(self._capacity, self.vector_size)
+        )
+
+    def _ensure_capacity(self, rows: int):
+        if rows <= self._capacity:
+            return
+        new_capacity = max(rows, self._capacity * 2)
+        self._vectors.flush()
+        with open(self._vectors_path, "r+b") as f:
+            f.truncate(new_capacity * self._row_bytes)
+        self._open_vectors()
+        if hasattr(self, "_alive"):
+            alive = np.zeros(new_capacity, dtype=bool)
+            alive[:len(self._alive)] = self._alive
+            self._alive = alive
@@ -3,12 +3,97 @@ Qdrant Vector Store integration using Gemini Embeddings.
 Includes similarity scores.
 """
 
-from typing import Any, Dict, List
-from qdrant_client import QdrantClient
-from qdrant_client.http.models import VectorParams, Distance
+from typing import Any, Dict, List, Optional, Sequence, Set
+import numpy as np
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.http.exceptions import UnexpectedResponse
+from qdrant_client.http.models import (
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    Distance,
+    FieldCondition,
+    Filter,
+    Fusion,
+    FusionQuery,
+    HnswConfigDiff,
+    KeywordIndexParams,
+    MatchAny,
+    MatchValue,
+    PayloadSchemaType,
+    PointIdsList,
+    PointStruct,
+    Prefetch,
+    QuantizationSearchParams,
+    QueryRequest,
+    Range,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    SparseVector,
+    SparseVectorParams,
+    VectorParams,
+)
 from app.core.config import settings
+from app.core.metrics import BATCH_SIZE, timed
+from app.services.vectorstore_base import DenseVectors, SparseInput, VectorStore
+from app.utils.filters import FieldFilter
 import uuid
 
+# Named vectors used when hybrid (dense + sparse) search is enabled
+DENSE_VECTOR_NAME = "dense"
+SPARSE_VECTOR_NAME = "sparse"
+
+# Qdrant schema for each PAYLOAD_INDEX_TYPES entry; "tenant" is a keyword
+# index that also groups each tenant's points together on disk
+PAYLOAD_INDEX_SCHEMAS = {
+    "keyword": PayloadSchemaType.KEYWORD,
+    "tenant": KeywordIndexParams(type="keyword", is_tenant=True),
+    "integer": PayloadSchemaType.INTEGER,
+    "float": PayloadSchemaType.FLOAT,
+    "bool": PayloadSchemaType.BOOL,
+}
+
+def build_filter(filters: Optional[List[FieldFilter]]) -> Optional[Filter]:
+    """Translate parsed filters into a Qdrant filter (all conditions must hold)."""
+    if not filters:
+        return None
+    conditions = []
+    for condition in filters:
+        if condition.op == "eq":
+            conditions.append(FieldCondition(key=condition.field, match=MatchValue(value=condition.value)))
+        elif condition.op == "in":
+            conditions.append(FieldCondition(key=condition.field, match=MatchAny(any=condition.value)))
+        else:
+            conditions.append(FieldCondition(key=condition.field, range=Range(**condition.value)))
+    return Filter(must=conditions)
+
+
+def _as_list(vectors: Any) -> Any:
+    """
+    Plain float lists for the client models. Converting a whole NumPy matrix
+    at once is an order of magnitude cheaper than letting each point model
+    validate its NumPy row element by element.
+    """
+    if isinstance(vectors, np.ndarray):
+        return vectors.tolist()
+    if vectors and isinstance(vectors[0], np.ndarray):
+        return [vector.tolist() for vector in vectors]
+    return vectors
+
+
+def _provider_payload(embedding_provider: Optional[str]):
+    return ["embedding_provider"] if embedding_provider else False
+
+
+def _embedded_by(points, embedding_provider: Optional[str]) -> Set[str]:
+    """IDs of points embedded by embedding_provider; points that predate the field count as its."""
+    return {
+        str(p.id) for p in points
+        if not embedding_provider or (p.payload or {}).get("embedding_provider", embedding_provider) == embedding_provider
+    }
+
+
 # Minimal Document class
 class Document:
     """
@@ -19,71 +104,422 @@ class Document:
         self.metadata = metadata or {}
         self.score = score
 
-class QdrantClientWrapper:
+class QdrantClientWrapper(VectorStore):
     """
     Wrapper around QdrantClient to provide add/search interface with score support.
     """
 
-    def __init__(self, collection_name: str, vector_size: int = 384):  # Default to 384 for HuggingFace embeddings
+    def __init__(
+        self,
+        collection_name: str,
+        vector_size: int = 384,  # Default to 384 for HuggingFace embeddings
+        hybrid: bool = False,
+    ):
         self.collection_name = collection_name
         self.vector_size = vector_size
+        # Hybrid collections store a named dense vector plus a named BM25 sparse vector
+        self.hybrid = hybrid
         self.client = QdrantClient(
             url=settings.QDRANT_URL,
             api_key=settings.QDRANT_API_KEY,
+            prefer_grpc=settings.QDRANT_PREFER_GRPC,
+            grpc_port=settings.QDRANT_GRPC_PORT,
+            check_compatibility=False
+        )
+        # Async client for the request path; shares the server but not the connection pool
+        self.aclient = AsyncQdrantClient(
+            url=settings.QDRANT_URL,
+            api_key=settings.QDRANT_API_KEY,
+            prefer_grpc=settings.QDRANT_PREFER_GRPC,
+            grpc_port=settings.QDRANT_GRPC_PORT,
             check_compatibility=False
         )
 
-        # Recreate collection to ensure correct vector dimension
-        self.client.recreate_collection(
-            collection_name=collection_name,
-            vectors_config=VectorParams(
-                size=vector_size,  # embedding dimension
-                distance=Distance.COSINE
+        self.search_params = self._build_search_params()
+        self._ensure_collection()
+        self._ensure_payload_indexes()
+
+    def _ensure_collection(self):
+        """
+        Create the collection if it is missing; never drop an existing one.
+        An existing collection must match the configured vector size.
+        """
+        if not self.client.collection_exists(self.collection_name):
+            dense_params = VectorParams(
+                size=self.vector_size,  # embedding dimension
+                distance=Distance.COSINE,
+                on_disk=settings.QDRANT_ON_DISK
             )
-        )
+            try:
+                self.client.create_collection(
+                    collection_name=self.collection_name,
+                    vectors_config={DENSE_VECTOR_NAME: dense_params} if self.hybrid else dense_params,
+                    sparse_vectors_config={SPARSE_VECTOR_NAME: SparseVectorParams()} if self.hybrid else None,
+                    hnsw_config=HnswConfigDiff(
+                        m=settings.QDRANT_HNSW_M,
+                        ef_construct=settings.QDRANT_HNSW_EF_CONSTRUCT
+                    ),
+                    quantization_config=self._build_quantization_config()
+                )
+                print(f"✅ Created Qdrant collection '{self.collection_name}' ({self.vector_size}D)")
+                return
+            except UnexpectedResponse:
+                # Another worker created it first; fall through to validation
+                if not self.client.collection_exists(self.collection_name):
+                    raise
+
+        params = self.client.get_collection(self.collection_name).config.params
+        vectors = params.vectors
+        is_named = isinstance(vectors, dict)
+        has_sparse = bool(params.sparse_vectors and SPARSE_VECTOR_NAME in params.sparse_vectors)
+        if self.hybrid and not (is_named and DENSE_VECTOR_NAME in vectors and has_sparse):
+            raise ValueError(
+                f"Qdrant collection '{self.collection_name}' was created without hybrid vectors. "
+                f"Disable HYBRID_SEARCH_ENABLED or index into a new collection."
+            )
+        if not self.hybrid and is_named:
+            raise ValueError(
+                f"Qdrant collection '{self.collection_name}' uses named hybrid vectors. "
+                f"Enable HYBRID_SEARCH_ENABLED or index into a new collection."
+            )
+
+        existing_size = vectors[DENSE_VECTOR_NAME].size if self.hybrid else vectors.size
+        if existing_size != self.vector_size:
+            raise ValueError(
+                f"Qdrant collection '{self.collection_name}' has {existing_size}D vectors but the "
+                f"embedding provider produces {self.vector_size}D. Use a different collection or "
+                f"delete it explicitly before switching models."
+            )
+
+    def _ensure_payload_indexes(self):
+        """
+        Create the PAYLOAD_INDEX_FIELDS indexes that are missing. Indexed fields
+        get extra HNSW links per value, so filtered searches stay on the graph
+        instead of falling back to post-filtering; indexes created before the
+        data is loaded take effect immediately.
+        """
+        existing = self.client.get_collection(self.collection_name).payload_schema or {}
+        for field, kind in settings.payload_index_fields.items():
+            if field in existing:
+                continue
+            # Types are validated when settings load
+            self.client.create_payload_index(self.collection_name, field, field_schema=PAYLOAD_INDEX_SCHEMAS[kind])
+            print(f"✅ Created payload index on '{field}' ({kind})")
+
+    @staticmethod
+    def _build_quantization_config():
+        """Translate QDRANT_QUANTIZATION into a Qdrant quantization config."""
+        mode = settings.QDRANT_QUANTIZATION.lower()
+        if mode == "scalar":
+            return ScalarQuantization(
+                scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True)
+            )
+        elif mode == "binary":
+            return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+        elif mode == "none":
+            return None
+        raise ValueError(f"Unsupported QDRANT_QUANTIZATION: {mode}. Supported: 'none', 'scalar', 'binary'")
+
+    @staticmethod
+    def _build_search_params() -> Optional[SearchParams]:
+        """Search-time HNSW ef and quantization rescoring options."""
+        quantization = None
+        if settings.QDRANT_QUANTIZATION.lower() != "none":
+            quantization = QuantizationSearchParams(
+                rescore=settings.QDRANT_QUANTIZATION_RESCORE,
+                oversampling=settings.QDRANT_QUANTIZATION_OVERSAMPLING
+            )
+        if settings.QDRANT_SEARCH_EF is None and quantization is None:
+            return None
+        return SearchParams(hnsw_ef=settings.QDRANT_SEARCH_EF, quantization=quantization)
 
     def add_documents(self, documents: List[Document], embeddings: Any):
         """
         Add a list of Document objects with embeddings to Qdrant.
         """
-        vectors = [embeddings.embed_text(doc.page_content) for doc in documents]
-        points = [
-            {"id": str(uuid.uuid4()), "vector": vec, "payload": {"content": doc.page_content, **doc.metadata}}
-            for i, (doc, vec) in enumerate(zip(documents, vectors))
-        ]
-        self.client.upsert(collection_name=self.collection_name, points=points)
+        vectors = embeddings.embed_texts([doc.page_content for doc in documents])
+        payloads = [{"content": doc.page_content, **doc.metadata} for doc in documents]
+        self.upsert_vectors(self.collection_name, vectors, payloads)
 
-    def upsert_vectors(self, collection_name: str, vectors: List[List[float]], payloads: List[Dict[str, Any]]):
+    @timed("qdrant_upsert")
+    def upsert_vectors(
+        self,
+        collection_name: str,
+        vectors: DenseVectors,
+        payloads: List[Dict[str, Any]],
+        ids: Optional[List[str]] = None,
+        sparse_vectors: Optional[List[SparseInput]] = None,
+    ):
         """
         Upsert vectors with payloads to the specified collection.
+        Random IDs are generated unless deterministic `ids` are given.
+        In hybrid mode, `sparse_vectors` holds the BM25 vector of each point.
         """
-        points = [
-            {"id": str(uuid.uuid4()), "vector": vec, "payload": payload}
-            for i, (vec, payload) in enumerate(zip(vectors, payloads))
-        ]
+        points = self._build_points(vectors, payloads, ids, sparse_vectors)
+        BATCH_SIZE.labels("qdrant_upsert").observe(len(points))
         self.client.upsert(collection_name=collection_name, points=points)
 
-    def search_vectors(self, collection_name: str, query_vector: List[float], top_k: int = 5):
+    @timed("qdrant_upsert")
+    async def aupsert_vectors(
+        self,
+        collection_name: str,
+        vectors: DenseVectors,
+        payloads: List[Dict[str, Any]],
+        ids: Optional[List[str]] = None,
+        sparse_vectors: Optional[List[SparseInput]] = None,
+    ):
+        """
+        Async variant of upsert_vectors.
+        """
+        points = self._build_points(vectors, payloads, ids, sparse_vectors)
+        BATCH_SIZE.labels("qdrant_upsert").observe(len(points))
+        await self.aclient.upsert(collection_name=collection_name, points=points)
+
+    def existing_ids(
+        self, collection_name: str, ids: List[str], embedding_provider: Optional[str] = None
+    ) -> Set[str]:
+        """
+        Return the subset of `ids` already stored in the collection
+        (embedded by embedding_provider, if given).
+        """
+        if not ids:
+            return set()
+        points = self.client.retrieve(
+            collection_name, ids=ids, with_payload=_provider_payload(embedding_provider), with_vectors=False
+        )
+        return _embedded_by(points, embedding_provider)
+
+    async def aexisting_ids(
+        self, collection_name: str, ids: List[str], embedding_provider: Optional[str] = None
+    ) -> Set[str]:
+        """
+        Async variant of existing_ids.
+        """
+        if not ids:
+            return set()
+        points = await self.aclient.retrieve(
+            collection_name, ids=ids, with_payload=_provider_payload(embedding_provider), with_vectors=False
+        )
+        return _embedded_by(points, embedding_provider)
+
+    def delete_points(self, collection_name: str, ids: List[str]):
+        """
+        Delete points by ID.
+        """
+        if ids:
+            self.client.delete(collection_name, points_selector=PointIdsList(points=ids))
+
+    async def adelete_points(self, collection_name: str, ids: List[str]):
+        """
+        Async variant of delete_points.
+        """
+        if ids:
+            await self.aclient.delete(collection_name, points_selector=PointIdsList(points=ids))
+
+    @timed("qdrant_query")
+    def search_vectors(
+        self,
+        collection_name: str,
+        query_vector: Sequence[float],
+        top_k: int = 5,
+        sparse_vector: Optional[SparseInput] = None,
+        with_vectors: bool = False,
+        filters: Optional[List[FieldFilter]] = None,
+    ):
         """
         Search for top-k most similar vectors in the collection.
+        With a sparse query vector in hybrid mode, dense and sparse candidates are
+        fetched in one request and fused server-side with reciprocal-rank fusion.
+        With with_vectors=True each hit also carries its dense vector.
+        Filters are applied during the search (by every retriever in hybrid mode).
+        """
+        response = self.client.query_points(
+            collection_name=collection_name,
+            with_vectors=self._with_vectors(with_vectors),
+            **self._query_args(query_vector, top_k, sparse_vector, filters)
+        )
+        return self._dense_points(response.points, with_vectors)
+
+    @timed("qdrant_query")
+    async def asearch_vectors(
+        self,
+        collection_name: str,
+        query_vector: Sequence[float],
+        top_k: int = 5,
+        sparse_vector: Optional[SparseInput] = None,
+        with_vectors: bool = False,
+        filters: Optional[List[FieldFilter]] = None,
+    ):
         """
-        response = self.client.search(
+        Async variant of search_vectors.
+        """
+        response = await self.aclient.query_points(
             collection_name=collection_name,
-            query_vector=query_vector,
-            limit=top_k
+            with_vectors=self._with_vectors(with_vectors),
+            **self._query_args(query_vector, top_k, sparse_vector, filters)
         )
-        return response
+        return self._dense_points(response.points, with_vectors)
+
+    @timed("qdrant_query")
+    def search_batch(
+        self,
+        collection_name: str,
+        query_vectors: DenseVectors,
+        top_k: int = 5,
+        with_vectors: bool = False,
+        filters: Optional[List[FieldFilter]] = None,
+        sparse_vectors: Optional[List[Optional[SparseInput]]] = None,
+    ):
+        """
+        Run one search per query vector in a single round trip with Qdrant's batch query API.
+        """
+        requests = self._query_requests(query_vectors, top_k, with_vectors, filters, sparse_vectors)
+        BATCH_SIZE.labels("qdrant_query").observe(len(requests))
+        responses = self.client.query_batch_points(collection_name=collection_name, requests=requests)
+        return [self._dense_points(response.points, with_vectors) for response in responses]
+
+    @timed("qdrant_query")
+    async def asearch_batch(
+        self,
+        collection_name: str,
+        query_vectors: DenseVectors,
+        top_k: int = 5,
+        with_vectors: bool = False,
+        filters: Optional[List[FieldFilter]] = None,
+        sparse_vectors: Optional[List[Optional[SparseInput]]] = None,
+    ):
+        """
+        Async variant of search_batch.
+        """
+        requests = self._query_requests(query_vectors, top_k, with_vectors, filters, sparse_vectors)
+        BATCH_SIZE.labels("qdrant_query").observe(len(requests))
+        responses = await self.aclient.query_batch_points(collection_name=collection_name, requests=requests)
+        return [self._dense_points(response.points, with_vectors) for response in responses]
+
+    def _query_requests(
+        self,
+        query_vectors: DenseVectors,
+        top_k: int,
+        with_vectors: bool,
+        filters: Optional[List[FieldFilter]],
+        sparse_vectors: Optional[List[Optional[SparseInput]]],
+    ) -> List[QueryRequest]:
+        """The query_points arguments of each search, as batch query requests."""
+        query_vectors = _as_list(query_vectors)
+        sparse_vectors = sparse_vectors or [None] * len(query_vectors)
+        requests = []
+        for vector, sparse in zip(query_vectors, sparse_vectors):
+            args = self._query_args(vector, top_k, sparse, filters)
+            requests.append(QueryRequest(
+                query=args["query"],
+                using=args.get("using"),
+                prefetch=args.get("prefetch"),
+                filter=args.get("query_filter"),
+                params=args.get("search_params"),
+                limit=top_k,
+                with_vector=self._with_vectors(with_vectors),
+                with_payload=True,
+            ))
+        return requests
+
+    def _with_vectors(self, with_vectors: bool):
+        if with_vectors and self.hybrid:
+            return [DENSE_VECTOR_NAME]
+        return with_vectors
+
+    def _dense_points(self, points: list, with_vectors: bool) -> list:
+        # Named-vector collections return {"dense": [...]}; expose the dense vector directly
+        if with_vectors and self.hybrid:
+            for point in points:
+                if isinstance(point.vector, dict):
+                    point.vector = point.vector.get(DENSE_VECTOR_NAME)
+        return points
+
+    def _query_args(
+        self,
+        query_vector: Sequence[float],
+        top_k: int,
+        sparse_vector: Optional[SparseInput],
+        filters: Optional[List[FieldFilter]] = None,
+    ) -> Dict[str, Any]:
+        query_vector = _as_list(query_vector)
+        query_filter = build_filter(filters)
+        if not self.hybrid:
+            return {
+                "query": query_vector,
+                "query_filter": query_filter,
+                "limit": top_k,
+                "search_params": self.search_params,
+            }
+        if not sparse_vector or not sparse_vector[0]:
+            return {
+                "query": query_vector,
+                "using": DENSE_VECTOR_NAME,
+                "query_filter": query_filter,
+                "limit": top_k,
+                "search_params": self.search_params,
+            }
+
+        prefetch_limit = max(top_k, settings.HYBRID_PREFETCH_LIMIT)
+        indices, values = sparse_vector
+        return {
+            "prefetch": [
+                Prefetch(
+                    query=query_vector,
+                    using=DENSE_VECTOR_NAME,
+                    filter=query_filter,
+                    limit=prefetch_limit,
+                    params=self.search_params
+                ),
+                Prefetch(
+                    query=SparseVector(indices=indices, values=values),
+                    using=SPARSE_VECTOR_NAME,
+                    filter=query_filter,
+                    limit=prefetch_limit
+                ),
+            ],
+            "query": FusionQuery(fusion=Fusion.RRF),
+            "query_filter": query_filter,
+            "limit": top_k,
+        }
+
+    async def aclose(self):
+        """
+        Close both client connection pools.
+        """
+        await self.aclient.close()
+        self.client.close()
+
+    def _build_points(
+        self,
+        vectors: DenseVectors,
+        payloads: List[Dict[str, Any]],
+        ids: Optional[List[str]] = None,
+        sparse_vectors: Optional[List[SparseInput]] = None,
+    ) -> List[PointStruct]:
+        vectors = _as_list(vectors)
+        ids = ids or [str(uuid.uuid4()) for _ in vectors]
+        if not self.hybrid:
+            return [
+                PointStruct(id=point_id, vector=vec, payload=payload)
+                for point_id, vec, payload in zip(ids, vectors, payloads)
+            ]
+
+        points = []
+        for i, (point_id, vec, payload) in enumerate(zip(ids, vectors, payloads)):
+            vector = {DENSE_VECTOR_NAME: vec}
+            if sparse_vectors is not None:
+                indices, values = sparse_vectors[i]
+                vector[SPARSE_VECTOR_NAME] = SparseVector(indices=indices, values=values)
+            points.append(PointStruct(id=point_id, vector=vector, payload=payload))
+        return points
 
     def similarity_search(self, query: str, embeddings: Any, k: int = 5) -> List[Document]:
         """
         Search for top-k most similar documents and include similarity score.
         """
-        query_vector = embeddings.embed_text(query)
-        response = self.client.search(
-            collection_name=self.collection_name,
-            query_vector=query_vector,
-            limit=k
-        )
+        query_vector = embeddings.embed_text(query, input_type="search_query")
+        response = self.search_vectors(self.collection_name, query_vector, top_k=k)
         results = []
         for p in response:
             content = p.payload.get("content", "")
@@ -0,0 +1,22 @@
+from typing import List, Tuple
+
+
+def make_batches(texts: List[str], max_items: int, max_chars: int) -> List[Tuple[int, int]]:
+    """
+    Split texts into contiguous (start, end) index ranges.
+    Each range holds at most `max_items` texts and at most `max_chars` characters,
+    except that a single oversized text always gets a batch of its own.
+    """
+    batches = []
+    start = 0
+    chars = 0
+    for i, text in enumerate(texts):
+        size = len(text)
+        if i > start and (i - start >= max_items or chars + size > max_chars):
+            batches.append((start, i))
+            start = i
+            chars = 0
+        chars += size
+    if start < len(texts):
+        batches.append((start, len(texts)))
+    return batches
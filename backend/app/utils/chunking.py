@@ -1,14 +1,175 @@
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+import re
+from functools import lru_cache
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional
 
-def chunk_text(text: str, chunk_size: int = 512, chunk_overlap: int = 50):
+from app.core.config import settings
+
+# Preferred split points, best first; the chunk keeps the punctuation but not the whitespace
+SEPARATORS = ["\n\n", "\n", ". ", "! ", "? ", " "]
+
+# Upper bound on characters per token, used to size the look-ahead window in token mode
+MAX_CHARS_PER_TOKEN = 10
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class Chunk(NamedTuple):
+    start: int  # offset of the first character in the concatenated stream
+    end: int    # offset just past the last character
+    text: str
+
+
+class StreamingChunker:
+    """
+    Splits a stream of text pieces (e.g. PDF pages) into overlapping chunks.
+
+    Only a window of about one chunk is buffered, so memory stays bounded and
+    each character is scanned a constant number of times. Chunks are cut at
+    the best separator in the second half of the window and may span pieces;
+    their (start, end) offsets map back to the pieces they came from.
+
+    Sizes are in characters, or in tokens when a length_function is given.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = 1000,
+        chunk_overlap: int = 100,
+        length_function: Optional[Callable[[str], int]] = None,
+    ):
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+        if not 0 <= chunk_overlap < chunk_size:
+            raise ValueError("chunk_overlap must be between 0 and chunk_size")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.length_function = length_function
+        self._lookahead = chunk_size * (MAX_CHARS_PER_TOKEN if length_function else 1)
+
+    def chunks(self, pieces: Iterable[str]) -> Iterator[Chunk]:
+        """
+        Yield chunks as soon as enough text has arrived to fill them.
+        """
+        buffer = ""
+        base = 0    # stream offset of buffer[0]
+        start = 0   # stream offset where the next chunk begins
+        for piece in pieces:
+            if not piece:
+                continue
+            buffer = buffer[start - base:] + piece
+            base = start
+            while base + len(buffer) - start >= self._lookahead:
+                chunk, start = self._next_chunk(buffer, base, start, final=False)
+                if chunk:
+                    yield chunk
+        while start < base + len(buffer):
+            chunk, start = self._next_chunk(buffer, base, start, final=True)
+            if chunk:
+                yield chunk
+
+    def _next_chunk(self, buffer: str, base: int, start: int, final: bool):
+        """Cut one chunk at `start`; return it (or None if blank) and the next start offset."""
+        rel = start - base
+        limit = self._window_end(buffer, rel)
+        if final and limit >= len(buffer):
+            end = len(buffer)
+        else:
+            end = self._split_point(buffer, rel, limit)
+
+        left, right = rel, end
+        while left < right and buffer[left].isspace():
+            left += 1
+        while right > left and buffer[right - 1].isspace():
+            right -= 1
+        chunk = Chunk(base + left, base + right, buffer[left:right]) if right > left else None
+
+        if end >= len(buffer):
+            return chunk, base + len(buffer)
+        return chunk, base + self._overlap_start(buffer, rel, end)
+
+    def _window_end(self, buffer: str, rel: int) -> int:
+        """Largest end offset whose text still fits in chunk_size."""
+        hi = min(rel + self._lookahead, len(buffer))
+        if self.length_function is None or self.length_function(buffer[rel:hi]) <= self.chunk_size:
+            return hi
+        lo = min(rel + self.chunk_size, hi - 1)  # every token covers at least one character
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if self.length_function(buffer[rel:mid]) <= self.chunk_size:
+                lo = mid
+            else:
+                hi = mid - 1
+        return lo
+
+    @staticmethod
+    def _split_point(buffer: str, rel: int, limit: int) -> int:
+        """Best separator in the second half of the window, else a hard cut at the limit."""
+        min_end = rel + (limit - rel) // 2
+        for separator in SEPARATORS:
+            index = buffer.rfind(separator, min_end, limit)
+            if index != -1:
+                return max(index + len(separator.rstrip()), rel + 1)
+        return limit
+
+    def _overlap_start(self, buffer: str, rel: int, end: int) -> int:
+        """Start of the next chunk: about chunk_overlap before `end`, snapped to a word boundary."""
+        if self.chunk_overlap == 0:
+            return end
+        if self.length_function is None:
+            target = max(end - self.chunk_overlap, rel + 1)
+        else:
+            lo, hi = rel + 1, end
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if self.length_function(buffer[mid:end]) <= self.chunk_overlap:
+                    hi = mid
+                else:
+                    lo = mid + 1
+            target = lo
+        match = _WHITESPACE.search(buffer, target, end)
+        return match.end() if match else target
+
+
+def token_length_function(tokenizer_path: str) -> Callable[[str], int]:
+    """
+    Count tokens with a Hugging Face tokenizer.json (needs the tokenizers package).
+    """
+    try:
+        from tokenizers import Tokenizer
+    except ImportError:
+        raise ImportError("Please install tokenizers to chunk by tokens: pip install tokenizers")
+    tokenizer = Tokenizer.from_file(tokenizer_path)
+    tokenizer.no_truncation()
+    return lambda text: len(tokenizer.encode(text, add_special_tokens=False).ids)
+
+
+@lru_cache(maxsize=1)
+def get_chunker() -> StreamingChunker:
+    """
+    Chunker configured from CHUNK_SIZE / CHUNK_OVERLAP / CHUNK_TOKENIZER_PATH.
+    """
+    length_function = None
+    if settings.CHUNK_TOKENIZER_PATH:
+        length_function = token_length_function(settings.CHUNK_TOKENIZER_PATH)
+    return StreamingChunker(settings.CHUNK_SIZE, settings.CHUNK_OVERLAP, length_function)
+
+
+def iter_chunks(pieces: Iterable[str]) -> Iterator[Chunk]:
+    """
+    Stream chunks from text pieces using the configured chunker.
+    """
+    return get_chunker().chunks(pieces)
+
+
+def chunk_text(text: str, chunk_size: Optional[int] = None, chunk_overlap: Optional[int] = None) -> List[str]:
     """
-    Split input text into overlapping chunks using LangChain's RecursiveCharacterTextSplitter.
-    This version is modular and lightweight.
+    Split input text into overlapping chunks (configured sizes unless overridden).
     """
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap,
-        length_function=len,
-        separators=["\n\n", "\n", ".", "!", "?", " ", ""],
-    )
-    return text_splitter.split_text(text)
+    if chunk_size is None and chunk_overlap is None:
+        chunker = get_chunker()
+    else:
+        chunker = StreamingChunker(
+            chunk_size if chunk_size is not None else settings.CHUNK_SIZE,
+            chunk_overlap if chunk_overlap is not None else settings.CHUNK_OVERLAP,
+        )
+    return [chunk.text for chunk in chunker.chunks([text])]
@@ -0,0 +1,137 @@
+import math
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from app.core.config import settings
+from app.utils.chunking import token_length_function
+
+# Rough token estimate when no tokenizer is configured (~4 characters per token)
+CHARS_PER_TOKEN = 4
+
+# Chunks of one document separated by at most this many characters are merged;
+# the chunker only skips whitespace between consecutive chunks
+MAX_MERGE_GAP = 8
+
+SPAN_SEPARATOR = "\n\n"
+
+
+class ContextSpan(NamedTuple):
+    document_id: Optional[str]
+    start: Optional[int]    # character span in the document, if the chunks recorded one
+    end: Optional[int]
+    text: str
+    chunk_ids: List[str]    # retrieved chunks covered by this span
+    rank: int               # best retrieval position among those chunks
+    tokens: int
+    truncated: bool = False
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+@lru_cache(maxsize=1)
+def get_token_counter() -> Callable[[str], int]:
+    """
+    Token counter for the context budget: the chunking tokenizer
+    (CHUNK_TOKENIZER_PATH) if configured, else a character-based estimate.
+    """
+    if settings.CHUNK_TOKENIZER_PATH:
+        return token_length_function(settings.CHUNK_TOKENIZER_PATH)
+    return estimate_tokens
+
+
+def merge_spans(docs: Sequence[Dict[str, Any]]) -> List[ContextSpan]:
+    """
+    Merge retrieved chunks into contiguous spans, best-ranked first.
+
+    Chunks of the same document whose (start, end) ranges overlap or touch are
+    stitched into one span, so the overlap between neighbouring chunks
+    appears once. Chunks without offsets become spans of their own.
+    """
+    spans: List[ContextSpan] = []
+    by_document: Dict[str, List[tuple]] = {}
+    for rank, doc in enumerate(docs):
+        document_id, start, end = doc.get("document_id"), doc.get("start"), doc.get("end")
+        if document_id is None or start is None or end is None:
+            spans.append(ContextSpan(document_id, start, end, doc["content"], [doc["id"]], rank, 0))
+        else:
+            by_document.setdefault(document_id, []).append((start, end, rank, doc))
+
+    for document_id, chunks in by_document.items():
+        chunks.sort(key=lambda item: (item[0], item[1]))
+        current = None
+        for start, end, rank, doc in chunks:
+            text = doc["content"]
+            if current is None or start > current.end + MAX_MERGE_GAP:
+                if current is not None:
+                    spans.append(current)
+                current = ContextSpan(document_id, start, end, text, [doc["id"]], rank, 0)
+                continue
+            if end > current.end:
+                if start >= current.end:
+                    text = current.text + " " + text
+                else:
+                    text = current.text + text[current.end - start:]
+            else:
+                text = current.text  # fully contained in the span
+            current = current._replace(
+                end=max(end, current.end), text=text,
+                chunk_ids=current.chunk_ids + [doc["id"]], rank=min(rank, current.rank)
+            )
+        spans.append(current)
+
+    spans.sort(key=lambda span: span.rank)
+    return spans
+
+
+def build_context(
+    docs: Sequence[Dict[str, Any]],
+    max_tokens: int,
+    count_tokens: Optional[Callable[[str], int]] = None,
+) -> List[ContextSpan]:
+    """
+    Merge retrieved chunks into spans and pack them, best-ranked first, into
+    max_tokens (0 = no limit). Spans that do not fit are skipped so smaller
+    lower-ranked ones can still use the remaining budget; if not even the best
+    span fits, it is cut to the budget at a word boundary.
+    """
+    count_tokens = count_tokens or get_token_counter()
+    separator_tokens = count_tokens(SPAN_SEPARATOR)
+    used: List[ContextSpan] = []
+    remaining = max_tokens
+    for span in merge_spans(docs):
+        tokens = count_tokens(span.text)
+        cost = tokens + (separator_tokens if used else 0)
+        if max_tokens <= 0 or cost <= remaining:
+            used.append(span._replace(tokens=tokens))
+            remaining -= cost
+        elif not used:
+            text = _truncate(span.text, remaining, count_tokens)
+            if text:
+                tokens = count_tokens(text)
+                end = span.start + len(text) if span.start is not None else None
+                used.append(span._replace(text=text, end=end, tokens=tokens, truncated=True))
+                remaining -= tokens
+    return used
+
+
+def format_context(spans: Sequence[ContextSpan]) -> str:
+    return SPAN_SEPARATOR.join(span.text for span in spans)
+
+
+def _truncate(text: str, max_tokens: int, count_tokens: Callable[[str], int]) -> str:
+    """Longest prefix of text within max_tokens, cut at the last whitespace."""
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if count_tokens(text[:mid]) <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    prefix = text[:lo]
+    if lo < len(text):
+        cut = prefix.rfind(" ")
+        if cut > 0:
+            prefix = prefix[:cut]
+    return prefix.rstrip()
@@ -0,0 +1,87 @@
+from typing import Any, Dict, List, NamedTuple, Optional
+
+RANGE_OPERATORS = ("gt", "gte", "lt", "lte")
+
+
+class FieldFilter(NamedTuple):
+    field: str
+    op: str       # "eq", "in" or "range"
+    value: Any    # scalar, list of scalars, or {"gte": ..., "lt": ...}
+
+
+def parse_filters(filters: Optional[Dict[str, Any]], allowed_fields) -> List[FieldFilter]:
+    """
+    Validate a filter spec such as
+        {"tenant": "acme", "source": ["a.pdf", "b.pdf"], "page": {"gte": 2, "lt": 10}}
+    i.e. field -> value (equality), list (any of) or {gt/gte/lt/lte} (range).
+    Conditions are combined with AND. Only indexed fields may be filtered on.
+    Raises ValueError for anything else.
+    """
+    if not filters:
+        return []
+    if not isinstance(filters, dict):
+        raise ValueError("filters must be an object mapping field names to conditions")
+
+    parsed = []
+    for field, condition in filters.items():
+        if field not in allowed_fields:
+            raise ValueError(
+                f"Cannot filter on '{field}': not an indexed field (PAYLOAD_INDEX_FIELDS: {', '.join(allowed_fields)})"
+            )
+        if isinstance(condition, dict):
+            unknown = set(condition) - set(RANGE_OPERATORS)
+            if unknown or not condition:
+                raise ValueError(f"Range filter on '{field}' takes only {', '.join(RANGE_OPERATORS)}")
+            if not all(_is_number(bound) for bound in condition.values()):
+                raise ValueError(f"Range bounds for '{field}' must be numbers")
+            parsed.append(FieldFilter(field, "range", dict(condition)))
+        elif isinstance(condition, list):
+            if not condition or not all(_is_scalar(v) for v in condition):
+                raise ValueError(f"Filter list for '{field}' must be a non-empty list of strings, numbers or booleans")
+            parsed.append(FieldFilter(field, "in", condition))
+        elif _is_scalar(condition):
+            parsed.append(FieldFilter(field, "eq", condition))
+        else:
+            raise ValueError(f"Unsupported filter condition for '{field}'")
+    return parsed
+
+
+def matches(payload: Dict[str, Any], filters: List[FieldFilter]) -> bool:
+    """
+    Evaluate filters against a payload, with Qdrant's semantics:
+    a list-valued field matches if any of its elements does.
+    """
+    return all(value_matches(payload.get(f.field), f) for f in filters)
+
+
+def value_matches(value: Any, condition: FieldFilter) -> bool:
+    if isinstance(value, list):
+        return any(value_matches(v, condition) for v in value)
+    if value is None:
+        return False
+    if condition.op == "eq":
+        return _same(value, condition.value)
+    if condition.op == "in":
+        return any(_same(value, option) for option in condition.value)
+    if not _is_number(value):
+        return False
+    bounds = condition.value
+    return (
+        ("gt" not in bounds or value > bounds["gt"])
+        and ("gte" not in bounds or value >= bounds["gte"])
+        and ("lt" not in bounds or value < bounds["lt"])
+        and ("lte" not in bounds or value <= bounds["lte"])
+    )
+
+
+def _same(a: Any, b: Any) -> bool:
+    # Keep True from matching 1: booleans only equal booleans
+    return isinstance(a, bool) == isinstance(b, bool) and a == b
+
+
+def _is_scalar(value: Any) -> bool:
+    return isinstance(value, (str, int, float, bool))
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
@@ -0,0 +1,82 @@
+"""
+Compare the streaming chunker with LangChain's RecursiveCharacterTextSplitter.
+
+Usage (from backend/):
+    python -m benchmarks.bench_chunking --sizes-mb 1 4 16
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from app.utils.chunking import StreamingChunker
+
+WORDS = ["retrieval", "vector", "index", "embedding", "query", "latency", "chunk", "model", "the", "a", "of"]
+
+
+def make_pages(size_bytes: int, page_bytes: int = 4000, seed: int = 0):
+    """Synthetic prose split into pages, roughly like PDF page text."""
+    rng = random.Random(seed)
+    pages, page, total = [], [], 0
+    while total < size_bytes:
+        sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 24))).capitalize() + ". "
+        if rng.random() < 0.1:
+            sentence += "\n\n"
+        page.append(sentence)
+        total += len(sentence)
+        if sum(map(len, page)) >= page_bytes:
+            pages.append("".join(page))
+            page = []
+    if page:
+        pages.append("".join(page))
+    return pages
+
+
+def run_langchain(pages, chunk_size, chunk_overlap):
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=len,
+        separators=["\n\n", "\n", ".", "!", "?", " ", ""],
+    )
+    return len(splitter.split_text("\n\n".join(pages)))
+
+
+def run_streaming(pages, chunk_size, chunk_overlap):
+    chunker = StreamingChunker(chunk_size, chunk_overlap)
+    return sum(1 for _ in chunker.chunks(page + "\n\n" for page in pages))
+
+
+def measure(fn, pages, chunk_size, chunk_overlap):
+    tracemalloc.start()
+    started = time.perf_counter()
+    count = fn(pages, chunk_size, chunk_overlap)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes-mb", type=float, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"{'size':>8} {'splitter':>10} {'chunks':>8} {'seconds':>9} {'MB/s':>8} {'peak MB':>9}")
+    for size_mb in args.sizes_mb:
+        pages = make_pages(int(size_mb * 1024 * 1024))
+        for name, fn in (("langchain", run_langchain), ("streaming", run_streaming)):
+            count, elapsed, peak = measure(fn, pages, args.chunk_size, args.chunk_overlap)
+            print(
+                f"{size_mb:>6.1f}MB {name:>10} {count:>8} {elapsed:>9.3f} "
+                f"{size_mb / elapsed:>8.1f} {peak / 1024 / 1024:>9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+Offline end-to-end benchmark: indexing throughput and query latency.
+
+External services are replaced by local stand-ins (a stub Jina HTTP server,
+a fake Gemini model and the in-process vector store), so the numbers reflect
+the pipeline's own overhead plus the simulated service latencies.
+
+Usage (from backend/):
+    python -m benchmarks.bench_rag --docs 200 --queries 200 --concurrency 8 --output results.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from benchmarks.stubs import FakeGeminiModel, StubJinaServer
+
+WORDS = [
+    "retrieval", "vector", "index", "embedding", "query", "latency", "throughput", "chunk",
+    "model", "cache", "batch", "cluster", "shard", "replica", "token", "context", "answer",
+    "the", "a", "of", "and", "to", "in", "for",
+]
+
+
+def make_corpus(docs: int, words_per_doc: int, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(docs):
+        sentences = []
+        for _ in range(max(1, words_per_doc // 15)):
+            words = [rng.choice(WORDS) for _ in range(rng.randint(8, 22))]
+            sentences.append(" ".join(words).capitalize() + ".")
+        corpus.append(f"Document {i}. " + " ".join(sentences))
+    return corpus
+
+
+def make_queries(corpus: List[str], count: int, seed: int) -> List[str]:
+    rng = random.Random(seed + 1)
+    queries = []
+    for _ in range(count):
+        sentences = rng.choice(corpus).split(". ")
+        queries.append(rng.choice(sentences)[:120])
+    return queries
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    """Latency percentiles in milliseconds."""
+    if not latencies:
+        return {"count": 0}
+    ms = np.asarray(latencies) * 1000
+    return {
+        "count": len(ms),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+def run_threaded(fn: Callable, items: list, concurrency: int):
+    """Call fn on each item from a thread pool; return (results, latencies, wall seconds)."""
+    def timed(item):
+        started = time.perf_counter()
+        result = fn(item)
+        return result, time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(timed, items))
+    wall = time.perf_counter() - started
+    return [r for r, _ in outcomes], [t for _, t in outcomes], wall
+
+
+def bench_index(service, corpus: List[str], concurrency: int) -> dict:
+    results, latencies, wall = run_threaded(
+        lambda item: service.index_text(item[1], document_id=f"doc-{item[0]}"),
+        list(enumerate(corpus)),
+        concurrency,
+    )
+    chunks = sum(r["chunks_indexed"] + r["chunks_unchanged"] for r in results)
+    return {
+        "docs": len(corpus),
+        "chunks": chunks,
+        "seconds": round(wall, 3),
+        "docs_per_second": round(len(corpus) / wall, 2),
+        "chunks_per_second": round(chunks / wall, 2),
+        "latency": summarize(latencies),
+    }
+
+
+def bench_search(service, queries: List[str], concurrency: int, top_k: int) -> dict:
+    _, latencies, wall = run_threaded(lambda q: service.search(q, top_k=top_k), queries, concurrency)
+    return {"queries_per_second": round(len(queries) / wall, 2), "latency": summarize(latencies)}
+
+
+def bench_answer(service, queries: List[str], concurrency: int, top_k: int) -> dict:
+    results, latencies, wall = run_threaded(
+        lambda q: service.generate_answer(q, top_k=top_k), queries, concurrency
+    )
+    stages: Dict[str, List[float]] = {}
+    for result in results:
+        for stage, ms in result.get("timings", {}).items():
+            stages.setdefault(stage, []).append(ms / 1000)
+    return {
+        "queries_per_second": round(len(queries) / wall, 2),
+        "latency": summarize(latencies),
+        "stages": {stage: summarize(values) for stage, values in stages.items()},
+    }
+
+
+async def bench_http(app, service, corpus: List[str], queries: List[str], concurrency: int) -> dict:
+    """Drive the FastAPI endpoints in-process through an ASGI transport."""
+    import httpx
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call(client, path: str, data: dict) -> float:
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.post(path, data=data)
+            response.raise_for_status()
+            return time.perf_counter() - started
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        started = time.perf_counter()
+        index_latencies = await asyncio.gather(*(
+            call(client, "/rag/index", {"content": doc, "document_id": f"http-{i}"})
+            for i, doc in enumerate(corpus)
+        ))
+        index_wall = time.perf_counter() - started
+
+        started = time.perf_counter()
+        query_latencies = await asyncio.gather(*(call(client, "/rag/query", {"query": q}) for q in queries))
+        query_wall = time.perf_counter() - started
+    await service.aclose()
+
+    return {
+        "index": {"docs_per_second": round(len(corpus) / index_wall, 2), "latency": summarize(index_latencies)},
+        "query": {"queries_per_second": round(len(queries) / query_wall, 2), "latency": summarize(query_latencies)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=200, help="Documents indexed via index_text")
+    parser.add_argument("--doc-words", type=int, default=600, help="Approximate words per document")
+    parser.add_argument("--queries", type=int, default=200, help="Queries for search and generate_answer")
+    parser.add_argument("--http-docs", type=int, default=50, help="Documents indexed via POST /rag/index")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--embed-latency-ms", type=float, default=20.0, help="Simulated Jina latency per request")
+    parser.add_argument(
+        "--embed-quota-concurrency", type=int, default=0,
+        help="Stub Jina answers 429 beyond this many requests in flight (0 = no quota)"
+    )
+    parser.add_argument(
+        "--dimensions", type=int, default=None, help="EMBEDDING_DIMENSIONS (reduced vector size; default 1024)"
+    )
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0, help="Simulated Gemini latency per call")
+    parser.add_argument("--cache", action="store_true", help="Keep the embedding and answer caches enabled")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON report here as well as to stdout")
+    args = parser.parse_args()
+
+    stub = StubJinaServer(
+        dim=1024, latency_ms=args.embed_latency_ms, max_concurrent=args.embed_quota_concurrency
+    ).start()
+    workdir = tempfile.mkdtemp(prefix="rag-bench-")
+    # Settings are read at import time, so configure the environment before importing the app
+    os.environ.update({
+        "GEMINI_API_KEY": "benchmark",
+        "EMBEDDING_PROVIDER": "jina",
+        "JINA_API_KEY": "benchmark",
+        "JINA_MODEL_NAME": "jina-embeddings-v3",
+        "JINA_API_URL": stub.url,
+        "VECTOR_STORE_BACKEND": "local",
+        "LOCAL_VECTOR_STORE_PATH": os.path.join(workdir, "vector_store"),
+        "DOCUMENT_REGISTRY_PATH": os.path.join(workdir, "document_registry.db"),
+        "SPARSE_STATS_PATH": os.path.join(workdir, "sparse_stats.db"),
+        # Keep synthetic queries out of the query log a real server warms from
+        "QUERY_LOG_PATH": os.path.join(workdir, "query_log.db"),
+        "EMBEDDING_CACHE_ENABLED": str(args.cache).lower(),
+        "ANSWER_CACHE_ENABLED": str(args.cache).lower(),
+    })
+    if args.dimensions:
+        os.environ["EMBEDDING_DIMENSIONS"] = str(args.dimensions)
+    from app.main import app
+    from app.services.service_manager import service_manager
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    service = service_manager.ensure_ready()
+    service.llm = FakeGeminiModel(latency_ms=args.llm_latency_ms)
+
+    corpus = make_corpus(args.docs + args.http_docs, args.doc_words, args.seed)
+    queries = make_queries(corpus, args.queries, args.seed)
+
+    report = {
+        "config": vars(args),
+        "index": bench_index(service, corpus[:args.docs], args.concurrency),
+        "search": bench_search(service, queries, args.concurrency, args.top_k),
+        "generate_answer": bench_answer(service, queries, args.concurrency, args.top_k),
+        "http": asyncio.run(bench_http(app, service, corpus[args.docs:], queries, args.concurrency)),
+        "embedding_requests": stub.requests,
+        "embedded_texts": stub.texts,
+        "embedding_requests_throttled": stub.throttled,
+        "service_stats": service.stats(),
+    }
+    stub.stop()
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
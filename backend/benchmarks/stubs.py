@@ -0,0 +1,135 @@
+"""
+Offline stand-ins for the external services used by the RAG pipeline.
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import numpy as np
+
+
+def fake_embedding(text: str, dim: int) -> np.ndarray:
+    """Deterministic unit vector derived from the text hash."""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def _base64(vector: np.ndarray) -> str:
+    return base64.b64encode(vector.astype("<f4").tobytes()).decode("ascii")
+
+
+class StubJinaServer:
+    """
+    Local HTTP server mimicking POST /v1/embeddings of the Jina API
+    (float or base64 embeddings, optional truncated dimensions), with a fixed
+    per-request latency. With max_concurrent set, requests beyond
+    that many in flight get a 429 with a Retry-After header, like a quota.
+    """
+
+    def __init__(self, dim: int = 1024, latency_ms: float = 0.0, max_concurrent: int = 0, retry_after: str = "0.05"):
+        self.dim = dim
+        self.latency_ms = latency_ms
+        self.max_concurrent = max_concurrent
+        self.retry_after = retry_after
+        self.requests = 0
+        self.texts = 0
+        self.throttled = 0
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with stub._lock:
+                    rejected = bool(stub.max_concurrent) and stub.in_flight >= stub.max_concurrent
+                    stub.throttled += rejected
+                    stub.in_flight += not rejected
+                if rejected:
+                    self.send_response(429)
+                    self.send_header("Retry-After", stub.retry_after)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                try:
+                    self._embed(body)
+                finally:
+                    with stub._lock:
+                        stub.in_flight -= 1
+
+            def _embed(self, body: dict):
+                if stub.latency_ms:
+                    time.sleep(stub.latency_ms / 1000)
+                texts = body["input"]
+                stub.requests += 1
+                stub.texts += len(texts)
+                dim = body.get("dimensions") or stub.dim
+                encode = _base64 if body.get("embedding_type") == "base64" else np.ndarray.tolist
+                payload = json.dumps({
+                    "model": body.get("model"),
+                    "data": [
+                        {"index": i, "embedding": encode(fake_embedding(text, stub.dim)[:dim])}
+                        for i, text in enumerate(texts)
+                    ],
+                }).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/v1/embeddings"
+
+    def start(self) -> "StubJinaServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class FakeGeminiModel:
+    """
+    Drop-in for genai.GenerativeModel returning a canned answer after a fixed latency.
+    """
+
+    def __init__(self, latency_ms: float = 0.0, answer: str = "This is a benchmark answer."):
+        self.latency_ms = latency_ms
+        self.answer = answer
+
+    def generate_content(self, prompt: str, stream: bool = False):
+        time.sleep(self.latency_ms / 1000)
+        return SimpleNamespace(text=self.answer)
+
+    async def count_tokens_async(self, contents: str):
+        return SimpleNamespace(total_tokens=max(1, len(contents) // 4))
+
+    async def generate_content_async(self, prompt: str, stream: bool = False):
+        await asyncio.sleep(self.latency_ms / 1000)
+        if not stream:
+            return SimpleNamespace(text=self.answer)
+
+        async def tokens():
+            for word in self.answer.split(" "):
+                yield SimpleNamespace(text=word + " ")
+        return tokens()
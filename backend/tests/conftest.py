@@ -0,0 +1,60 @@
+import os
+
+import numpy as np
+import pytest
+
+# Allow settings to load in test environments without a real .env
+os.environ.setdefault("GEMINI_API_KEY", "test-gemini-key")
+os.environ.setdefault("JINA_API_KEY", "test-jina-key")
+
+
+def length_vector(text):
+    return [float(len(text)), 1.0, 0.0]
+
+
+class FakeEmbeddings:
+    """Embeds each text as `vector(text)` and records every batch it is asked for."""
+
+    provider = "fake"
+
+    def __init__(self, vector=length_vector):
+        self.vector = vector
+        self.calls = []
+
+    @property
+    def texts(self):
+        return [text for batch in self.calls for text in batch]
+
+    def embed_texts(self, texts, input_type="search_document"):
+        self.calls.append(list(texts))
+        return np.array([self.vector(text) for text in texts], dtype=np.float32)
+
+    def embed_text(self, text, input_type="search_document"):
+        return self.embed_texts([text], input_type)[0]
+
+    async def aembed_texts(self, texts, input_type="search_document"):
+        return self.embed_texts(texts, input_type)
+
+    async def aembed_text(self, text, input_type="search_document"):
+        return (await self.aembed_texts([text], input_type))[0]
+
+
+@pytest.fixture
+def bare_service(tmp_path):
+    """
+    Build a SemanticSearchService without running __init__: fake embeddings,
+    a local vector store in tmp_path and every optional component disabled.
+    """
+    from app.services.semantic import SemanticSearchService
+    from app.services.vectorstore_local import LocalVectorStore
+
+    def build(dimension=3, vector=length_vector, **store_options):
+        service = SemanticSearchService.__new__(SemanticSearchService)
+        service.collection_name = "docs"
+        service.embeddings = FakeEmbeddings(vector)
+        service.vector_store = LocalVectorStore("docs", dimension, path=str(tmp_path / "vectors"), **store_options)
+        service.query_batcher = service.sparse_encoder = service.reranker = None
+        service.answer_cache = service.query_log = service.llm = None
+        return service
+
+    return build
@@ -0,0 +1,38 @@
+from app.services.answer_cache import SemanticAnswerCache
+
+
+def test_similar_query_hits_and_dissimilar_misses():
+    """Lookups match by cosine similarity above the threshold."""
+    cache = SemanticAnswerCache(threshold=0.9)
+    cache.store([1.0, 0.0], ["c1"], {"answer": "A"})
+
+    assert cache.lookup([0.99, 0.05]).result == {"answer": "A"}
+    assert cache.lookup([0.0, 1.0]) is None
+
+
+def test_invalidation_requires_matching_context():
+    """After the collection changes, entries are reused only for identical context."""
+    cache = SemanticAnswerCache(threshold=0.9)
+    cache.store([1.0, 0.0], ["c1", "c2"], {"answer": "A"})
+    entry = cache.lookup([1.0, 0.0])
+    assert cache.is_fresh(entry)
+
+    cache.invalidate()
+    assert not cache.is_fresh(entry)
+    assert not cache.is_fresh(entry, ["c1", "c3"])
+    assert cache.is_fresh(entry, ["c1", "c2"])
+
+
+def test_size_and_ttl_eviction(monkeypatch):
+    """Oldest entries are evicted by size and expired entries by TTL."""
+    cache = SemanticAnswerCache(threshold=0.9, max_entries=1, ttl_seconds=10)
+    cache.store([1.0, 0.0], [], {"answer": "A"})
+    cache.store([0.0, 1.0], [], {"answer": "B"})
+    assert cache.lookup([1.0, 0.0]) is None
+    assert cache.stats()["evictions"] == 1
+
+    now = [1000.0]
+    monkeypatch.setattr("app.services.answer_cache.time.monotonic", lambda: now[0])
+    cache.store([1.0, 0.0], [], {"answer": "C"})
+    now[0] += 11
+    assert cache.lookup([1.0, 0.0]) is None
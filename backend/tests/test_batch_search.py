@@ -0,0 +1,94 @@
+import asyncio
+import threading
+
+import pytest
+from qdrant_client import AsyncQdrantClient, QdrantClient
+
+from app.services.vectorstore_qdrant import QdrantClientWrapper
+from app.utils.filters import parse_filters
+
+VECTORS = {"alpha": [1.0, 0.0, 0.0], "beta": [0.0, 1.0, 0.0], "gamma": [0.0, 0.0, 1.0]}
+FIELDS = {"tenant": "keyword"}
+
+
+class FakeLLM:
+    def __init__(self):
+        self.running, self.peak = 0, 0
+
+    async def generate_content_async(self, prompt, stream=False):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+        return type("Response", (), {"text": "answer"})()
+
+
+@pytest.fixture
+def service(bare_service):
+    service = bare_service(vector=VECTORS.get, filterable_fields=["tenant"])
+    service.llm = FakeLLM()
+    service.vector_store.upsert_vectors(
+        "docs", list(VECTORS.values()),
+        [{"content": name, "tenant": "acme" if name != "gamma" else "globex"} for name in VECTORS],
+        ids=list(VECTORS),
+    )
+    return service
+
+
+def test_search_many_embeds_once_and_matches_single_searches(service, monkeypatch):
+    """One embedding call for the whole batch; per-query results in request order."""
+    monkeypatch.setattr("app.services.semantic.settings.RETRIEVAL_OVERSAMPLE", 1)
+    queries = ["gamma", "alpha", "beta"]
+    batch = service.search_many(queries, top_k=1)
+    assert service.embeddings.calls == [queries]
+    assert [entry["query"] for entry in batch] == queries
+    assert [entry["results"][0]["content"] for entry in batch] == queries
+
+
+def test_asearch_many_generates_answers_under_concurrency_cap(service, monkeypatch):
+    """Answers are generated concurrently, never more than the cap at once, and filters apply."""
+    monkeypatch.setattr("app.services.semantic.settings.RETRIEVAL_OVERSAMPLE", 1)
+    monkeypatch.setattr("app.services.semantic.settings.PAYLOAD_INDEX_FIELDS", "tenant:keyword")
+    queries = ["alpha", "beta", "gamma"] * 3
+    batch = asyncio.run(service.asearch_many(
+        queries, top_k=1, filters={"tenant": "acme"}, generate=True, concurrency=2
+    ))
+    assert service.llm.peak == 2
+    assert all(entry["answer"] == "answer" for entry in batch)
+    assert {entry["results"][0]["content"] for entry in batch} == {"alpha", "beta"}
+
+
+def test_asearch_many_reranks_queries_concurrently(service, monkeypatch):
+    """Every query's cross-encoder call is in flight at the same time."""
+    monkeypatch.setattr("app.services.semantic.settings.RETRIEVAL_OVERSAMPLE", 3)
+    queries = ["gamma", "alpha", "beta"]
+    # Sequential reranking would time out waiting for the other queries
+    barrier = threading.Barrier(len(queries), timeout=5)
+
+    def reranker(query, passages):
+        barrier.wait()
+        return [1.0 if passage == query else 0.0 for passage in passages]
+
+    service.reranker = reranker
+    batch = asyncio.run(service.asearch_many(queries, top_k=1))
+    assert [entry["results"][0]["content"] for entry in batch] == queries
+
+
+def test_qdrant_batch_search_matches_single_searches():
+    """query_batch_points returns the same hits as one query_points call per vector."""
+    store = QdrantClientWrapper.__new__(QdrantClientWrapper)
+    store.collection_name, store.vector_size, store.hybrid = "docs", 3, False
+    store.client, store.aclient = QdrantClient(":memory:"), AsyncQdrantClient(":memory:")
+    store.search_params = None
+    store._ensure_collection()
+    store.upsert_vectors(
+        "docs", list(VECTORS.values()),
+        [{"content": name, "tenant": "acme" if name != "gamma" else "globex"} for name in VECTORS],
+    )
+
+    queries = [[1.0, 0.1, 0.0], [0.0, 0.2, 1.0]]
+    conditions = parse_filters({"tenant": "acme"}, FIELDS)
+    batch = store.search_batch("docs", queries, top_k=2, filters=conditions)
+    single = [store.search_vectors("docs", q, top_k=2, filters=conditions) for q in queries]
+    assert [[h.id for h in hits] for hits in batch] == [[h.id for h in hits] for hits in single]
+    assert all(h.payload["tenant"] == "acme" for hits in batch for h in hits)
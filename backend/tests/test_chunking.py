@@ -0,0 +1,51 @@
+import random
+
+from app.utils.chunking import StreamingChunker
+
+
+def _sample_text(words: int = 3000) -> str:
+    rng = random.Random(0)
+    vocab = ["alpha", "beta", "gamma", "delta", "epsilon", "zeta"]
+    parts = []
+    for i in range(words):
+        parts.append(rng.choice(vocab))
+        if i % 17 == 16:
+            parts.append(".\n\n" if i % 85 == 84 else ".")
+    return " ".join(parts)
+
+
+def test_spans_match_text_and_respect_size():
+    """Each chunk's (start, end) slices the stream; chunks fit and overlap their neighbours."""
+    text = _sample_text()
+    chunks = list(StreamingChunker(200, 40).chunks([text]))
+
+    assert len(chunks) > 10
+    for chunk in chunks:
+        assert text[chunk.start:chunk.end] == chunk.text
+        assert 0 < len(chunk.text) <= 200
+    for prev, nxt in zip(chunks, chunks[1:]):
+        assert prev.start < nxt.start < prev.end
+    assert chunks[-1].end == len(text.rstrip())
+
+
+def test_streamed_pieces_match_whole_text():
+    """Feeding the text in arbitrary pieces yields the same chunks."""
+    text = _sample_text()
+    chunker = StreamingChunker(300, 50)
+    cuts = sorted(random.Random(1).sample(range(1, len(text)), 40))
+    pieces = [text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])]
+
+    assert list(chunker.chunks(pieces)) == list(chunker.chunks([text]))
+
+
+def test_token_length_function_limits_chunks():
+    """With a length function, sizes are measured in its units (here: words)."""
+    text = _sample_text(500)
+
+    def words(s):
+        return len(s.split())
+
+    chunks = list(StreamingChunker(50, 10, length_function=words).chunks([text]))
+
+    assert all(words(c.text) <= 50 for c in chunks)
+    assert max(words(c.text) for c in chunks) >= 40
@@ -0,0 +1,45 @@
+from app.utils.chunking import StreamingChunker
+from app.utils.context import build_context, merge_spans
+
+
+def words(text: str) -> int:
+    return len(text.split())
+
+
+def retrieved(document_id, text, chunks, order):
+    """Chunks of one document as returned by search, in the given retrieval order."""
+    return [
+        {"id": f"{document_id}-{i}", "content": chunks[i].text, "document_id": document_id,
+         "start": chunks[i].start, "end": chunks[i].end}
+        for i in order
+    ]
+
+
+def test_adjacent_chunks_are_stitched_without_overlap():
+    """Overlapping neighbours from one document become one span equal to the original text."""
+    text = " ".join(f"word{i}" for i in range(300))
+    chunks = list(StreamingChunker(chunk_size=200, chunk_overlap=50).chunks([text]))
+    docs = retrieved("a", text, chunks, [2, 0, 1]) + [{"id": "x", "content": "standalone"}]
+
+    spans = merge_spans(docs)
+    assert [span.chunk_ids for span in spans] == [["a-0", "a-1", "a-2"], ["x"]]
+    first = spans[0]
+    assert first.text == text[first.start:first.end]
+    assert first.rank == 0
+
+
+def test_spans_are_packed_into_the_token_budget():
+    """Best-ranked spans go first; a span that does not fit is skipped, a smaller one still fits."""
+    docs = [
+        {"id": "1", "content": "alpha " * 5, "document_id": "a", "start": 0, "end": 30},
+        {"id": "2", "content": "beta " * 20, "document_id": "b", "start": 0, "end": 100},
+        {"id": "3", "content": "gamma " * 3, "document_id": "c", "start": 0, "end": 18},
+    ]
+    spans = build_context(docs, max_tokens=10, count_tokens=words)
+    assert [span.chunk_ids for span in spans] == [["1"], ["3"]]
+    assert sum(span.tokens for span in spans) <= 10
+
+    # The best span is cut to the budget rather than dropped
+    spans = build_context(docs[1:2], max_tokens=4, count_tokens=words)
+    assert spans[0].truncated and spans[0].text == "beta beta beta beta"
+    assert len(build_context(docs, max_tokens=0, count_tokens=words)) == 3
@@ -0,0 +1,21 @@
+from app.services.document_registry import DocumentRegistry, make_chunk_id, make_document_id
+
+
+def test_chunk_ids_are_deterministic():
+    """The same chunk in the same document always maps to the same point ID."""
+    assert make_chunk_id("doc", "hello") == make_chunk_id("doc", "hello")
+    assert make_chunk_id("doc", "hello") != make_chunk_id("doc", "hello!")
+    assert make_chunk_id("doc", "hello") != make_chunk_id("other", "hello")
+    assert make_document_id("text") == make_document_id("text")
+
+
+def test_registry_replaces_chunk_set():
+    """replace() records exactly the current chunk IDs for a document."""
+    registry = DocumentRegistry(":memory:")
+    registry.replace("doc", ["a", "b"])
+    registry.replace("other", ["c"])
+    registry.replace("doc", ["b", "d"])
+
+    assert registry.get_chunk_ids("doc") == {"b", "d"}
+    assert registry.get_chunk_ids("other") == {"c"}
+    assert registry.get_chunk_ids("missing") == set()
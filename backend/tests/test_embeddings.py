@@ -0,0 +1,114 @@
+import asyncio
+import base64
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.embedding_cache import EmbeddingCache
+from app.services.embeddings import EmbeddingService, _decode_embeddings
+from app.utils.batching import make_batches
+
+
+def test_lru_eviction_and_counters():
+    """Memory tier evicts least recently used entries and counts lookups."""
+    cache = EmbeddingCache(max_entries=2)
+    cache.put_many({"a": [1.0], "b": [2.0]})
+    cache.get_many(["a"])
+    cache.put_many({"c": [3.0]})
+
+    found = cache.get_many(["a", "b", "c"])
+    assert set(found) == {"a", "c"}
+
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 3
+    assert stats["misses"] == 1
+
+
+def test_disk_tier_survives_new_instance(tmp_path):
+    """Vectors written to SQLite are readable by a fresh cache."""
+    db_path = str(tmp_path / "cache.db")
+    EmbeddingCache(max_entries=10, db_path=db_path).put_many({"k": [0.5, -1.25]})
+
+    cache = EmbeddingCache(max_entries=10, db_path=db_path)
+    assert cache.get_many(["k"])["k"].tolist() == [0.5, -1.25]
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_embed_texts_only_sends_misses(monkeypatch):
+    """embed_texts embeds uncached texts once and keeps input order."""
+    service = EmbeddingService()
+    calls = []
+
+    def fake_batch(texts, input_type):
+        calls.append(list(texts))
+        return [[float(len(t))] for t in texts], service.provider
+
+    monkeypatch.setattr(service, "_embed_batch", fake_batch)
+
+    assert service.embed_texts(["aa", "b"]).tolist() == [[2.0], [1.0]]
+    assert service.embed_texts(["b", "ccc", "ccc", "aa"]).tolist() == [[1.0], [3.0], [3.0], [2.0]]
+    assert calls == [["aa", "b"], ["ccc"]]
+
+    # Same text with a different input type is a separate cache entry
+    service.embed_texts(["aa"], input_type="search_query")
+    assert calls[-1] == ["aa"]
+
+
+def test_make_batches_respects_item_and_char_limits():
+    """Batches are contiguous and bounded by count and size."""
+    texts = ["a" * 10, "b" * 10, "c" * 10, "d" * 50, "e"]
+    assert make_batches(texts, max_items=2, max_chars=25) == [(0, 2), (2, 3), (3, 4), (4, 5)]
+    assert make_batches(texts, max_items=10, max_chars=1000) == [(0, 5)]
+    assert make_batches([], max_items=2, max_chars=10) == []
+
+
+def test_embed_texts_splits_into_concurrent_batches(monkeypatch):
+    """Large inputs are split into provider batches and reassembled in order."""
+    service = EmbeddingService()
+    service.cache = None
+    service.batch_size = 3
+    batch_sizes = []
+
+    def fake_batch(texts, input_type):
+        batch_sizes.append(len(texts))
+        return [[float(t)] for t in texts], service.provider
+
+    monkeypatch.setattr(service, "_embed_batch", fake_batch)
+
+    texts = [str(i) for i in range(10)]
+    assert service.embed_texts(texts).tolist() == [[float(i)] for i in range(10)]
+    assert sorted(batch_sizes) == [1, 3, 3, 3]
+
+
+def test_aembed_texts_uses_cache_and_batches(monkeypatch):
+    """Async path shares the cache and batching behaviour of embed_texts."""
+    service = EmbeddingService()
+    service.batch_size = 2
+    calls = []
+
+    async def fake_abatch(texts, input_type):
+        calls.append(list(texts))
+        return [[float(len(t))] for t in texts], service.provider
+
+    monkeypatch.setattr(service, "_aembed_batch", fake_abatch)
+
+    assert asyncio.run(service.aembed_texts(["a", "bb", "ccc"])).tolist() == [[1.0], [2.0], [3.0]]
+    assert asyncio.run(service.aembed_text("bb")).tolist() == [2.0]
+    assert calls == [["a", "bb"], ["ccc"]]
+
+
+def test_jina_base64_embeddings_are_decoded_and_truncated(monkeypatch):
+    """base64 float32 responses decode into a matrix; extra dimensions are cut and re-normalized."""
+    monkeypatch.setattr(settings, "EMBEDDING_DIMENSIONS", 2)
+    service = EmbeddingService()
+    service.cache = None
+    full = np.array([[3.0, 4.0, 12.0], [1.0, 0.0, 0.0]], dtype="<f4")
+    data = [{"index": i, "embedding": base64.b64encode(row.tobytes()).decode()} for i, row in enumerate(full)]
+
+    assert service._jina_payload(["a"])["dimensions"] == 2
+    np.testing.assert_allclose(_decode_embeddings(data), full)
+    vectors = service._to_matrix(_decode_embeddings(data))
+    assert vectors.dtype == np.float32
+    np.testing.assert_allclose(vectors, [[0.6, 0.8], [1.0, 0.0]], rtol=1e-6)
+    assert service.cache_model == "jina-embeddings-v3:2"
@@ -0,0 +1,72 @@
+import asyncio
+
+from PyPDF2 import PageObject, PdfWriter
+from PyPDF2.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+from app.api.rag import _preview_chunks
+from app.services import file_parser
+from app.services.file_parser import FileParser, _extract_page_range
+from app.services.service_manager import ServiceManager
+
+PAGE_TEXTS = ["Page one", "Page two", "", "Page four", "Page five", "Page six", "Page seven"]
+HELVETICA = DictionaryObject({
+    NameObject("/Type"): NameObject("/Font"),
+    NameObject("/Subtype"): NameObject("/Type1"),
+    NameObject("/BaseFont"): NameObject("/Helvetica"),
+})
+
+
+def write_pdf(path, texts):
+    """Write one page per text; an empty string makes a page without text."""
+    writer = PdfWriter()
+    for text in texts:
+        page = PageObject.create_blank_page(width=612, height=792)
+        if text:
+            content = DecodedStreamObject()
+            content.set_data(f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode())
+            page[NameObject("/Contents")] = content
+            page[NameObject("/Resources")] = DictionaryObject({
+                NameObject("/Font"): DictionaryObject({NameObject("/F1"): HELVETICA}),
+            })
+        writer.add_page(page)
+    with open(path, "wb") as f:
+        writer.write(f)
+    return str(path)
+
+
+def test_sharded_extraction_keeps_page_order_and_numbers(tmp_path, monkeypatch):
+    """Pages extracted in parallel shards come back in order, numbered from 1, skipping blank pages."""
+    path = write_pdf(tmp_path / "doc.pdf", PAGE_TEXTS)
+    expected = [(i + 1, text) for i, text in enumerate(PAGE_TEXTS) if text]
+
+    assert _extract_page_range(path, 2, 5) == [(4, "Page four"), (5, "Page five")]
+
+    monkeypatch.setattr(file_parser.settings, "PDF_PARALLEL_MIN_PAGES", 1)
+    monkeypatch.setattr(file_parser.settings, "PDF_PAGES_PER_SHARD", 2)
+    pages = list(FileParser.iter_pdf_pages(path, workers=2))
+    assert [(number, text.strip()) for number, text in pages] == expected
+    assert pages == list(FileParser.iter_pdf_pages(path, workers=1))
+
+
+def test_preview_reads_pages_sequentially(tmp_path, monkeypatch):
+    """The upload preview never submits shards to the process pool."""
+    path = write_pdf(tmp_path / "doc.pdf", PAGE_TEXTS)
+    monkeypatch.setattr(file_parser.settings, "PDF_PARALLEL_MIN_PAGES", 1)
+
+    def no_pool(workers):
+        raise AssertionError("preview used the process pool")
+
+    monkeypatch.setattr(file_parser, "_get_pdf_pool", no_pool)
+    chunks = _preview_chunks(path, limit=1)
+    assert len(chunks) == 1 and chunks[0].startswith("Page one")
+
+
+def test_pdf_pool_follows_worker_count_and_stops_on_shutdown():
+    """A different worker count replaces the shared pool; closing the service manager stops it."""
+    pool = file_parser._get_pdf_pool(2)
+    assert file_parser._get_pdf_pool(2) is pool
+    resized = file_parser._get_pdf_pool(3)
+    assert resized is not pool and resized._max_workers == 3
+
+    asyncio.run(ServiceManager().aclose())
+    assert file_parser._pdf_pool is None
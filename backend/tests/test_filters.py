@@ -0,0 +1,86 @@
+import pytest
+from pydantic import ValidationError
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import Distance, PointStruct, VectorParams
+
+from app.core.config import PAYLOAD_INDEX_TYPES, Settings
+from app.services.vectorstore_local import LocalVectorStore
+from app.services.vectorstore_qdrant import PAYLOAD_INDEX_SCHEMAS, build_filter
+from app.utils.filters import matches, parse_filters
+
+FIELDS = {"tenant": "keyword", "page": "integer", "tags": "keyword"}
+
+POINTS = [
+    ("a", [1.0, 0.0], {"tenant": "acme", "page": 1, "tags": ["x"]}),
+    ("b", [0.9, 0.1], {"tenant": "acme", "page": 5, "tags": ["y", "z"]}),
+    ("c", [1.0, 0.05], {"tenant": "globex", "page": 3}),
+]
+
+CASES = [
+    ({"tenant": "acme"}, ["a", "b"]),
+    ({"tenant": ["globex", "initech"]}, ["c"]),
+    ({"page": {"gte": 2, "lt": 5}}, ["c"]),
+    ({"tenant": "acme", "tags": "z"}, ["b"]),
+]
+
+
+def test_parse_filters_rejects_unindexed_fields_and_bad_conditions():
+    """Only indexed fields with equality, list or numeric range conditions are accepted."""
+    assert parse_filters(None, FIELDS) == []
+    for bad in [{"author": "x"}, {"page": {"near": 3}}, {"page": {"gte": "2"}}, {"tenant": []}, {"tenant": {"a": 1}}]:
+        with pytest.raises(ValueError):
+            parse_filters(bad, FIELDS)
+    assert not matches({"page": True}, parse_filters({"page": 1}, FIELDS))
+
+
+def test_unknown_payload_index_type_fails_when_settings_load():
+    """A bad PAYLOAD_INDEX_FIELDS entry is a startup error, not a warm-up retried forever."""
+    assert Settings(PAYLOAD_INDEX_FIELDS="tenant:tenant, year:INTEGER,source").payload_index_fields == {
+        "tenant": "tenant", "year": "integer", "source": "keyword"
+    }
+    with pytest.raises(ValidationError, match="Unsupported payload index type 'date' for 'published'"):
+        Settings(PAYLOAD_INDEX_FIELDS="tenant:keyword,published:date")
+    assert set(PAYLOAD_INDEX_SCHEMAS) == set(PAYLOAD_INDEX_TYPES)
+
+
+def test_local_store_masks_rows_before_top_k(tmp_path):
+    """Filtered searches return the best matching rows, including after reopening."""
+    store = LocalVectorStore("docs", 2, path=str(tmp_path), filterable_fields=list(FIELDS))
+    store.upsert_vectors("docs", [v for _, v, _ in POINTS], [p for _, _, p in POINTS], ids=[i for i, _, _ in POINTS])
+    store.close()
+
+    store = LocalVectorStore("docs", 2, path=str(tmp_path), filterable_fields=list(FIELDS))
+    for spec, expected in CASES:
+        hits = store.search_vectors("docs", [1.0, 0.0], top_k=5, filters=parse_filters(spec, FIELDS))
+        assert sorted(h.id for h in hits) == expected
+    with pytest.raises(ValueError):
+        store.search_vectors("docs", [1.0, 0.0], filters=parse_filters({"source": "x"}, {"source": "keyword"}))
+
+
+def test_local_store_masks_agree_with_payload_matching(tmp_path):
+    """The store's field indexes select exactly the rows `matches` accepts, for mixed value types."""
+    values = ["acme", "globex", 1, 1.0, 2.5, 7, True, False, None, [], ["acme", 3], [True, "x"], {"a": 1}]
+    payloads = [{"field": values[i % len(values)]} for i in range(3 * len(values))]
+    store = LocalVectorStore("docs", 2, path=str(tmp_path), filterable_fields=["field"])
+    store.upsert_vectors("docs", [[1.0, 0.0]] * len(payloads), payloads, ids=[str(i) for i in range(len(payloads))])
+
+    specs = [
+        "acme", 1, 1.5, True, False, "x", ["globex", 7], [1, True], [3.0],
+        {"gte": 1}, {"gt": 1, "lte": 7}, {"lt": 2}, {"gte": 3, "lt": 3},
+    ]
+    for spec in specs:
+        conditions = parse_filters({"field": spec}, {"field": "keyword"})
+        hits = store.search_vectors("docs", [1.0, 0.0], top_k=len(payloads), filters=conditions)
+        expected = {str(i) for i, payload in enumerate(payloads) if matches(payload, conditions)}
+        assert {h.id for h in hits} == expected, spec
+
+
+def test_qdrant_filter_translation():
+    """The translated filters select the same points in Qdrant."""
+    client = QdrantClient(":memory:")
+    client.create_collection("docs", vectors_config=VectorParams(size=2, distance=Distance.COSINE))
+    client.upsert("docs", points=[PointStruct(id=n, vector=v, payload={**p, "key": key}) for n, (key, v, p) in enumerate(POINTS)])
+
+    for spec, expected in CASES:
+        response = client.query_points("docs", query=[1.0, 0.0], query_filter=build_filter(parse_filters(spec, FIELDS)), limit=5)
+        assert sorted(p.payload["key"] for p in response.points) == expected
@@ -0,0 +1,78 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from app.cli.ingest import BulkIngester, Checkpoint, count_sources, iter_sources
+from app.services.document_registry import DocumentRegistry
+from app.services.vectorstore_local import LocalVectorStore
+from conftest import FakeEmbeddings
+
+
+def make_service(tmp_path):
+    embeddings = FakeEmbeddings()
+    return SimpleNamespace(
+        collection_name="documents",
+        embeddings=embeddings,
+        aembed_chunks=lambda texts, payloads: embeddings.aembed_texts(texts),
+        vector_store=LocalVectorStore("documents", 3, path=str(tmp_path / "vectors")),
+        registry=DocumentRegistry(str(tmp_path / "registry.db")),
+        sparse_encoder=None,
+        encode_sparse=lambda texts: None,
+        add_sparse_stats=lambda chunk_ids, texts: None,
+        remove_sparse_stats=lambda chunk_ids: None,
+    )
+
+
+def ingest(service, target, checkpoint_path):
+    checkpoint = Checkpoint(checkpoint_path)
+    ingester = BulkIngester(service, checkpoint, workers=2, embed_batch_size=3, upsert_batch_size=5)
+    try:
+        return asyncio.run(ingester.run(iter_sources(target), count_sources(target)))
+    finally:
+        checkpoint.close()
+
+
+def test_directory_ingest_resumes_from_checkpoint(tmp_path):
+    """All documents are indexed once; a re-run skips everything in the checkpoint."""
+    corpus = tmp_path / "corpus"
+    (corpus / "nested").mkdir(parents=True)
+    for i in range(4):
+        (corpus / f"doc{i}.txt").write_text(f"Document {i}. " + "word " * 600)
+    (corpus / "nested" / "notes.txt").write_text("Short nested note.")
+    (corpus / "ignored.md").write_text("not ingested")
+    checkpoint_path = str(tmp_path / "checkpoint.jsonl")
+    service = make_service(tmp_path)
+
+    summary = ingest(service, str(corpus), checkpoint_path)
+    assert summary["documents_total"] == 5
+    assert summary["documents_indexed"] == 5
+    assert summary["chunks_embedded"] == service.vector_store.count() == summary["chunks"]
+    assert service.registry.get_chunk_ids("file:nested/notes.txt")
+
+    summary = ingest(service, str(corpus), checkpoint_path)
+    assert summary["documents_skipped"] == 5
+    assert summary["documents_indexed"] == 0
+
+
+def test_jsonl_ingest_reuses_stored_chunks_and_reports_failures(tmp_path):
+    """Chunks stored by an interrupted run are not re-embedded; unreadable files are reported."""
+    records = [
+        {"id": "a", "text": "Alpha document text.", "metadata": {"lang": "en"}},
+        {"id": "b", "text": "Beta document text."},
+        {"path": str(tmp_path / "missing.txt")},
+    ]
+    target = tmp_path / "docs.jsonl"
+    target.write_text("\n".join(json.dumps(r) for r in records) + "\n")
+    service = make_service(tmp_path)
+
+    # Simulate a crash after "a" was written but before it reached the checkpoint
+    ingest(service, str(target), None)
+    embedded = len(service.embeddings.texts)
+    summary = ingest(service, str(target), str(tmp_path / "checkpoint.jsonl"))
+
+    assert len(service.embeddings.texts) == embedded
+    assert summary["chunks_unchanged"] == 2
+    assert summary["documents_failed"] == 1
+    assert summary["failures"][0]["document_id"].startswith("file:")
+    hit = service.vector_store.search_vectors("documents", [20.0, 1.0, 0.0], top_k=1)[0]
+    assert hit.payload["document_id"] == "a" and hit.payload["lang"] == "en"
@@ -0,0 +1,127 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+from app.services.document_registry import DocumentRegistry
+from app.services.file_parser import FileParser
+from app.services.ingestion import PAGE_BREAK, IngestionManager, iter_page_chunks
+from app.services.vectorstore_local import LocalVectorStore
+from app.utils.chunking import StreamingChunker
+from conftest import FakeEmbeddings
+
+
+def make_service(tmp_path, embeddings=None):
+    embeddings = embeddings or FakeEmbeddings()
+    return SimpleNamespace(
+        collection_name="documents",
+        embeddings=embeddings,
+        aembed_chunks=lambda texts, payloads: embeddings.aembed_texts(texts),
+        vector_store=LocalVectorStore("documents", 3, path=str(tmp_path / "vectors")),
+        registry=DocumentRegistry(str(tmp_path / "registry.db")),
+        encode_sparse=lambda texts: None,
+        add_sparse_stats=lambda chunk_ids, texts: None,
+        remove_sparse_stats=lambda chunk_ids: None,
+        invalidate_answer_cache=lambda: None,
+    )
+
+
+def run_job(manager, job, timeout=10):
+    """Run the pipeline in its own event loop; a pipeline that never returns fails the test."""
+    runner = threading.Thread(target=asyncio.run, args=(manager.run(job),), daemon=True)
+    runner.start()
+    runner.join(timeout)
+    assert not runner.is_alive(), "ingestion did not finish"
+    return job
+
+
+def watch_parser(monkeypatch):
+    """Return an event set once the parser thread stops reading pages."""
+    closed = threading.Event()
+    iter_pages = FileParser.iter_pages
+
+    def watched(file_path):
+        try:
+            yield from iter_pages(file_path)
+        finally:
+            closed.set()
+
+    monkeypatch.setattr(FileParser, "iter_pages", staticmethod(watched))
+    return closed
+
+
+def test_page_chunks_keep_source_offsets(monkeypatch):
+    """Plain-text blocks are joined unchanged; PDF pages are separated by PAGE_BREAK and tagged."""
+    monkeypatch.setattr("app.services.ingestion.iter_chunks", StreamingChunker(40, 0).chunks)
+    source = "alpha beta gamma delta " * 20
+    blocks = [(None, source[i:i + 37]) for i in range(0, len(source), 37)]
+    chunks = list(iter_page_chunks(blocks))
+    assert all(source[c.start:c.end] == c.text and page is None for c, page in chunks)
+    assert chunks[-1][0].end == len(source.rstrip())
+
+    pages = [(1, "first page text " * 5), (2, "second page text " * 5)]
+    joined = pages[0][1] + PAGE_BREAK + pages[1][1]
+    chunks = list(iter_page_chunks(pages))
+    assert all(joined[c.start:c.end] == c.text for c, _ in chunks)
+    assert [page for c, page in chunks if c.start >= len(pages[0][1]) + len(PAGE_BREAK)][0] == 2
+    assert chunks[0][1] == 1
+
+
+def test_upload_job_completes_and_skips_unchanged_chunks(tmp_path):
+    """Every chunk is indexed once; re-uploading the same file embeds nothing."""
+    path = tmp_path / "handbook.txt"
+    path.write_text("\n\n".join(f"Section {i}. " + "policy text " * 80 for i in range(12)))
+    service = make_service(tmp_path)
+    manager = IngestionManager(service, queue_size=1, embed_batch_size=2)
+
+    job = run_job(manager, manager.create_job("handbook.txt", str(path)))
+    assert job.status == "completed" and job.error is None
+    assert job.pages_processed >= 1
+    assert job.chunks_processed > 2
+    assert job.chunks_indexed == len(job.chunk_ids) == service.vector_store.count()
+    assert service.registry.get_chunk_ids("upload:handbook.txt") == set(job.chunk_ids)
+    assert manager.get_job(job.id) is job
+
+    again = run_job(manager, manager.create_job("handbook.txt", str(path)))
+    assert again.status == "completed"
+    assert again.chunks_indexed == again.chunks_deleted == 0
+    assert again.chunks_unchanged == job.chunks_indexed
+    assert len(service.embeddings.calls) == len(job.chunk_ids) // 2 + len(job.chunk_ids) % 2
+
+
+def test_embed_failure_fails_the_job_and_stops_the_parser(tmp_path, monkeypatch):
+    """An embedding error marks the job failed and releases a parser blocked on a full queue."""
+    path = tmp_path / "large.txt"
+    path.write_text("\n\n".join(f"Paragraph {i}. " + "filler words " * 60 for i in range(200)))
+    service = make_service(tmp_path)
+
+    async def failing_embed(texts, payloads):
+        await asyncio.sleep(0.05)
+        raise RuntimeError("embedding provider unavailable")
+
+    service.aembed_chunks = failing_embed
+    manager = IngestionManager(service, queue_size=1, embed_batch_size=1)
+    parser_closed = watch_parser(monkeypatch)
+    job = manager.create_job("large.txt", str(path))
+
+    async def main():
+        await manager.run(job)
+        # The loop keeps running, as it does in the server, so nothing else unblocks the parser
+        return await asyncio.to_thread(parser_closed.wait, 5)
+
+    assert asyncio.run(main()), "parser thread still blocked after the job failed"
+    assert job.status == "failed"
+    assert job.error == "embedding provider unavailable"
+    assert job.finished_at is not None
+    assert job.chunks_indexed == service.vector_store.count() == 0
+
+
+def test_parse_failure_fails_the_job(tmp_path):
+    """A file the parser cannot read fails the job instead of leaving it running."""
+    service = make_service(tmp_path)
+    manager = IngestionManager(service)
+
+    job = run_job(manager, manager.create_job("missing.txt", str(tmp_path / "missing.txt")))
+    assert job.status == "failed"
+    assert "missing.txt" in job.error
+    assert job.to_dict()["elapsed_seconds"] is not None
+    assert service.vector_store.count() == 0
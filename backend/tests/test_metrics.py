@@ -0,0 +1,56 @@
+import pytest
+
+from app.core.metrics import REGISTRY, Histogram, begin_request, render_metrics, server_timing_header, timed
+
+
+@pytest.fixture
+def histogram():
+    histogram = Histogram("test_latency_seconds", "Test histogram.", "stage", (0.1, 1.0))
+    yield histogram
+    REGISTRY.remove(histogram)
+
+
+def test_histogram_renders_cumulative_buckets(histogram):
+    """Buckets are cumulative and end with +Inf, sum and count."""
+    for value in (0.05, 0.5, 0.7, 5.0):
+        histogram.labels("embed").observe(value)
+
+    text = render_metrics()
+    assert 'test_latency_seconds_bucket{stage="embed",le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{stage="embed",le="1.0"} 3' in text
+    assert 'test_latency_seconds_bucket{stage="embed",le="+Inf"} 4' in text
+    assert 'test_latency_seconds_count{stage="embed"} 4' in text
+
+
+def test_timed_records_request_timings_and_errors():
+    """Decorated calls add to the current request's timings and count failures."""
+    @timed("test_stage")
+    def work(fail: bool):
+        if fail:
+            raise RuntimeError("boom")
+
+    timings = begin_request()
+    work(False)
+    with pytest.raises(RuntimeError):
+        work(True)
+
+    assert set(timings) == {"test_stage"}
+    assert 'rag_errors_total{stage="test_stage"} 1' in render_metrics()
+    assert server_timing_header({"test_stage": 0.0123}, 0.05) == "test_stage;dur=12.3, total;dur=50.0"
+
+
+def test_http_latency_is_labelled_by_route_template():
+    """Requests are labelled with the matched route's template, not the concrete path."""
+    from fastapi.testclient import TestClient
+
+    from app.api.rag import get_ingestion
+    from app.main import app
+
+    app.dependency_overrides[get_ingestion] = lambda: type("NoJobs", (), {"get_job": lambda self, job_id: None})()
+    try:
+        assert TestClient(app).get("/rag/jobs/rag").status_code == 404
+    finally:
+        app.dependency_overrides.clear()
+
+    text = render_metrics()
+    assert 'rag_http_request_duration_seconds_count{route="/rag/jobs/{job_id}"}' in text
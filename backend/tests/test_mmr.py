@@ -0,0 +1,17 @@
+from app.utils.mmr import mmr_select
+
+
+def test_mmr_skips_near_duplicates():
+    """A near-duplicate of the best hit loses to a less similar but distinct candidate."""
+    query = [1.0, 0.0, 0.0]
+    candidates = [[1.0, 0.1, 0.0], [1.0, 0.11, 0.0], [0.7, 0.0, 0.7]]
+
+    assert mmr_select(query, candidates, 2, lambda_mult=1.0) == [0, 1]
+    assert mmr_select(query, candidates, 2, lambda_mult=0.5) == [0, 2]
+
+
+def test_mmr_uses_reranker_relevance():
+    """External relevance scores replace query similarity for ranking."""
+    candidates = [[1.0, 0.0], [0.0, 1.0], [0.7, 0.7]]
+    assert mmr_select([1.0, 0.0], candidates, 3, lambda_mult=1.0, relevance=[0.1, 5.0, 2.0]) == [1, 2, 0]
+    assert mmr_select([1.0, 0.0], [], 3) == []
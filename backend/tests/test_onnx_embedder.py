@@ -0,0 +1,56 @@
+import json
+
+import numpy as np
+import pytest
+
+onnx = pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+tokenizers = pytest.importorskip("tokenizers")
+
+from app.services.onnx_embedder import OnnxEmbedder, read_model_dimension  # noqa: E402 (needs the optional packages checked above)
+
+VOCAB = ["[PAD]", "[UNK]", "alpha", "beta", "gamma", "delta"]
+
+
+def _write_model(path, dim=4):
+    """Tiny model: a token embedding lookup returning (batch, seq, dim) hidden states."""
+    from onnx import TensorProto, helper, numpy_helper
+
+    table = np.random.default_rng(0).normal(size=(len(VOCAB), dim)).astype(np.float32)
+    graph = helper.make_graph(
+        [helper.make_node("Gather", ["table", "input_ids"], ["last_hidden_state"])],
+        "lookup",
+        [
+            helper.make_tensor_value_info("input_ids", TensorProto.INT64, ["batch", "seq"]),
+            helper.make_tensor_value_info("attention_mask", TensorProto.INT64, ["batch", "seq"]),
+        ],
+        [helper.make_tensor_value_info("last_hidden_state", TensorProto.FLOAT, ["batch", "seq", dim])],
+        initializer=[numpy_helper.from_array(table, "table")],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    onnx.save(model, str(path / "model.onnx"))
+
+    tokenizer = tokenizers.Tokenizer(
+        tokenizers.models.WordLevel({t: i for i, t in enumerate(VOCAB)}, unk_token="[UNK]")
+    )
+    tokenizer.pre_tokenizer = tokenizers.pre_tokenizers.Whitespace()
+    tokenizer.save(str(path / "tokenizer.json"))
+    (path / "config.json").write_text(json.dumps({"hidden_size": dim}))
+    return table
+
+
+def test_length_sorted_batches_keep_input_order(tmp_path):
+    """Vectors come back in input order, mean-pooled over real tokens only."""
+    table = _write_model(tmp_path)
+    embedder = OnnxEmbedder(str(tmp_path), batch_size=2, workers=2)
+    texts = ["alpha beta gamma delta", "beta", "gamma delta", "alpha"]
+
+    vectors = embedder.embed(texts)
+
+    assert read_model_dimension(str(tmp_path)) == 4
+    assert vectors.shape == (4, 4) and vectors.dtype == np.float32
+    for text, vector in zip(texts, vectors):
+        expected = table[[VOCAB.index(t) for t in text.split()]].mean(axis=0)
+        np.testing.assert_allclose(vector, expected / np.linalg.norm(expected), rtol=1e-5)
+    embedder.close()
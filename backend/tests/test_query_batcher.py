@@ -0,0 +1,39 @@
+import asyncio
+
+from app.services.query_batcher import EmbeddingBatcher
+from conftest import FakeEmbeddings
+
+
+def length_only(text):
+    return [float(len(text))]
+
+
+def test_concurrent_queries_share_one_call():
+    """Queries arriving inside the window are embedded together."""
+    embeddings = FakeEmbeddings(length_only)
+    batcher = EmbeddingBatcher(embeddings, window_ms=20, max_batch_size=10)
+
+    async def run():
+        return await asyncio.gather(*(batcher.embed("x" * n) for n in range(1, 6)))
+
+    assert [v.tolist() for v in asyncio.run(run())] == [[1.0], [2.0], [3.0], [4.0], [5.0]]
+    assert len(embeddings.calls) == 1
+    assert not batcher._dispatches
+
+    stats = batcher.stats()
+    assert stats["batches"] == 1
+    assert stats["batch_size_histogram"]["8"] == 1
+
+
+def test_full_batch_flushes_without_waiting():
+    """A batch that reaches max size is dispatched immediately."""
+    embeddings = FakeEmbeddings(length_only)
+    batcher = EmbeddingBatcher(embeddings, window_ms=10_000, max_batch_size=2)
+
+    async def run():
+        return await asyncio.wait_for(
+            asyncio.gather(batcher.embed("a"), batcher.embed("bb")), timeout=1
+        )
+
+    assert [v.tolist() for v in asyncio.run(run())] == [[1.0], [2.0]]
+    assert embeddings.calls == [["a", "bb"]]
@@ -0,0 +1,82 @@
+import asyncio
+
+from app.services.query_log import QueryLog
+from app.services.service_manager import ServiceManager
+
+
+def test_query_log_counts_normalized_queries_and_keeps_the_most_frequent(tmp_path):
+    """Spelling variants share one count; the least frequent entries are dropped past the cap."""
+    log = QueryLog(str(tmp_path / "queries.db"), max_entries=2)
+    for query in ["What is the leave policy?", "what is the  LEAVE policy", "Who approves expenses", "rare question"]:
+        log.record(query)
+    log.record("Who approves expenses?")
+    log.record("What is the leave policy")
+    log.close()
+
+    log = QueryLog(str(tmp_path / "queries.db"), max_entries=2)
+    assert log.top(5) == ["What is the leave policy", "Who approves expenses?"]
+    assert log.stats() == {"entries": 2, "pending": 0}
+
+    # A closed log (service shut down) still answers stats and ignores new queries
+    log.close()
+    log.record("late question")
+    assert log.top(5) == []
+    assert log.stats() == {"entries": 2, "pending": 0}
+
+
+class FakeLLM:
+    async def count_tokens_async(self, text):
+        return 1
+
+
+def test_warm_up_embeds_and_searches_top_queries(tmp_path, bare_service):
+    """The most frequent logged queries are embedded in one batch and searched; each dependency is reported."""
+    service = bare_service()
+    service.llm = FakeLLM()
+    service.query_log = QueryLog(str(tmp_path / "queries.db"))
+    for query in ["b", "a", "b", "c", "b", "a"]:
+        service.query_log.record(query)
+
+    report = asyncio.run(service.awarm_up(2))
+    assert service.embeddings.calls == [["b", "a"]]
+    assert report["entries_warmed"] == 2
+    assert report["dependencies"] == {"embeddings": "ok", "vector_store": "ok", "llm": "ok"}
+
+
+def test_batch_searches_are_not_logged(tmp_path, bare_service):
+    """Only interactive searches count towards the warm-up; a batch of evaluation queries does not."""
+    service = bare_service()
+    service.query_log = QueryLog(str(tmp_path / "queries.db"))
+
+    service.search_many(["a", "b"])
+    asyncio.run(service.asearch_many(["c"]))
+    service.search("d")
+    assert service.query_log.top(5) == ["d"]
+
+
+def test_readiness_waits_for_cache_warm_up(monkeypatch):
+    """Requests get the service as soon as it is built; the readiness probe passes after the warm-up."""
+    release = asyncio.Event()
+
+    class WarmingService:
+        async def awarm_up(self, limit):
+            await release.wait()
+            return {"entries_warmed": limit, "duration_ms": 1.0, "dependencies": {}}
+
+    monkeypatch.setattr("app.services.semantic.SemanticSearchService", lambda startup: WarmingService())
+    monkeypatch.setattr("app.services.ingestion.create_ingestion_manager", lambda service: None)
+    monkeypatch.setattr("app.services.service_manager.settings.WARMUP_QUERIES", 7)
+    manager = ServiceManager()
+
+    async def main():
+        service = await manager.get()
+        assert isinstance(service, WarmingService)
+        assert manager.readiness()["ready"] is False
+        assert manager.readiness()["state"] == "warming_caches"
+        release.set()
+        await manager._cache_task
+
+    asyncio.run(main())
+    status = manager.readiness()
+    assert status["ready"] is True
+    assert status["cache_warmup"]["entries_warmed"] == 7
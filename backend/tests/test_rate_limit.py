@@ -0,0 +1,190 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.embeddings import EmbeddingService, _sdk_error
+from app.services.rate_limit import (
+    AdaptiveConcurrency,
+    ProviderError,
+    ProviderLimiter,
+    TokenBucket,
+    parse_retry_after,
+)
+from app.services.vectorstore_local import LocalVectorStore
+
+
+def test_token_bucket_queues_callers_behind_debt():
+    """A burst up to capacity passes; later reservations wait for the refill."""
+    bucket = TokenBucket(rate=10.0, capacity=2)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+    assert bucket.reserve() == pytest.approx(0.2, abs=0.01)
+
+
+def test_token_bucket_charges_oversized_requests_in_full():
+    """A request above capacity starts on a full bucket; the next one waits for its whole cost."""
+    bucket = TokenBucket(rate=10.0, capacity=2)
+    assert bucket.reserve(5) == 0.0
+    assert bucket.reserve(5) == pytest.approx(0.5, abs=0.01)
+    assert bucket.reserve(1) == pytest.approx(0.9, abs=0.01)
+
+
+def test_adaptive_concurrency_halves_once_per_overload_and_regrows():
+    """Throttles from requests sent before a decrease do not decrease the limit again."""
+    limiter = AdaptiveConcurrency(maximum=8)
+    epochs = [limiter.acquire() for _ in range(8)]
+    limiter.release(epochs[0], "throttled")
+    limiter.release(epochs[1], "throttled")
+    assert limiter.limit == 4.0
+    for epoch in epochs[2:]:
+        limiter.release(epoch, "success")
+
+    # Successes with idle slots leave the limit alone
+    limiter.limit = 4.0
+    limiter.release(limiter.acquire(), "success")
+    assert limiter.limit == 4.0
+
+    for _ in range(20):
+        epochs = [limiter.acquire() for _ in range(int(limiter.limit))]
+        for epoch in epochs:
+            limiter.release(epoch, "success")
+    assert limiter.limit == 8.0
+
+
+def test_provider_limiter_retries_and_honours_retry_after():
+    """Throttled calls are retried after Retry-After; client errors are not retried."""
+    limiter = ProviderLimiter("test", max_retries=3, retry_base_delay=0.001)
+    responses = [ProviderError("slow down", status_code=429, retry_after=0.05), "ok"]
+
+    def call():
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    started = time.perf_counter()
+    assert limiter.call(call) == "ok"
+    assert time.perf_counter() - started >= 0.05
+    assert limiter.stats()["retries"] == 1
+
+    def bad_request():
+        raise ProviderError("bad input", status_code=400)
+
+    with pytest.raises(ProviderError):
+        limiter.call(bad_request)
+    assert limiter.stats()["retries"] == 1
+    assert parse_retry_after("2") == 2.0
+    assert parse_retry_after("soon") is None
+
+
+def test_async_limiter_caps_in_flight_requests():
+    """No more than the concurrency limit run at once on the async path."""
+    limiter = ProviderLimiter("test", max_concurrency=2)
+    running, peak = 0, 0
+
+    async def call():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return True
+
+    async def main():
+        return await asyncio.gather(*(limiter.acall(call) for _ in range(6)))
+
+    assert all(asyncio.run(main()))
+    assert peak == 2
+
+
+def test_embedding_service_fails_over_to_fallback(monkeypatch):
+    """Batches the primary cannot serve go to the fallback, which then takes over for the cooldown."""
+    service = EmbeddingService()
+    service.cache = None
+    service.limiter.max_retries = 0
+    service.fallback = EmbeddingService(primary=False)
+    primary_calls, fallback_calls = [], []
+
+    def failing_send(texts, input_type):
+        primary_calls.append(texts)
+        raise ProviderError("unavailable", status_code=503)
+
+    def fallback_send(texts, input_type):
+        fallback_calls.append(texts)
+        return [[1.0] for _ in texts]
+
+    async def fallback_asend(texts, input_type):
+        return fallback_send(texts, input_type)
+
+    monkeypatch.setattr(service, "_send", failing_send)
+    monkeypatch.setattr(service.fallback, "_send", fallback_send)
+    monkeypatch.setattr(service.fallback, "_asend", fallback_asend)
+
+    assert service.embed_texts(["a"]).tolist() == [[1.0]]
+    assert asyncio.run(service.aembed_texts(["b"])).tolist() == [[1.0]]
+    assert primary_calls == [["a"]]
+    assert fallback_calls == [["a"], ["b"]]
+    assert service.limiter_stats()["failovers"] == 1
+
+
+def test_rejected_requests_do_not_fail_over(monkeypatch):
+    """A 400 is raised to the caller and leaves the primary in service; 5xx responses throttle."""
+    service = EmbeddingService()
+    service.cache = None
+    service.fallback = EmbeddingService(primary=False)
+
+    def bad_request(texts, input_type):
+        raise ProviderError("input too long", status_code=400)
+
+    monkeypatch.setattr(service, "_send", bad_request)
+    with pytest.raises(ProviderError):
+        service.embed_texts(["a"])
+    assert service.failovers == 0 and not service._failed_over()
+    assert ProviderError("bad gateway", status_code=502).throttled
+    assert not ProviderError("network", status_code=None).throttled
+
+
+def test_fallback_vectors_are_not_cached_and_report_their_provider(monkeypatch):
+    """Texts embedded by the fallback are re-embedded by the primary once it recovers."""
+    service = EmbeddingService()
+    service.limiter.max_retries = 0
+    service.fallback = EmbeddingService(primary=False)
+    service.fallback.provider = "cohere"
+    primary_up = False
+
+    def primary_send(texts, input_type):
+        if not primary_up:
+            raise ProviderError("unavailable", status_code=503)
+        return [[2.0] for _ in texts]
+
+    monkeypatch.setattr(service, "_send", primary_send)
+    monkeypatch.setattr(service.fallback, "_send", lambda texts, input_type: [[1.0] for _ in texts])
+
+    vectors, providers = service.embed_texts_with_providers(["a"])
+    assert vectors.tolist() == [[1.0]] and providers == ["cohere"]
+
+    primary_up, service._failover_until = True, 0.0
+    vectors, providers = service.embed_texts_with_providers(["a"])
+    assert vectors.tolist() == [[2.0]] and providers == [service.provider]
+
+
+def test_existing_ids_skips_chunks_embedded_by_another_provider(tmp_path):
+    """Failover chunks count as missing for the primary; untagged legacy chunks do not."""
+    store = LocalVectorStore("docs", 2, path=str(tmp_path))
+    store.upsert_vectors(
+        "docs", [[1.0, 0.0]] * 3,
+        [{"embedding_provider": "jina"}, {"embedding_provider": "cohere"}, {}], ids=["a", "b", "c"]
+    )
+    assert store.existing_ids("docs", ["a", "b", "c"], "jina") == {"a", "c"}
+    assert store.existing_ids("docs", ["a", "b", "c"]) == {"a", "b", "c"}
+
+
+def test_http_client_errors_keep_their_status():
+    """Errors carrying the status on a response object (e.g. huggingface_hub) can be retried."""
+    error = RuntimeError("429 Too Many Requests")
+    error.response = SimpleNamespace(status_code=429, headers={"retry-after": "3"})
+    wrapped = _sdk_error("HuggingFace", error)
+    assert wrapped.throttled and wrapped.retry_after == 3.0
@@ -0,0 +1,45 @@
+import math
+
+from app.services.sparse import BM25Encoder, term_id, tokenize
+
+
+def dot(query, doc):
+    weights = dict(zip(*doc))
+    return sum(w * weights.get(i, 0.0) for i, w in zip(*query))
+
+
+def test_tokenize_keeps_identifiers():
+    """Error codes and dotted versions stay single tokens."""
+    assert tokenize("Got ERR-404 on v1.2.3, user_id!") == ["got", "err-404", "on", "v1.2.3", "user_id"]
+
+
+def test_rare_terms_outscore_common_terms():
+    """BM25 weights favour documents containing rare query terms."""
+    encoder = BM25Encoder(":memory:")
+    texts = ["the server failed with ERR-4711", "the server restarted", "the server is healthy"]
+    encoder.add_documents(["a", "b", "c"], texts)
+    docs = encoder.encode_documents(texts)
+
+    query = encoder.encode_query("server ERR-4711")
+    scores = [dot(query, doc) for doc in docs]
+    assert scores[0] > max(scores[1:])
+    assert encoder.doc_count == 3
+    assert term_id("server") in query[0]
+
+
+def test_statistics_follow_stored_and_deleted_chunks(tmp_path):
+    """Encoding alone counts nothing; re-adding is idempotent and deletions subtract, also after reopening."""
+    db_path = str(tmp_path / "stats.db")
+    encoder = BM25Encoder(db_path)
+    encoder.encode_documents(["never stored"])
+    assert encoder.doc_count == 0
+
+    encoder.add_documents(["a", "b"], ["alpha beta", "beta gamma delta"])
+    encoder.add_documents(["a"], ["alpha beta"])
+    assert (encoder.doc_count, encoder.total_length) == (2, 5)
+
+    encoder = BM25Encoder(db_path)
+    encoder.remove_documents(["b", "unknown"])
+    assert (encoder.doc_count, encoder.total_length) == (1, 2)
+    # "gamma" only appeared in the deleted chunk: df is back to 0 for the one remaining chunk
+    assert encoder.encode_query("gamma")[1] == [math.log(1 + 1.5 / 0.5)]
@@ -0,0 +1,104 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import health
+from app.core.config import settings
+from app.main import app
+from app.services.service_manager import ServiceManager
+
+# app.main imports in ~0.5s locally (mostly FastAPI itself); the budget leaves headroom for slow CI
+IMPORT_BUDGET_SECONDS = 2.0
+
+# Loaded only when the service warms up, never by importing the app
+DEFERRED_MODULES = ["google.generativeai", "qdrant_client", "PyPDF2", "numpy", "app.services.semantic"]
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_app_import_is_fast_and_defers_heavy_modules():
+    """Importing app.main in a fresh interpreter stays under budget and builds no clients."""
+    script = (
+        "import json, sys, time\n"
+        "started = time.perf_counter()\n"
+        "import app.main\n"
+        "elapsed = time.perf_counter() - started\n"
+        f"print(json.dumps({{'seconds': elapsed, 'loaded': [m for m in {DEFERRED_MODULES!r} if m in sys.modules]}}))\n"
+    )
+    env = dict(os.environ, GEMINI_API_KEY="test-gemini-key", QDRANT_URL="http://127.0.0.1:1")
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+
+    assert report["loaded"] == []
+    assert report["seconds"] < IMPORT_BUDGET_SECONDS
+
+
+@pytest.fixture
+def local_settings(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "VECTOR_STORE_BACKEND", "local")
+    monkeypatch.setattr(settings, "LOCAL_VECTOR_STORE_PATH", str(tmp_path / "vectors"))
+    monkeypatch.setattr(settings, "DOCUMENT_REGISTRY_PATH", str(tmp_path / "registry.db"))
+    monkeypatch.setattr(settings, "QUERY_LOG_PATH", str(tmp_path / "query_log.db"))
+
+
+def test_service_manager_reports_dependency_readiness(local_settings):
+    """Readiness flips once the service is built and lists each dependency's init time."""
+    manager = ServiceManager()
+    assert manager.readiness()["ready"] is False
+
+    service = manager.ensure_ready()
+    status = manager.readiness()
+
+    assert manager.ensure_ready() is service
+    assert status["ready"] is True and status["state"] == "ready"
+    assert {"embeddings", "vector_store", "registry", "llm"} <= set(status["dependencies"])
+    assert all(dep["ready"] and dep["ms"] >= 0 for dep in status["dependencies"].values())
+
+
+def test_service_manager_records_failing_dependency(local_settings, monkeypatch):
+    """A dependency that fails to initialize is reported instead of crashing the caller's process."""
+    monkeypatch.setattr(settings, "VECTOR_STORE_BACKEND", "unknown")
+    manager = ServiceManager()
+
+    with pytest.raises(ValueError):
+        manager.ensure_ready()
+
+    status = manager.readiness()
+    assert status["ready"] is False and status["state"] == "failed"
+    assert status["dependencies"]["embeddings"]["ready"] is True
+    assert "unknown" in status["dependencies"]["vector_store"]["error"]
+
+
+def test_shutdown_drops_the_closed_service(local_settings):
+    """After aclose the manager is no longer ready and builds a fresh service on next use."""
+    manager = ServiceManager()
+    service = manager.ensure_ready()
+    asyncio.run(manager.aclose())
+
+    assert manager.readiness()["ready"] is False and manager.readiness()["state"] == "idle"
+    assert manager.service is None and manager.ingestion is None
+    assert manager.ensure_ready() is not service
+
+
+def test_readiness_probe(local_settings, monkeypatch):
+    """/health answers before warm-up; /health/ready is 503 until the service is built."""
+    manager = ServiceManager()
+    monkeypatch.setattr(health, "service_manager", manager)
+    client = TestClient(app)
+
+    assert client.get("/health/").status_code == 200
+    response = client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["state"] == "idle"
+
+    manager.ensure_ready()
+    response = client.get("/health/ready")
+    assert response.status_code == 200
+    assert response.json()["dependencies"]["vector_store"]["ready"] is True
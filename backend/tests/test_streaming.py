@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.rag import get_rag_service
+from app.main import app
+from app.services.answer_cache import SemanticAnswerCache
+
+VECTORS = {"alpha": [1.0, 0.0, 0.0], "beta": [0.0, 1.0, 0.0], "gamma": [0.0, 0.0, 1.0]}
+
+
+class FakeStreamingLLM:
+    """Streams a fixed answer in pieces; with `fail_after`, raises after that many pieces."""
+
+    def __init__(self, pieces=("Alpha ", "is ", "first."), fail_after=None):
+        self.pieces = pieces
+        self.fail_after = fail_after
+        self.calls = 0
+
+    async def generate_content_async(self, prompt, stream=False):
+        self.calls += 1
+        return self._stream()
+
+    async def _stream(self):
+        for i, piece in enumerate(self.pieces):
+            if i == self.fail_after:
+                raise RuntimeError("generation interrupted")
+            await asyncio.sleep(0)
+            yield type("Chunk", (), {"text": piece})()
+
+
+@pytest.fixture
+def service(bare_service, monkeypatch):
+    monkeypatch.setattr("app.services.semantic.settings.RETRIEVAL_OVERSAMPLE", 1)
+    service = bare_service(vector=VECTORS.get)
+    service.llm = FakeStreamingLLM()
+    service.answer_cache = SemanticAnswerCache(threshold=0.9)
+    service.vector_store.upsert_vectors(
+        "docs", list(VECTORS.values()), [{"content": f"{name} text"} for name in VECTORS], ids=list(VECTORS)
+    )
+    return service
+
+
+def collect(service, query):
+    async def run():
+        return [event async for event in service.astream_answer(query, top_k=1)]
+    return asyncio.run(run())
+
+
+def test_stream_emits_context_then_tokens_then_done_and_caches_the_answer(service):
+    """A miss streams each generated piece; the repeated query is answered from the cache in one token."""
+    events = collect(service, "alpha")
+    assert [name for name, _ in events] == ["context", "token", "token", "token", "done"]
+    assert events[0][1]["context_used"] == ["alpha text"]
+    assert "".join(data["text"] for name, data in events if name == "token") == "Alpha is first."
+    assert events[-1][1]["cached"] is False
+    assert "first_token_ms" in events[-1][1]["timings"]
+
+    events = collect(service, "alpha")
+    assert [name for name, _ in events] == ["context", "token", "done"]
+    assert events[1][1] == {"text": "Alpha is first."}
+    assert events[-1][1]["cached"] is True
+    assert service.llm.calls == 1
+
+
+def test_stream_endpoint_reports_errors_as_an_event(service):
+    """An exception while generating ends the stream with an `error` frame."""
+    service.llm = FakeStreamingLLM(fail_after=1)
+
+    async def override():
+        return service
+
+    app.dependency_overrides[get_rag_service] = override
+    try:
+        response = TestClient(app).post("/rag/query/stream", data={"query": "beta"})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    frames = [frame.split("\n") for frame in response.text.strip().split("\n\n")]
+    assert [lines[0] for lines in frames] == ["event: context", "event: token", "event: error"]
+    assert frames[-1][1] == 'data: {"detail": "generation interrupted"}'
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from app.services.vectorstore_local import LocalVectorStore
+
+
+def test_search_returns_nearest_and_skips_deleted(tmp_path):
+    """Top-k is ordered by cosine similarity and excludes deleted points."""
+    store = LocalVectorStore("docs", 3, path=str(tmp_path), initial_capacity=1)
+    store.upsert_vectors("docs", [[1, 0, 0], [0, 1, 0], [1, 1, 0]], [{"n": 0}, {"n": 1}, {"n": 2}], ids=["a", "b", "c"])
+
+    hits = store.search_vectors("docs", [1, 0.1, 0], top_k=2)
+    assert [h.id for h in hits] == ["a", "c"]
+    assert hits[0].payload == {"n": 0}
+
+    store.delete_points("docs", ["a"])
+    assert [h.id for h in store.search_vectors("docs", [1, 0, 0], top_k=5)] == ["c", "b"]
+
+
+def test_reopen_replays_sidecar_and_upserts_supersede(tmp_path):
+    """Data survives reopening; re-upserting an ID replaces the old row."""
+    store = LocalVectorStore("docs", 2, path=str(tmp_path))
+    store.upsert_vectors("docs", [[1, 0], [0, 1]], [{"v": 1}, {"v": 1}], ids=["a", "b"])
+    store.upsert_vectors("docs", [[0, 1]], [{"v": 2}], ids=["a"])
+    store.delete_points("docs", ["b"])
+    store.close()
+
+    reopened = LocalVectorStore("docs", 2, path=str(tmp_path))
+    hits = reopened.search_vectors("docs", [0, 1], top_k=5)
+    assert [(h.id, h.payload["v"]) for h in hits] == [("a", 2)]
+    assert reopened.existing_ids("docs", ["a", "b"]) == {"a"}
+
+    with pytest.raises(ValueError):
+        LocalVectorStore("docs", 3, path=str(tmp_path))
+
+
+def test_batch_search_matches_single_queries(tmp_path):
+    """Batched queries return the same hits as individual searches."""
+    rng = np.random.default_rng(0)
+    store = LocalVectorStore("docs", 8, path=str(tmp_path))
+    store.upsert_vectors("docs", rng.normal(size=(200, 8)), [{"i": i} for i in range(200)])
+
+    queries = rng.normal(size=(4, 8))
+    batch = store.search_batch("docs", queries, top_k=5)
+    for query, hits in zip(queries, batch):
+        assert [h.id for h in hits] == [h.id for h in store.search_vectors("docs", query, top_k=5)]
@@ -0,0 +1,55 @@
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.models import BinaryQuantization, ScalarQuantization, ScalarType
+
+from app.services import vectorstore_qdrant
+from app.services.vectorstore_qdrant import QdrantClientWrapper
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """One in-memory Qdrant shared by every wrapper built in the test."""
+    client = QdrantClient(":memory:")
+    monkeypatch.setattr(vectorstore_qdrant, "QdrantClient", lambda **kwargs: client)
+    monkeypatch.setattr(vectorstore_qdrant, "AsyncQdrantClient", lambda **kwargs: None)
+    monkeypatch.setattr(vectorstore_qdrant.settings, "PAYLOAD_INDEX_FIELDS", "")
+    return client
+
+
+@pytest.mark.parametrize("mode, expected", [("none", None), ("Scalar", ScalarQuantization), ("binary", BinaryQuantization)])
+def test_quantization_setting_translates_to_qdrant_config(monkeypatch, mode, expected):
+    """Each QDRANT_QUANTIZATION mode maps to its Qdrant config, and search rescores quantized hits."""
+    monkeypatch.setattr(vectorstore_qdrant.settings, "QDRANT_QUANTIZATION", mode)
+    config = QdrantClientWrapper._build_quantization_config()
+    if expected is None:
+        assert config is None
+        assert QdrantClientWrapper._build_search_params() is None
+        return
+    assert isinstance(config, expected)
+    if expected is ScalarQuantization:
+        assert config.scalar.type == ScalarType.INT8 and config.scalar.always_ram
+    else:
+        assert config.binary.always_ram
+    search = QdrantClientWrapper._build_search_params().quantization
+    assert search.rescore is vectorstore_qdrant.settings.QDRANT_QUANTIZATION_RESCORE
+    assert search.oversampling == vectorstore_qdrant.settings.QDRANT_QUANTIZATION_OVERSAMPLING
+
+
+def test_unknown_quantization_mode_is_rejected(monkeypatch):
+    """A mode Qdrant does not support fails instead of silently indexing unquantized."""
+    monkeypatch.setattr(vectorstore_qdrant.settings, "QDRANT_QUANTIZATION", "pq")
+    with pytest.raises(ValueError, match="Unsupported QDRANT_QUANTIZATION: pq"):
+        QdrantClientWrapper._build_quantization_config()
+
+
+def test_existing_collection_is_kept_and_must_match_the_vector_size(client):
+    """Reopening a collection keeps its points; a different embedding size is refused, not recreated."""
+    store = QdrantClientWrapper("docs", vector_size=3)
+    store.upsert_vectors("docs", [[1.0, 0.0, 0.0]], [{"content": "kept"}])
+
+    QdrantClientWrapper("docs", vector_size=3)
+    with pytest.raises(ValueError, match="has 3D vectors but the embedding provider produces 4D"):
+        QdrantClientWrapper("docs", vector_size=4)
+    with pytest.raises(ValueError, match="created without hybrid vectors"):
+        QdrantClientWrapper("docs", vector_size=3, hybrid=True)
+    assert client.count("docs").count == 1
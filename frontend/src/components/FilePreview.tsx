@@ -25,10 +25,19 @@ export default function FilePreview({ preview }: FilePreviewProps) {
             <span className="text-gray-900 font-semibold">{preview.filename}</span>
           </div>
           
-          <div className="flex justify-between items-center">
-            <span className="font-medium text-gray-700">Total Chunks:</span>
-            <span className="text-gray-900 font-semibold">{preview.total_chunks}</span>
-          </div>
+          {preview.total_chunks !== undefined && (
+            <div className="flex justify-between items-center">
+              <span className="font-medium text-gray-700">Total Chunks:</span>
+              <span className="text-gray-900 font-semibold">{preview.total_chunks}</span>
+            </div>
+          )}
+
+          {preview.job_id && (
+            <div className="flex justify-between items-center">
+              <span className="font-medium text-gray-700">Indexing Job:</span>
+              <span className="text-gray-900 font-semibold">{preview.status} ({preview.job_id})</span>
+            </div>
+          )}
           
           <div className="pt-4">
             <h3 className="font-medium text-gray-700 mb-2">Sample Chunks:</h3>
@@ -1,7 +1,10 @@
 export interface UploadPreview {
   filename: string;
-  total_chunks: number;
+  total_chunks?: number;
   sample_chunks: string[];
+  job_id?: string;
+  status?: string;
+  status_url?: string;
 }
 
 export interface ChunkPreviewProps {